@@ -0,0 +1,180 @@
+"""
+Approximate nearest-neighbour index for dish signature vectors.
+
+A pure NumPy IVF (inverted file) index: dish vectors are clustered with
+k-means, and each query only scans the dishes in the `nprobe` clusters closest
+to it. Vectors are stored sorted by cluster, so every probed list is one
+contiguous slice of a memory-mapped array and startup costs no more than
+opening the files.
+
+The index is built offline:
+    python ann_index.py build --out data/ann_index
+    python ann_index.py build --signatures signatures.npz --out data/ann_index --lists 256
+
+and loaded by the recognizer when SWASTHYA_ANN_INDEX points at the directory.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+INDEX_PATH = os.environ.get('SWASTHYA_ANN_INDEX')
+
+_FILES = ('centroids', 'offsets', 'ids', 'vectors')
+
+
+def _squared_distances(vectors, queries):
+    """(len(queries), len(vectors)) squared Euclidean distances"""
+    vector_norms = np.einsum('ij,ij->i', vectors, vectors)
+    query_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+    return np.maximum(query_norms + vector_norms - 2.0 * queries @ vectors.T, 0.0)
+
+
+def _top_k(distances, k):
+    """Indices of the k smallest values, sorted ascending"""
+    if k >= distances.size:
+        return np.argsort(distances)
+    part = np.argpartition(distances, k - 1)[:k]
+    return part[np.argsort(distances[part])]
+
+
+def kmeans(vectors, n_clusters, iterations=20, seed=0, chunk_size=65536):
+    """Lloyd's k-means; returns (centroids, assignments)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    assignments = np.zeros(len(vectors), dtype=np.int64)
+
+    for _ in range(iterations):
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = _squared_distances(centroids, chunk).argmin(axis=1)
+
+        counts = np.bincount(assignments, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed empty clusters from random vectors so no list goes unused
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+
+    return centroids, assignments
+
+
+class IVFIndex:
+    """Inverted-file index over float32 vectors"""
+
+    def __init__(self, centroids, offsets, ids, vectors, names=None, nprobe=None, directory=None):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.vectors = vectors
+        self.names = names
+        self.nprobe = nprobe or max(1, len(centroids) // 8)
+        # Where the index was loaded from, if it was
+        self.directory = directory
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, names=None, iterations=20, seed=0):
+        """Cluster `vectors` and lay them out list by list"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n_lists = n_lists or int(np.clip(np.sqrt(len(vectors)), 1, 4096))
+        n_lists = min(n_lists, len(vectors))
+
+        centroids, assignments = kmeans(vectors, n_lists, iterations=iterations, seed=seed)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=n_lists)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        return cls(centroids.astype(np.float32), offsets, order.astype(np.int64),
+                   np.ascontiguousarray(vectors[order]), names=names)
+
+    def save(self, directory):
+        """Write the index as .npy files plus a small JSON manifest"""
+        os.makedirs(directory, exist_ok=True)
+        for name in _FILES:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'index.json'), 'w') as f:
+            json.dump({'nprobe': self.nprobe, 'names': self.names, 'count': len(self)}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open an index written by save(), memory-mapping the arrays"""
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode) for name in _FILES}
+        with open(os.path.join(directory, 'index.json')) as f:
+            manifest = json.load(f)
+        # Centroids are scanned on every query; keep them in memory
+        arrays['centroids'] = np.asarray(arrays['centroids'])
+        arrays['offsets'] = np.asarray(arrays['offsets'])
+        return cls(names=manifest.get('names'), nprobe=manifest.get('nprobe'), directory=directory, **arrays)
+
+    def files(self):
+        """Paths of the files of a loaded index"""
+        return [os.path.join(self.directory, name) for name in (*(f'{name}.npy' for name in _FILES), 'index.json')]
+
+    def search(self, query, k=5, nprobe=None):
+        """Return (ids, squared distances) of the approximate k nearest vectors"""
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+
+        ordered = np.argsort(_squared_distances(self.centroids, query)[0])
+        sizes = np.diff(self.offsets)[ordered]
+        # Probe further lists if the nearest ones hold fewer than k vectors
+        enough = int(np.searchsorted(np.cumsum(sizes), k)) + 1
+        lists = ordered[:max(nprobe, enough)]
+        positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+        if positions.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates = np.concatenate([self.vectors[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        distances = _squared_distances(candidates, query)[0]
+        best = _top_k(distances, min(k, distances.size))
+        return np.asarray(self.ids[positions[best]]), distances[best]
+
+
+def exact_search(vectors, query, k=5):
+    """Brute-force (ids, squared distances) of the k nearest vectors"""
+    query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+    distances = _squared_distances(vectors, query)[0]
+    best = _top_k(distances, min(k, distances.size))
+    return best, distances[best]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the dish signature ANN index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help='build an index from dish signatures')
+    build.add_argument('--signatures', help='.npz written by features.save_signatures; defaults to '
+                                            'features.SIGNATURES_PATH, else the recognizer\'s tag-based signatures')
+    build.add_argument('--out', required=True, help='output directory')
+    build.add_argument('--lists', type=int, help='number of inverted lists (default: sqrt(N))')
+    build.add_argument('--nprobe', type=int, help='lists scanned per query (default: lists / 8)')
+    args = parser.parse_args(argv)
+
+    import features
+    if args.signatures:
+        names, matrix = features.load_signatures(args.signatures)
+    else:
+        # Not the recognizer's matcher: it has no matrix when it serves from an index
+        from foodrecognition import NepaleseFoodRecognizer
+        names, matrix = features.dish_signatures(NepaleseFoodRecognizer().food_database)
+
+    # Index the weighted space so plain Euclidean distance matches the matcher's
+    index = IVFIndex.build(matrix * np.sqrt(features.FEATURE_WEIGHTS), n_lists=args.lists, names=list(names))
+    if args.nprobe:
+        index.nprobe = args.nprobe
+    index.save(args.out)
+    print(f"Indexed {len(index)} dishes in {len(index.centroids)} lists (nprobe={index.nprobe}) -> {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
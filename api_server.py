@@ -0,0 +1,276 @@
+"""
+Headless JSON API for the nutrition engine.
+
+Exposes the catalog, food recommendations, profile metrics and image analysis
+over HTTP so clients other than the Streamlit app (e.g. the mobile app) can
+use them without paying for a Streamlit rerun:
+
+    GET  /healthz
+    GET  /foods/search?q=momo
+    GET  /foods/{food_id}
+    POST /recommendations   {"health_conditions": ["Diabetes"]}
+    POST /recommendations/next  {"remaining": {"calories": 900, "protein": 40, "carbs": 100, "fat": 30},
+                             "health_conditions": ["Diabetes"], "exclude": ["Dal Bhat (1 plate)"], "limit": 10}
+                            foods that best fill the rest of the day (see gap_recommender.py)
+    POST /metrics           {"age": 28, "weight": 58, "height": 162, "gender": "Female",
+                             "activity_level": "Moderate", "goal": "Maintain Weight",
+                             "health_conditions": ["None"]}
+    POST /analyze           image bytes (raw body or multipart field "image"),
+                            optional ?conditions=Diabetes,Hypertension
+    GET  /export?kind=meals&format=csv&user=patient-17&compression=gzip
+                            history streamed from the meal store (see exporter.py)
+
+Catalog and metric lookups are cheap and answered on the event loop. Image
+analysis is CPU-bound: a MicroBatcher (batch_scheduler.py) collects requests
+for up to BATCH_WAIT seconds (or BATCH_SIZE images) and each batch is
+recognized in one call in a worker process. When MAX_QUEUE images are
+already waiting, /analyze answers 503 instead of queueing more.
+
+Run with:
+    python api_server.py --port 8000 --workers 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import exporter
+import nepalifood
+import storage
+from batch_scheduler import MicroBatcher, QueueFull
+from gap_recommender import MAX_RECOMMENDATIONS, get_recommender
+from healthcalc import HealthCalculator
+from profile_metrics import PROFILE_FIELDS, derived_metrics
+
+BATCH_SIZE = 8
+BATCH_WAIT = 0.01
+MAX_QUEUE = 256
+MAX_IMAGE_BYTES = 10 * 2**20
+
+
+def _food_json(name, info):
+    return dict(info, name=name, id=nepalifood.food_id(name))
+
+
+def _foods_json(foods):
+    return [_food_json(name, info) for name, info in foods.items()]
+
+
+def _error(status, message):
+    return JSONResponse({'error': message}, status_code=status)
+
+
+def _finite(value):
+    """float(value); JSON bodies may hold NaN or Infinity, which cannot be answered in JSON"""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+# --- worker process side -------------------------------------------------
+
+def _init_worker():
+    # Parallelism comes from the pool; one OpenCV thread per worker
+    cv2.setNumThreads(1)
+    from foodrecognition import get_recognizer
+    get_recognizer()
+
+
+def analyze_batch(payloads):
+    """Decode and analyze a batch of (image bytes, conditions) in one recognition call"""
+    from foodrecognition import analyze_food_images
+
+    images, conditions, positions = [], [], []
+    results = [{'error': 'Could not decode image'}] * len(payloads)
+    for position, (data, image_conditions) in enumerate(payloads):
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            images.append(image)
+            conditions.append(image_conditions)
+            positions.append(position)
+
+    if images:
+        for position, result in zip(positions, analyze_food_images(images, conditions)):
+            results[position] = result
+    return results
+
+
+# --- event loop side -----------------------------------------------------
+
+def _pool_batch_fn(executor):
+    """Batch function running each batch in the process pool"""
+    def run(payloads):
+        return executor.submit(analyze_batch, payloads).result()
+    return run
+
+
+async def healthz(request):
+    return JSONResponse({'status': 'ok'})
+
+
+async def search(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return _error(400, "Missing query parameter 'q'")
+    return JSONResponse({'query': query, 'results': _foods_json(nepalifood.search_foods(query))})
+
+
+async def food(request):
+    food_id = request.path_params['food_id']
+    if not 0 <= food_id < len(nepalifood.FOOD_NAMES):
+        return _error(404, f"No food with id {food_id}")
+    return JSONResponse(_food_json(nepalifood.FOOD_NAMES[food_id], nepalifood.food_by_id(food_id)))
+
+
+async def _json_body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+async def recommendations(request):
+    body = await _json_body(request)
+    if body is None:
+        return _error(400, "Expected a JSON object")
+    groups = nepalifood.get_food_recommendations(body.get('health_conditions', []), body.get('dietary_preferences'))
+    return JSONResponse({group: _foods_json(foods) for group, foods in groups.items()})
+
+
+async def next_foods(request):
+    body = await _json_body(request)
+    if body is None:
+        return _error(400, "Expected a JSON object")
+    remaining = body.get('remaining')
+    if not isinstance(remaining, dict):
+        return _error(400, "Missing 'remaining' calories and macros")
+    try:
+        gap = {field: _finite(remaining.get(field, 0)) for field in ('calories', 'protein', 'carbs', 'fat')}
+        limit = max(1, int(_finite(body.get('limit', MAX_RECOMMENDATIONS))))
+    except (TypeError, ValueError) as error:
+        return _error(400, f"Invalid request: {error}")
+    ranked = get_recommender().recommend(gap, body.get('health_conditions', []), body.get('exclude', []), limit)
+    return JSONResponse([
+        dict(_food_json(name, nepalifood.NEPALI_FOODS_DATABASE[name]), score=score) for name, score in ranked
+    ])
+
+
+async def metrics(request):
+    body = await _json_body(request)
+    if body is None:
+        return _error(400, "Expected a JSON object")
+    missing = [field for field in PROFILE_FIELDS if field not in body]
+    if missing:
+        return _error(400, f"Missing profile fields: {', '.join(missing)}")
+    try:
+        for field in ('age', 'weight', 'height'):
+            _finite(body[field])
+        result = dict(derived_metrics(body))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError) as error:
+        return _error(400, f"Invalid profile: {error}")
+    result['recommendations'] = HealthCalculator.get_health_recommendations(body, body.get('health_conditions', []))
+    return JSONResponse(result)
+
+
+async def analyze(request):
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('image')
+        if upload is None or isinstance(upload, str):
+            return _error(400, "Missing multipart field 'image'")
+        data = await upload.read()
+    else:
+        data = await request.body()
+
+    if not data:
+        return _error(400, "Empty image")
+    if len(data) > MAX_IMAGE_BYTES:
+        return _error(413, f"Images are limited to {MAX_IMAGE_BYTES // 2**20} MB")
+
+    conditions = [c.strip() for c in request.query_params.get('conditions', '').split(',') if c.strip()] or None
+    try:
+        future = request.app.state.batcher.submit((data, conditions))
+    except QueueFull:
+        return JSONResponse({'error': "Too many images queued, retry shortly"}, status_code=503,
+                            headers={'Retry-After': '1'})
+    result = await asyncio.wrap_future(future)
+    if 'error' in result:
+        return _error(400, result['error'])
+    return JSONResponse(result)
+
+
+async def export(request):
+    params = request.query_params
+    kind, fmt = params.get('kind', 'meals'), params.get('format', 'csv')
+    user_id, compression = params.get('user') or None, params.get('compression') or None
+    try:
+        chunks = exporter.export_chunks(request.app.state.store, kind, fmt, user_id, compression)
+    except (ValueError, RuntimeError) as error:
+        return _error(400, str(error))
+    name = exporter.filename(kind, fmt, user_id, compression)
+    # Starlette pulls the chunks from the store in its thread pool
+    return StreamingResponse(chunks, media_type=exporter.MEDIA_TYPES[fmt],
+                             headers={'Content-Disposition': f'attachment; filename="{name}"'})
+
+
+def create_app(workers=None, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, max_queue=MAX_QUEUE):
+    """Build the Starlette app; the worker pool lives as long as the app runs"""
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        processes = workers or os.cpu_count() or 1
+        app.state.store = storage.MealStore()
+        app.state.executor = ProcessPoolExecutor(processes, initializer=_init_worker)
+        # One dispatcher per process keeps every worker busy with its own batch
+        app.state.batcher = MicroBatcher(_pool_batch_fn(app.state.executor), max_batch=batch_size,
+                                         max_latency=batch_wait, max_queue=max_queue, workers=processes,
+                                         name='api.analyze')
+        try:
+            yield
+        finally:
+            app.state.batcher.close(timeout=5)
+            app.state.executor.shutdown(cancel_futures=True)
+
+    return Starlette(lifespan=lifespan, routes=[
+        Route('/healthz', healthz),
+        Route('/foods/search', search),
+        Route('/foods/{food_id:int}', food),
+        Route('/recommendations', recommendations, methods=['POST']),
+        Route('/recommendations/next', next_foods, methods=['POST']),
+        Route('/metrics', metrics, methods=['POST']),
+        Route('/analyze', analyze, methods=['POST']),
+        Route('/export', export)
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the nutrition engine as a JSON API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, help='recognition processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='most images per recognition batch')
+    parser.add_argument('--batch-wait', type=float, default=BATCH_WAIT,
+                        help='seconds to wait for a batch to fill')
+    parser.add_argument('--max-queue', type=int, default=MAX_QUEUE,
+                        help='images waiting for recognition before /analyze answers 503')
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(create_app(args.workers, args.batch_size, args.batch_wait, args.max_queue),
+                host=args.host, port=args.port, log_level='warning')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,26 @@ from PIL import Image
 import io
 import base64
 
+import importer
+import instrumentation
+import profiling
+import storage
+from autocomplete import Autocomplete
+from batch_scheduler import QueueFull
+from food_search import FoodSearch
+from gap_recommender import get_recommender, nutrient_gap
+from foodrecognition import SCANNER_FOOD_IDS, SCANNER_FOOD_NAMES, get_scan_scheduler
+from instrumentation import timed
+from live_scan import WebRTCProcessor
+from nepalifood import NEPALI_FOODS_DATABASE, food_by_id
+from rules import RULESETS
+from sessions import SessionManager
+
+try:
+    from streamlit_webrtc import webrtc_streamer
+except ImportError:
+    webrtc_streamer = None
+
 # Configure page
 st.set_page_config(
     page_title="Swasthya - Nepalese Fitness App",
@@ -82,43 +102,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'user_profile' not in st.session_state:
-    st.session_state.user_profile = {
-        'name': 'Priya Sharma',
-        'age': 28,
-        'weight': 58,
-        'height': 162,
-        'gender': 'Female',
-        'activity_level': 'Moderate',
-        'goal': 'Maintain Weight',
-        'health_conditions': ['None']
-    }
-
-if 'daily_intake' not in st.session_state:
-    st.session_state.daily_intake = []
-
-if 'exercise_log' not in st.session_state:
-    st.session_state.exercise_log = []
-
-# Nepalese food database
-NEPALI_FOODS = {
-    'Dal Bhat (1 plate)': {'calories': 420, 'protein': 12, 'carbs': 65, 'fat': 8, 'category': 'Main Course'},
-    'Chicken Momo (6 pieces)': {'calories': 340, 'protein': 18, 'carbs': 28, 'fat': 16, 'category': 'Snack'},
-    'Vegetable Momo (6 pieces)': {'calories': 280, 'protein': 8, 'carbs': 32, 'fat': 12, 'category': 'Snack'},
-    'Gundruk Soup (1 bowl)': {'calories': 120, 'protein': 6, 'carbs': 15, 'fat': 4, 'category': 'Soup'},
-    'Sel Roti (2 pieces)': {'calories': 180, 'protein': 3, 'carbs': 28, 'fat': 6, 'category': 'Snack'},
-    'Kheer (1 bowl)': {'calories': 220, 'protein': 6, 'carbs': 35, 'fat': 8, 'category': 'Dessert'},
-    'Chatamari (2 pieces)': {'calories': 240, 'protein': 8, 'carbs': 30, 'fat': 10, 'category': 'Traditional'},
-    'Aloo Tama (1 bowl)': {'calories': 160, 'protein': 4, 'carbs': 22, 'fat': 6, 'category': 'Curry'},
-    'Dhido (1 bowl)': {'calories': 200, 'protein': 4, 'carbs': 40, 'fat': 2, 'category': 'Main Course'},
-    'Sukuti (30g)': {'calories': 120, 'protein': 20, 'carbs': 0, 'fat': 4, 'category': 'Meat'},
-    'Yak Cheese (50g)': {'calories': 180, 'protein': 12, 'carbs': 2, 'fat': 14, 'category': 'Dairy'},
-    'Samay Baji (1 plate)': {'calories': 380, 'protein': 15, 'carbs': 42, 'fat': 18, 'category': 'Traditional'},
-    'Lapsi (1 bowl)': {'calories': 220, 'protein': 4, 'carbs': 45, 'fat': 3, 'category': 'Dessert'},
-    'Newari Khaja Set': {'calories': 450, 'protein': 16, 'carbs': 48, 'fat': 22, 'category': 'Traditional'},
-    'Thukpa (1 bowl)': {'calories': 280, 'protein': 12, 'carbs': 35, 'fat': 10, 'category': 'Soup'}
-}
+# Nepalese food database, shared with the scanner and the food id tables
+NEPALI_FOODS = NEPALI_FOODS_DATABASE
 
 # Health condition meal plans
 HEALTH_MEAL_PLANS = {
@@ -139,62 +124,78 @@ HEALTH_MEAL_PLANS = {
     }
 }
 
-def calculate_bmi(weight, height):
-    """Calculate BMI"""
-    height_m = height / 100
-    return weight / (height_m ** 2)
-
-def get_bmi_category(bmi):
-    """Get BMI category"""
-    if bmi < 18.5:
-        return "Underweight", "#3B82F6"
-    elif bmi < 25:
-        return "Normal", "#22C55E"
-    elif bmi < 30:
-        return "Overweight", "#F59E0B"
-    else:
-        return "Obese", "#EF4444"
+# Scanned meals shown per page of the meal history
+HISTORY_PAGE_SIZE = 12
+# Search results shown per page of the calorie tracker, about a screenful
+SEARCH_PAGE_SIZE = 10
 
-def calculate_daily_calories(profile):
-    """Calculate daily calorie needs using Harris-Benedict equation"""
-    if profile['gender'] == 'Female':
-        bmr = 655 + (9.6 * profile['weight']) + (1.8 * profile['height']) - (4.7 * profile['age'])
-    else:
-        bmr = 66 + (13.7 * profile['weight']) + (5 * profile['height']) - (6.8 * profile['age'])
-    
-    activity_multipliers = {
-        'Sedentary': 1.2,
-        'Light': 1.375,
-        'Moderate': 1.55,
-        'Active': 1.725,
-        'Very Active': 1.9
-    }
-    
-    maintenance = bmr * activity_multipliers[profile['activity_level']]
-    
-    if profile['goal'] == 'Lose Weight':
-        return int(maintenance - 500)
-    elif profile['goal'] == 'Gain Weight':
-        return int(maintenance + 500)
-    else:
-        return int(maintenance)
+@st.cache_resource
+def get_meal_store():
+    """Process-wide meal store with periodic thumbnail compaction"""
+    store = storage.MealStore()
+    store.start_compaction()
+    return store
+
+@st.cache_resource(ttl=3600)
+def get_food_search():
+    """Catalog search index ranked by how often foods are logged; popularity refreshes hourly"""
+    engine = FoodSearch(NEPALI_FOODS)
+    engine.set_popularity(get_meal_store().food_counts())
+    return engine
+
+@st.cache_resource(ttl=3600)
+def get_autocomplete():
+    """Prefix completions over names and aliases, most logged first; kept current with bump()"""
+    return Autocomplete(NEPALI_FOODS, counts=get_meal_store().food_counts())
+
+@st.cache_resource
+def get_session_manager():
+    """Process-wide LRU of user sessions; tabs of the same user share one"""
+    manager = SessionManager(get_meal_store())
+    manager.start_eviction()
+    return manager
+
+def current_user():
+    """Session of the user picked in the sidebar (or with ?user=)"""
+    return get_session_manager().get(st.session_state.get('user_id') or 'default')
 
+@timed("app.analyze_food_image")
 def analyze_food_image(image):
-    """Simulate food recognition and calorie estimation"""
-    # This is a simulation - in a real app, you'd use ML models like YOLOv5 or TensorFlow
-    # For demo purposes, we'll return random Nepali food items
-    import random
-    
-    detected_foods = random.sample(list(NEPALI_FOODS.keys()), random.randint(1, 3))
-    total_calories = sum(NEPALI_FOODS[food]['calories'] for food in detected_foods)
+    """Recognize Nepali foods in an image and estimate calories from portion size
+    Scans from concurrent sessions are batched into one recognition call
+    """
+    return scanner_results(get_scan_scheduler().submit(image).result())
+
+def scanner_results(detections):
+    """Map recognizer detections to app foods; returns (detected_foods, total_calories)"""
+    detected_foods = [
+        {
+            'name': SCANNER_FOOD_NAMES[food['name']],
+            'food_id': SCANNER_FOOD_IDS[food['name']],
+            'calories': food['calories'],
+            'serving_info': food['serving_info']
+        }
+        for food in detections
+    ]
+    total_calories = sum(food['calories'] for food in detected_foods)
     
     return detected_foods, total_calories
 
 def main():
+    instrumentation.count("app.reruns")
+    
+    # Hidden diagnostics page, reached with ?diagnostics=1
+    if st.query_params.get("diagnostics"):
+        diagnostics_page()
+        return
+    
     # Sidebar navigation
     st.sidebar.markdown("# 🏃‍♀️ Swasthya")
     st.sidebar.markdown("*Your Nepalese Health Companion*")
     
+    # Clinics switch between patients here; each user's state is kept server-side
+    st.sidebar.text_input("User ID", value=st.query_params.get("user", "default"), key="user_id")
+    
     page = st.sidebar.selectbox(
         "Navigate to:",
         ["🏠 Dashboard", "📸 Food Scanner", "🍽️ Calorie Tracker", "📅 Meal Planner", 
@@ -216,12 +217,14 @@ def main():
     elif page == "👤 Profile":
         profile_page()
 
+@timed("app.dashboard_page")
 def dashboard_page():
     st.markdown('<div class="main-header"><h1>🏠 Welcome to Swasthya Dashboard</h1><p>Your personalized health journey starts here</p></div>', unsafe_allow_html=True)
     
-    profile = st.session_state.user_profile
-    daily_calories = calculate_daily_calories(profile)
-    consumed_calories = sum(item['calories'] for item in st.session_state.daily_intake)
+    user = current_user()
+    metrics = user.metrics()
+    daily_calories = metrics['daily_calories']
+    consumed_calories = user.intake.total_calories()
     remaining_calories = daily_calories - consumed_calories
     
     # Key metrics
@@ -234,13 +237,13 @@ def dashboard_page():
         st.metric("Calories Remaining", f"{remaining_calories}", f"{remaining_calories - daily_calories//4}")
     
     with col3:
-        bmi = calculate_bmi(profile['weight'], profile['height'])
-        category, color = get_bmi_category(bmi)
-        st.metric("BMI", f"{bmi:.1f}", category)
+        st.metric("BMI", f"{metrics['bmi']:.1f}", metrics['bmi_category'])
     
     with col4:
         st.metric("Daily Goal", f"{daily_calories}", "calories")
     
+    quick_add_strip("dashboard")
+    
     # Progress visualization
     st.subheader("📊 Today's Progress")
     
@@ -254,30 +257,32 @@ def dashboard_page():
         ]
     }
     
-    fig = px.bar(
-        progress_data, 
-        x='Metric', 
-        y='Percentage',
-        title="Daily Goals Progress",
-        color='Percentage',
-        color_continuous_scale=['#EF4444', '#F59E0B', '#22C55E']
-    )
-    fig.update_layout(showlegend=False, height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    with instrumentation.timer("app.dashboard_page.chart"):
+        fig = px.bar(
+            progress_data, 
+            x='Metric', 
+            y='Percentage',
+            title="Daily Goals Progress",
+            color='Percentage',
+            color_continuous_scale=['#EF4444', '#F59E0B', '#22C55E']
+        )
+        fig.update_layout(showlegend=False, height=400)
+        st.plotly_chart(fig, use_container_width=True)
     
     # Recent meals
     st.subheader("🍽️ Recent Meals")
-    if st.session_state.daily_intake:
-        for meal in st.session_state.daily_intake[-3:]:
+    if user.intake:
+        for meal in user.intake[-3:]:
             st.markdown(f"""
             <div class="food-card">
-                <strong>{meal['name']}</strong> - {meal['calories']} calories
-                <br><small>Added at {meal['time']}</small>
+                <strong>{meal.name}</strong> - {meal.calories} calories
+                <br><small>Added at {meal.time}</small>
             </div>
             """, unsafe_allow_html=True)
     else:
         st.info("No meals logged today. Use the Food Scanner or Calorie Tracker to add meals!")
 
+@timed("app.food_scanner_page")
 def food_scanner_page():
     st.markdown('<div class="main-header"><h1>📸 AI Food Scanner</h1><p>Scan your Nepalese food to get instant calorie information</p></div>', unsafe_allow_html=True)
     
@@ -288,65 +293,58 @@ def food_scanner_page():
     </div>
     """, unsafe_allow_html=True)
     
-    # Camera input
-    camera_input = st.camera_input("Take a picture of your food")
+    scan_mode = st.radio("Scan mode", ["📷 Photo", "🎥 Live"], horizontal=True)
     
-    # File upload as alternative
-    st.markdown("**Or upload an image:**")
-    uploaded_file = st.file_uploader("Choose an image...", type=['jpg', 'jpeg', 'png'])
-    
-    image_to_analyze = camera_input or uploaded_file
+    if scan_mode == "🎥 Live":
+        live_scan_section()
+    else:
+        photo_scan_section()
     
-    if image_to_analyze is not None:
-        # Display the image
-        image = Image.open(image_to_analyze)
-        st.image(image, caption="Your Food Image", use_column_width=True)
+    # Results are kept in session state so the add button survives its rerun
+    if st.session_state.get('scan_result'):
+        detected_foods, total_calories = st.session_state.scan_result
         
-        # Analyze button
-        if st.button("🔍 Analyze Food", type="primary"):
-            with st.spinner("Analyzing your food... 🤖"):
-                # Simulate processing time
-                import time
-                time.sleep(2)
-                
-                detected_foods, total_calories = analyze_food_image(image)
-                
-                st.success("✅ Food Analysis Complete!")
-                
-                # Display results
-                st.subheader("🍽️ Detected Foods:")
-                
-                col1, col2 = st.columns([2, 1])
+        if not detected_foods:
+            st.warning("No Nepalese dishes recognized with enough confidence. Try another photo.")
+        else:
+            st.success("✅ Food Analysis Complete!")
+            
+            # Display results
+            st.subheader("🍽️ Detected Foods:")
+            
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                for food in detected_foods:
+                    food_info = food_by_id(food['food_id'])
+                    # Scale the catalog macros to the estimated portion
+                    portion = food['calories'] / food_info['calories']
+                    st.markdown(f"""
+                    <div class="food-card">
+                        <h4>{food['name']}</h4>
+                        <p><strong>Portion:</strong> {food['serving_info']} | 
+                        <strong>Calories:</strong> {food['calories']} | 
+                        <strong>Protein:</strong> {food_info['protein'] * portion:.0f}g | 
+                        <strong>Carbs:</strong> {food_info['carbs'] * portion:.0f}g | 
+                        <strong>Fat:</strong> {food_info['fat'] * portion:.0f}g</p>
+                        <span style="background: #22C55E; color: white; padding: 2px 8px; border-radius: 12px; font-size: 12px;">
+                            {food_info['category']}
+                        </span>
+                    </div>
+                    """, unsafe_allow_html=True)
+            
+            with col2:
+                st.metric("Total Calories", f"{total_calories}")
                 
-                with col1:
+                if st.button("➕ Add to Daily Intake"):
+                    # Keeps a thumbnail of the scan for the meal history
+                    current_user().log_scan(st.session_state.get('scan_image'), detected_foods)
                     for food in detected_foods:
-                        food_info = NEPALI_FOODS[food]
-                        st.markdown(f"""
-                        <div class="food-card">
-                            <h4>{food}</h4>
-                            <p><strong>Calories:</strong> {food_info['calories']} | 
-                            <strong>Protein:</strong> {food_info['protein']}g | 
-                            <strong>Carbs:</strong> {food_info['carbs']}g | 
-                            <strong>Fat:</strong> {food_info['fat']}g</p>
-                            <span style="background: #22C55E; color: white; padding: 2px 8px; border-radius: 12px; font-size: 12px;">
-                                {food_info['category']}
-                            </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-                
-                with col2:
-                    st.metric("Total Calories", f"{total_calories}")
-                    
-                    if st.button("➕ Add to Daily Intake"):
-                        for food in detected_foods:
-                            st.session_state.daily_intake.append({
-                                'name': food,
-                                'calories': NEPALI_FOODS[food]['calories'],
-                                'time': datetime.now().strftime("%H:%M"),
-                                'method': 'Camera Scan'
-                            })
-                        st.success("Foods added to your daily intake!")
-                        st.rerun()
+                        get_autocomplete().bump(food['name'])
+                    del st.session_state.scan_result
+                    st.session_state.pop('scan_image', None)
+                    st.success("Foods added to your daily intake!")
+                    st.rerun()
     
     # Tips for better scanning
     st.markdown("""
@@ -361,9 +359,62 @@ def food_scanner_page():
     </div>
     """, unsafe_allow_html=True)
 
+def photo_scan_section():
+    """Analyze a single photo from the camera or an upload"""
+    # Camera input
+    camera_input = st.camera_input("Take a picture of your food")
+    
+    # File upload as alternative
+    st.markdown("**Or upload an image:**")
+    uploaded_file = st.file_uploader("Choose an image...", type=['jpg', 'jpeg', 'png'])
+    
+    image_to_analyze = camera_input or uploaded_file
+    
+    if image_to_analyze is not None:
+        # Display the image
+        image = Image.open(image_to_analyze)
+        st.image(image, caption="Your Food Image", use_column_width=True)
+        
+        # Analyze button
+        if st.button("🔍 Analyze Food", type="primary"):
+            with st.spinner("Analyzing your food... 🤖"):
+                try:
+                    st.session_state.scan_result = analyze_food_image(image)
+                    st.session_state.scan_image = image
+                except QueueFull:
+                    st.warning("The scanner is busy right now. Please try again in a moment.")
+    else:
+        st.session_state.pop('scan_result', None)
+        st.session_state.pop('scan_image', None)
+
+def live_scan_section():
+    """Live camera scanning; frames are recognized in the streaming thread"""
+    if webrtc_streamer is None:
+        st.info("Live scanning needs the optional streamlit-webrtc package: `pip install streamlit-webrtc`")
+        return
+    
+    context = webrtc_streamer(
+        key="live-scan",
+        video_processor_factory=WebRTCProcessor,
+        media_stream_constraints={"video": True, "audio": False}
+    )
+    
+    if context.video_processor is None:
+        st.caption("Start the camera and point it at your plate.")
+        return
+    
+    # The stream does not trigger reruns, so the snapshot is taken on demand
+    if st.button("📌 Use current detections"):
+        scanner = context.video_processor.scanner
+        st.session_state.scan_result = scanner_results(scanner.current)
+        st.session_state.scan_image = scanner.keyframe
+
+@timed("app.calorie_tracker_page")
 def calorie_tracker_page():
     st.markdown('<div class="main-header"><h1>🍽️ Calorie Tracker</h1><p>Track your daily calorie intake with Nepalese foods</p></div>', unsafe_allow_html=True)
     
+    quick_add_strip("tracker")
+    
     # Search and add foods
     st.subheader("🔍 Add Food to Your Daily Intake")
     
@@ -372,14 +423,22 @@ def calorie_tracker_page():
     with col1:
         search_term = st.text_input("Search for Nepalese foods...", placeholder="e.g., Dal Bhat, Momo, Gundruk")
         
-        # Filter foods based on search
-        filtered_foods = {k: v for k, v in NEPALI_FOODS.items() 
-                         if search_term.lower() in k.lower() or search_term.lower() in v['category'].lower()}
-        
         if search_term:
-            st.write(f"Found {len(filtered_foods)} foods matching '{search_term}':")
+            results = search_results(search_term)
+            
+            # A new search starts again from its first page
+            if st.session_state.get('search_query') != search_term:
+                st.session_state.search_query = search_term
+                st.session_state.search_page = 0
+            pages = max(1, (len(results) + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE)
+            page = min(st.session_state.get('search_page', 0), pages - 1)
+            first = page * SEARCH_PAGE_SIZE
             
-            for food_name, food_info in filtered_foods.items():
+            st.write(f"Found {len(results)} foods matching '{search_term}':")
+            
+            # Only this page's rows get widgets
+            for food_name in results[first:first + SEARCH_PAGE_SIZE]:
+                food_info = NEPALI_FOODS[food_name]
                 col_food, col_cal, col_btn = st.columns([3, 1, 1])
                 
                 with col_food:
@@ -391,19 +450,28 @@ def calorie_tracker_page():
                 
                 with col_btn:
                     if st.button("➕", key=f"add_{food_name}"):
-                        st.session_state.daily_intake.append({
-                            'name': food_name,
-                            'calories': food_info['calories'],
-                            'time': datetime.now().strftime("%H:%M"),
-                            'method': 'Manual Entry'
-                        })
+                        current_user().log_food(food_name, food_info['calories'], method='Manual Entry')
+                        get_autocomplete().bump(food_name)
                         st.success(f"Added {food_name}!")
                         st.rerun()
+            
+            if pages > 1:
+                col_prev, col_page, col_next = st.columns([1, 2, 1])
+                with col_prev:
+                    if st.button("⬅️ Previous", disabled=page == 0, key="search_prev"):
+                        st.session_state.search_page = page - 1
+                        st.rerun()
+                with col_page:
+                    st.caption(f"Page {page + 1} of {pages}")
+                with col_next:
+                    if st.button("Next ➡️", disabled=page >= pages - 1, key="search_next"):
+                        st.session_state.search_page = page + 1
+                        st.rerun()
     
     with col2:
         # Quick stats
-        total_calories = sum(item['calories'] for item in st.session_state.daily_intake)
-        daily_goal = calculate_daily_calories(st.session_state.user_profile)
+        total_calories = current_user().intake.total_calories()
+        daily_goal = current_user().metrics()['daily_calories']
         
         st.metric("Today's Total", f"{total_calories} cal")
         st.metric("Remaining", f"{daily_goal - total_calories} cal")
@@ -415,30 +483,29 @@ def calorie_tracker_page():
     # Today's intake
     st.subheader("📋 Today's Food Intake")
     
-    if st.session_state.daily_intake:
-        intake_df = pd.DataFrame(st.session_state.daily_intake)
-        
+    user = current_user()
+    if user.intake:
         # Display as table
-        for i, meal in enumerate(st.session_state.daily_intake):
+        for i, meal in enumerate(user.intake):
             col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
             
             with col1:
-                st.write(f"**{meal['name']}**")
+                st.write(f"**{meal.name}**")
             with col2:
-                st.write(f"{meal['calories']} cal")
+                st.write(f"{meal.calories} cal")
             with col3:
-                st.write(meal['time'])
+                st.write(meal.time)
             with col4:
                 if st.button("🗑️", key=f"remove_{i}"):
-                    st.session_state.daily_intake.pop(i)
+                    user.remove_food(i)
                     st.rerun()
         
         # Macronutrient breakdown
         st.subheader("📊 Macronutrient Breakdown")
         
-        total_protein = sum(NEPALI_FOODS.get(item['name'], {}).get('protein', 0) for item in st.session_state.daily_intake)
-        total_carbs = sum(NEPALI_FOODS.get(item['name'], {}).get('carbs', 0) for item in st.session_state.daily_intake)
-        total_fat = sum(NEPALI_FOODS.get(item['name'], {}).get('fat', 0) for item in st.session_state.daily_intake)
+        # Servings per food id times the catalog nutrient table
+        totals = user.intake.nutrient_totals()
+        total_protein, total_carbs, total_fat = totals['protein'], totals['carbs'], totals['fat']
         
         macro_data = {
             'Macronutrient': ['Protein', 'Carbohydrates', 'Fat'],
@@ -446,14 +513,126 @@ def calorie_tracker_page():
             'Calories': [total_protein * 4, total_carbs * 4, total_fat * 9]
         }
         
-        fig = px.pie(macro_data, values='Calories', names='Macronutrient', 
-                    title="Calorie Distribution by Macronutrient",
-                    color_discrete_sequence=['#22C55E', '#3B82F6', '#F59E0B'])
-        st.plotly_chart(fig, use_container_width=True)
+        with instrumentation.timer("app.calorie_tracker_page.chart"):
+            fig = px.pie(macro_data, values='Calories', names='Macronutrient', 
+                        title="Calorie Distribution by Macronutrient",
+                        color_discrete_sequence=['#22C55E', '#3B82F6', '#F59E0B'])
+            st.plotly_chart(fig, use_container_width=True)
         
     else:
         st.info("No foods logged today. Start by searching and adding foods above!")
+    
+    next_foods_section()
+    meal_history_section()
+    import_history_section()
 
+def quick_add_strip(section):
+    """One-tap buttons for the foods this user logs most, recent logs weighing more"""
+    user = current_user()
+    foods = user.frequent.top()
+    if not foods:
+        return
+    
+    st.subheader("⚡ Quick Add")
+    columns = st.columns(4)
+    for i, food in enumerate(foods):
+        with columns[i % 4]:
+            if st.button(f"➕ {food['name']} · {food['calories']} cal", key=f"quick_{section}_{food['name']}",
+                         use_container_width=True):
+                user.log_food(food['name'], food['calories'], method='Quick Add')
+                get_autocomplete().bump(food['name'])
+                st.rerun()
+
+@timed("app.search_results")
+def search_results(query):
+    """Food names for a tracker search: the most logged prefix completions first,
+    then the typo-tolerant ranked matches (Devanagari and Romanized spellings too)
+    """
+    names = [name for name, _ in get_autocomplete().complete(query)]
+    seen = set(names)
+    names += [name for name, _ in get_food_search().search(query, limit=None) if name not in seen]
+    return names
+
+def next_foods_section():
+    """Catalog foods that best fill what is left of today's calorie and macro targets"""
+    user = current_user()
+    gap = nutrient_gap(user.metrics(), user.intake.nutrient_totals())
+    # Foods already eaten today are left out for variety
+    eaten = {meal.name for meal in user.intake}
+    suggestions = get_recommender().recommend(gap, user.profile['health_conditions'], exclude=eaten, limit=5)
+    if not suggestions:
+        return
+    
+    st.subheader("🎯 What to Eat Next")
+    st.caption(f"Still to go today: {gap['calories']:.0f} cal · P: {max(gap['protein'], 0):.0f}g | "
+               f"C: {max(gap['carbs'], 0):.0f}g | F: {max(gap['fat'], 0):.0f}g")
+    for food_name, _ in suggestions:
+        food_info = NEPALI_FOODS[food_name]
+        col_food, col_cal, col_btn = st.columns([3, 1, 1])
+        with col_food:
+            st.write(f"**{food_name}**")
+            st.caption(f"P: {food_info['protein']}g | C: {food_info['carbs']}g | F: {food_info['fat']}g | {food_info['category']}")
+        with col_cal:
+            st.write(f"**{food_info['calories']} cal**")
+        with col_btn:
+            if st.button("➕", key=f"next_{food_name}"):
+                user.log_food(food_name, food_info['calories'], method='Manual Entry')
+                get_autocomplete().bump(food_name)
+                st.rerun()
+
+def import_history_section():
+    """Bulk import of meals exported from another tracker"""
+    with st.expander("📥 Import history from another tracker"):
+        st.caption("CSV or JSON with a food name, a date or timestamp and optionally calories and servings.")
+        uploaded = st.file_uploader("Export file", type=['csv', 'json', 'jsonl'], key="history_import")
+        if uploaded is not None and st.button("Import"):
+            user = current_user()
+            with st.spinner("Importing..."):
+                stats = importer.import_file(uploaded, get_meal_store(), user.user_id,
+                                             importer.detect_format(uploaded.name))
+            # Imported rows for today show up in the intake list
+            user.reload()
+            st.success(f"Imported {stats['imported']} of {stats['rows']} rows "
+                       f"({stats['matched']} matched to the catalog, {stats['skipped']} skipped)")
+            if stats['top_unmatched']:
+                st.caption("Not in the catalog: " + ", ".join(name for name, _ in stats['top_unmatched']))
+
+def meal_history_section():
+    """Logged meals, with thumbnails of scans, one page at a time"""
+    store = get_meal_store()
+    user_id = current_user().user_id
+    total = store.count_meals(user_id)
+    if not total:
+        return
+    
+    st.subheader("🖼️ Meal History")
+    
+    pages = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    page = min(st.session_state.get('history_page', 0), pages - 1)
+    
+    # Only this page's thumbnails are read from disk
+    meals = store.meal_page(user_id, page=page, page_size=HISTORY_PAGE_SIZE)
+    columns = st.columns(4)
+    for i, meal in enumerate(meals):
+        with columns[i % 4]:
+            thumbnail = store.load_thumbnail(meal)
+            if thumbnail is not None:
+                st.image(thumbnail, use_column_width=True)
+            st.caption(f"**{meal['name']}** · {meal['calories']} cal · {meal['logged_at'].replace('T', ' ')[:16]}")
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Newer", disabled=page == 0):
+            st.session_state.history_page = page - 1
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {page + 1} of {pages}")
+    with col_next:
+        if st.button("Older ➡️", disabled=page >= pages - 1):
+            st.session_state.history_page = page + 1
+            st.rerun()
+
+@timed("app.meal_planner_page")
 def meal_planner_page():
     st.markdown('<div class="main-header"><h1>📅 Weekly Meal Planner</h1><p>Plan your week with traditional Nepalese cuisine</p></div>', unsafe_allow_html=True)
     
@@ -502,12 +681,8 @@ def meal_planner_page():
         
         with col3:
             if st.button(f"Add to Today", key=f"add_meal_{meal_type}"):
-                st.session_state.daily_intake.append({
-                    'name': meal_info['name'],
-                    'calories': meal_info['calories'],
-                    'time': datetime.now().strftime("%H:%M"),
-                    'method': 'Meal Plan'
-                })
+                current_user().log_food(meal_info['name'], meal_info['calories'], method='Meal Plan')
+                get_autocomplete().bump(meal_info['name'])
                 st.success(f"Added {meal_info['name']} to today's intake!")
         
         total_day_calories += meal_info['calories']
@@ -520,17 +695,18 @@ def meal_planner_page():
     weekly_data = {
         'Day': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
         'Planned Calories': [1450, 1300, 1400, 1500, 1350, 1600, 1200],
-        'Target': [calculate_daily_calories(st.session_state.user_profile)] * 7
+        'Target': [current_user().metrics()['daily_calories']] * 7
     }
     
-    fig = go.Figure()
-    fig.add_trace(go.Bar(name='Planned', x=weekly_data['Day'], y=weekly_data['Planned Calories'], 
-                        marker_color='#22C55E'))
-    fig.add_trace(go.Scatter(name='Target', x=weekly_data['Day'], y=weekly_data['Target'], 
-                           line=dict(color='#EF4444', dash='dash')))
-    
-    fig.update_layout(title="Weekly Meal Plan vs Target Calories", height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    with instrumentation.timer("app.meal_planner_page.chart"):
+        fig = go.Figure()
+        fig.add_trace(go.Bar(name='Planned', x=weekly_data['Day'], y=weekly_data['Planned Calories'], 
+                            marker_color='#22C55E'))
+        fig.add_trace(go.Scatter(name='Target', x=weekly_data['Day'], y=weekly_data['Target'], 
+                               line=dict(color='#EF4444', dash='dash')))
+        
+        fig.update_layout(title="Weekly Meal Plan vs Target Calories", height=400)
+        st.plotly_chart(fig, use_container_width=True)
     
     # Shopping list
     st.subheader("🛒 Shopping List")
@@ -547,6 +723,7 @@ def meal_planner_page():
         for item in items:
             st.checkbox(item, key=f"shop_{item}")
 
+@timed("app.exercise_routine_page")
 def exercise_routine_page():
     st.markdown('<div class="main-header"><h1>💪 Exercise Routine</h1><p>Personalized workouts for your fitness goals</p></div>', unsafe_allow_html=True)
     
@@ -612,13 +789,7 @@ def exercise_routine_page():
         
         with col4:
             if st.button("✅ Complete", key=f"complete_{i}"):
-                st.session_state.exercise_log.append({
-                    'exercise': exercise['name'],
-                    'duration': exercise['duration'],
-                    'calories': exercise['calories'],
-                    'date': datetime.now().strftime("%Y-%m-%d"),
-                    'time': datetime.now().strftime("%H:%M")
-                })
+                current_user().log_exercise(exercise['name'], exercise['duration'], exercise['calories'])
                 st.success(f"Completed {exercise['name']}!")
         
         total_calories += exercise['calories']
@@ -649,6 +820,7 @@ def exercise_routine_page():
     for tip in tips:
         st.write(tip)
 
+@timed("app.health_conditions_page")
 def health_conditions_page():
     st.markdown('<div class="main-header"><h1>🏥 Health Condition Meal Plans</h1><p>Specialized Nepalese meal plans for various health conditions</p></div>', unsafe_allow_html=True)
     
@@ -691,9 +863,12 @@ def health_conditions_page():
     </div>
     """, unsafe_allow_html=True)
 
+@timed("app.profile_page")
 def profile_page():
     st.markdown('<div class="main-header"><h1>👤 User Profile</h1><p>Manage your personal health information</p></div>', unsafe_allow_html=True)
     
+    user = current_user()
+    
     # Edit profile
     with st.form("profile_form"):
         st.subheader("📝 Personal Information")
@@ -701,58 +876,57 @@ def profile_page():
         col1, col2 = st.columns(2)
         
         with col1:
-            name = st.text_input("Name", value=st.session_state.user_profile['name'])
-            age = st.number_input("Age", min_value=1, max_value=120, value=st.session_state.user_profile['age'])
-            weight = st.number_input("Weight (kg)", min_value=1.0, max_value=300.0, value=float(st.session_state.user_profile['weight']))
+            name = st.text_input("Name", value=user.profile['name'])
+            age = st.number_input("Age", min_value=1, max_value=120, value=user.profile['age'])
+            weight = st.number_input("Weight (kg)", min_value=1.0, max_value=300.0, value=float(user.profile['weight']))
         
         with col2:
-            height = st.number_input("Height (cm)", min_value=50, max_value=250, value=st.session_state.user_profile['height'])
+            height = st.number_input("Height (cm)", min_value=50, max_value=250, value=user.profile['height'])
             gender = st.selectbox("Gender", ['Female', 'Male', 'Other'], 
-                                 index=['Female', 'Male', 'Other'].index(st.session_state.user_profile['gender']))
+                                 index=['Female', 'Male', 'Other'].index(user.profile['gender']))
             activity_level = st.selectbox("Activity Level", 
                                         ['Sedentary', 'Light', 'Moderate', 'Active', 'Very Active'],
-                                        index=['Sedentary', 'Light', 'Moderate', 'Active', 'Very Active'].index(st.session_state.user_profile['activity_level']))
+                                        index=['Sedentary', 'Light', 'Moderate', 'Active', 'Very Active'].index(user.profile['activity_level']))
         
         goal = st.selectbox("Primary Goal", 
                            ['Lose Weight', 'Maintain Weight', 'Gain Weight'],
-                           index=['Lose Weight', 'Maintain Weight', 'Gain Weight'].index(st.session_state.user_profile['goal']))
+                           index=['Lose Weight', 'Maintain Weight', 'Gain Weight'].index(user.profile['goal']))
         
         health_conditions = st.multiselect("Health Conditions", 
                                           ['None', 'Diabetes', 'Hypertension', 'Heart Disease', 'Kidney Disease', 'High Cholesterol'],
-                                          default=st.session_state.user_profile['health_conditions'])
+                                          default=user.profile['health_conditions'])
         
         if st.form_submit_button("💾 Save Profile"):
-            st.session_state.user_profile.update({
-                'name': name,
-                'age': age,
-                'weight': weight,
-                'height': height,
-                'gender': gender,
-                'activity_level': activity_level,
-                'goal': goal,
-                'health_conditions': health_conditions
-            })
+            # Saved to the store; the cached metrics are recomputed on next use
+            user.update_profile(
+                name=name,
+                age=age,
+                weight=weight,
+                height=height,
+                gender=gender,
+                activity_level=activity_level,
+                goal=goal,
+                health_conditions=health_conditions
+            )
             st.success("Profile updated successfully!")
             st.rerun()
     
     # Health metrics
     st.subheader("📊 Health Metrics")
     
-    profile = st.session_state.user_profile
-    bmi = calculate_bmi(profile['weight'], profile['height'])
-    category, color = get_bmi_category(bmi)
-    daily_calories = calculate_daily_calories(profile)
+    profile = user.profile
+    metrics = user.metrics()
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("BMI", f"{bmi:.1f}", category)
+        st.metric("BMI", f"{metrics['bmi']:.1f}", metrics['bmi_category'])
     
     with col2:
-        st.metric("Daily Calories", f"{daily_calories}")
+        st.metric("Daily Calories", f"{metrics['daily_calories']}")
     
     with col3:
-        st.metric("Water Goal", "8 glasses")
+        st.metric("Water Goal", f"{metrics['water_liters']} L")
     
     with col4:
         st.metric("Sleep Target", "7-8 hours")
@@ -760,24 +934,70 @@ def profile_page():
     # Recommendations
     st.subheader("🎯 Personalized Recommendations")
     
-    recommendations = []
-    
-    if bmi < 18.5:
-        recommendations.append("Consider increasing calorie intake with healthy Nepali foods like nuts and dairy")
-    elif bmi > 25:
-        recommendations.append("Focus on portion control and include more vegetables in your Dal Bhat")
-    
-    if 'Diabetes' in profile['health_conditions']:
-        recommendations.append("Choose brown rice over white rice and monitor carbohydrate portions")
-    
-    if 'Hypertension' in profile['health_conditions']:
-        recommendations.append("Reduce salt in your cooking and avoid pickled foods")
-    
-    if not recommendations:
-        recommendations.append("Maintain your current healthy lifestyle with balanced Nepali meals!")
+    recommendations = RULESETS['profile_page'].evaluate(profile['health_conditions'], bmi=metrics['exact_bmi'])
     
     for rec in recommendations:
         st.info(rec)
 
+def diagnostics_page():
+    st.markdown('<div class="main-header"><h1>🩺 Diagnostics</h1><p>Per-process timing and counters</p></div>', unsafe_allow_html=True)
+    
+    if instrumentation.ENABLED:
+        metrics = instrumentation.snapshot()
+        
+        st.subheader("⏱️ Timers")
+        if metrics['timers']:
+            st.dataframe(pd.DataFrame(metrics['timers']), use_container_width=True)
+        else:
+            st.info("No timings recorded yet.")
+        
+        st.subheader("🔢 Counters")
+        if metrics['counters']:
+            st.dataframe(pd.DataFrame(
+                {'name': list(metrics['counters']), 'value': list(metrics['counters'].values())}
+            ), use_container_width=True)
+        
+        if st.button("Reset metrics"):
+            instrumentation.reset()
+            st.rerun()
+        
+        with st.expander("Prometheus text"):
+            st.code(instrumentation.render_prometheus(), language="text")
+    else:
+        st.warning("Instrumentation is disabled. Start the app with SWASTHYA_METRICS=1 to collect timings.")
+    
+    # Users whose state is cached in this process
+    st.subheader("👥 Sessions")
+    manager = get_session_manager()
+    st.caption(" · ".join(f"{name}: {value}" for name, value in manager.stats().items()))
+    report = manager.memory_report()
+    if report:
+        st.dataframe(pd.DataFrame(report), use_container_width=True)
+    
+    # Profiles captured with ?profile=1 or SWASTHYA_PROFILE=1
+    st.subheader("🔬 Recent Profiles")
+    captures = profiling.list_captures()
+    
+    if captures:
+        st.dataframe(pd.DataFrame(captures)[['name', 'captured_at', 'size_kb']], use_container_width=True)
+        
+        selected = st.selectbox("Inspect capture", [c['name'] for c in captures])
+        capture = next(c for c in captures if c['name'] == selected)
+        st.code(profiling.summarize(capture['pstats_path']), language="text")
+        
+        with open(capture['pstats_path'], 'rb') as f:
+            st.download_button("Download pstats", f.read(), file_name=f"{selected}.pstats")
+        if capture['collapsed_path']:
+            with open(capture['collapsed_path'], 'rb') as f:
+                st.download_button("Download collapsed stacks", f.read(), file_name=f"{selected}.collapsed")
+    else:
+        st.info(f"No profiles captured yet. Add ?profile=1 to the URL to profile the next rerun (saved to {profiling.PROFILE_DIR}).")
+
+if instrumentation.ENABLED and instrumentation.METRICS_PORT:
+    instrumentation.start_metrics_server()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if profiling.profiling_requested(st.query_params):
+        profiling.capture(main, label="rerun")
+    else:
+        main()
\ No newline at end of file
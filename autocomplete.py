@@ -0,0 +1,152 @@
+"""
+Popularity-ranked autocomplete over food names and aliases.
+
+Every name and alias is normalized like food_search does and inserted into a
+prefix trie from each word start, so 'mom' completes 'Chicken Momo' as well
+as 'Momo ...'. Each trie node keeps the ids of the TOP_K most logged foods
+below it, so completing a prefix is a walk of len(prefix) nodes and a copy
+of at most TOP_K ids, independent of catalog size.
+
+Nodes exist only for the first MAX_DEPTH characters, which bounds memory for
+large catalogs; longer prefixes are answered from a sorted key array (a
+bisect range, usually a handful of keys).
+
+Log counts come from the meal store and are kept current with bump(), which
+touches only the nodes on the food's own paths.
+
+    completer = Autocomplete(counts=store.food_counts())
+    completer.complete('mo')        # [('Chicken Momo (6 pieces)', 120), ...]
+    completer.bump('Sel Roti (2 pieces)')
+"""
+
+import bisect
+import heapq
+import threading
+
+import nepalifood
+from food_search import ALIASES, normalize
+
+TOP_K = 10
+MAX_DEPTH = 8
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        # Item ids, most logged first
+        self.top = []
+
+
+def _keys(text):
+    """Normalized text from each word start: 'chicken momo' -> ['chicken momo', 'momo']"""
+    words = normalize(text)
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class Autocomplete:
+    """Prefix trie over food names and aliases with top-k completions per node"""
+
+    def __init__(self, names=None, aliases=None, counts=None, top_k=TOP_K):
+        self.names = list(nepalifood.FOOD_NAMES if names is None else names)
+        aliases = ALIASES if aliases is None else aliases
+        self.top_k = top_k
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self.counts = [0] * len(self.names)
+        for name, count in (counts or {}).items():
+            item = self._ids.get(name)
+            if item is not None:
+                self.counts[item] = count
+        self._lock = threading.Lock()
+
+        # (key, item) pairs sorted by key, for prefixes deeper than the trie
+        pairs = set()
+        self._item_keys = [[] for _ in self.names]
+        for item, name in enumerate(self.names):
+            for text in [name, *aliases.get(name, ())]:
+                for key in _keys(text):
+                    pairs.add((key, item))
+                    self._item_keys[item].append(key)
+        self._paths = [{key[:MAX_DEPTH] for key in keys} for keys in self._item_keys]
+        pairs = sorted(pairs)
+        self._keys = [key for key, _ in pairs]
+        self._key_items = [item for _, item in pairs]
+
+        # Visiting foods most logged first fills every node's top list in
+        # order, and a node stops accepting once it has top_k foods
+        self.root = _Node()
+        for item in sorted(range(len(self.names)), key=self._rank):
+            for path in self._paths[item]:
+                node = self.root
+                self._offer(node, item)
+                for ch in path:
+                    node = node.children.setdefault(ch, _Node())
+                    self._offer(node, item)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _rank(self, item):
+        # Most logged first, then shorter and alphabetical names
+        return (-self.counts[item], len(self.names[item]), self.names[item])
+
+    def _offer(self, node, item):
+        if len(node.top) < self.top_k and item not in node.top:
+            node.top.append(item)
+
+    def _node(self, prefix):
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def complete_ids(self, prefix, k=None):
+        """Ids of the k most logged foods with a name or alias word starting with prefix"""
+        k = min(k or self.top_k, self.top_k)
+        prefix = ' '.join(normalize(prefix))
+        node = self._node(prefix[:MAX_DEPTH])
+        if node is None:
+            return []
+        if len(prefix) <= MAX_DEPTH:
+            return node.top[:k]
+        # Anything below the deepest node that is missing from its top list
+        # ranks below all of it, so matches found there are the answer
+        matches = [item for item in node.top if any(key.startswith(prefix) for key in self._item_keys[item])]
+        if len(matches) >= k or len(node.top) < self.top_k:
+            return matches[:k]
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + '\uffff', start)
+        return heapq.nsmallest(k, set(self._key_items[start:end]), key=self._rank)
+
+    def complete(self, prefix, k=None):
+        """[(name, log count)] completions of prefix, most logged first"""
+        return [(self.names[item], self.counts[item]) for item in self.complete_ids(prefix, k)]
+
+    def bump(self, name, amount=1):
+        """Count `amount` more logs of a food, updating only the nodes on its paths"""
+        item = self._ids.get(name)
+        if item is None:
+            return
+        with self._lock:
+            self.counts[item] += amount
+            for path in self._paths[item]:
+                node = self.root
+                self._promote(node, item)
+                for ch in path:
+                    node = node.children[ch]
+                    self._promote(node, item)
+
+    def _promote(self, node, item):
+        top = node.top
+        if item in top:
+            top.remove(item)
+        elif len(top) >= self.top_k:
+            if self._rank(item) >= self._rank(top[-1]):
+                return
+            top.pop()
+        # Lists are at most top_k long; keep them sorted by rank
+        ranks = [self._rank(other) for other in top]
+        top.insert(bisect.bisect_left(ranks, self._rank(item)), item)
@@ -0,0 +1,211 @@
+"""
+Micro-batching scheduler.
+
+Callers submit single items and get a `concurrent.futures.Future` back. A
+dispatcher thread takes the first waiting item, keeps collecting until
+`max_batch` items are waiting or `max_latency` seconds have passed since that
+first item arrived, then runs the whole batch through one `batch_fn(items)`
+call and resolves every caller's future with its own result.
+
+A batch function may return an exception instance in place of one item's
+result to fail just that item. If the whole call raises, the items are
+retried one at a time so a single bad item does not fail its neighbours,
+and a result list shorter than the batch fails the items left without one.
+
+The queue is bounded: when `max_queue` items are already waiting, submit()
+raises QueueFull (or blocks, if asked to), so a burst turns into fast
+rejections instead of unbounded latency.
+
+    scheduler = MicroBatcher(recognizer.detect_food_items_batch, max_batch=8, max_latency=0.005)
+    detections = scheduler.submit(image).result()
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import instrumentation
+
+MAX_BATCH = 8
+MAX_LATENCY = 0.005
+MAX_QUEUE = 64
+# Seconds close() waits for room in a full queue before failing what is queued
+CLOSE_TIMEOUT = 5.0
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the scheduler cannot take more work"""
+
+
+class MicroBatcher:
+    """Collects single submissions into batches for one batch function"""
+
+    def __init__(self, batch_fn, max_batch=MAX_BATCH, max_latency=MAX_LATENCY, max_queue=MAX_QUEUE,
+                 workers=1, name='batcher'):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._rejected = 0
+
+        # Several dispatchers let batches overlap when batch_fn releases the
+        # GIL or hands work to other processes
+        self._threads = [
+            threading.Thread(target=self._run, name=f'{name}-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, item, block=False, timeout=None):
+        """Queue one item; returns a Future for its result
+
+        With block=False a full queue raises QueueFull immediately; with
+        block=True the caller waits up to `timeout` seconds for room.
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed")
+        future = Future()
+        try:
+            self._queue.put((item, future, time.perf_counter()), block=block, timeout=timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            instrumentation.count(f'{self.name}.rejected')
+            raise QueueFull(f"{self.name} queue is full") from None
+        return future
+
+    def __call__(self, item):
+        """Submit and wait: a drop-in replacement for the single-item function"""
+        return self.submit(item, block=True).result()
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or due"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[2] + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # Let the other dispatchers see the shutdown signal too
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                self._queue.put(None)
+                return
+
+            live = [(item, future) for item, future, _ in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            with instrumentation.timer(f'{self.name}.batch'):
+                try:
+                    results = self.batch_fn([item for item, _ in live])
+                except Exception as error:
+                    if len(live) == 1:
+                        live[0][1].set_exception(error)
+                    else:
+                        instrumentation.count(f'{self.name}.retried_batches')
+                        for entry in live:
+                            self._run_one(*entry)
+                    results = None
+                except BaseException as error:
+                    for _, future in live:
+                        future.set_exception(error)
+                    continue
+
+            if results is not None:
+                self._resolve(live, results)
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(live)
+
+    def _run_one(self, item, future):
+        """Run a single item of a failed batch on its own"""
+        try:
+            results = self.batch_fn([item])
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            self._resolve([(item, future)], results)
+
+    def _resolve(self, live, results):
+        """Set each future from its result; exception results and missing results fail it"""
+        try:
+            results = list(results)
+        except TypeError as error:
+            results = [error] * len(live)
+        for (_, future), result in zip(live, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        if len(results) < len(live):
+            instrumentation.count(f'{self.name}.missing_results')
+            error = RuntimeError(f"{self.name}: batch function returned {len(results)} results for {len(live)} items")
+            for _, future in live[len(results):]:
+                future.set_exception(error)
+
+    def stats(self):
+        """Batches run, items served, mean batch size, rejections and queue depth"""
+        with self._stats_lock:
+            return {
+                'batches': self._batches,
+                'items': self._items,
+                'mean_batch': self._items / self._batches if self._batches else 0.0,
+                'rejected': self._rejected,
+                'queued': self._queue.qsize()
+            }
+
+    def close(self, timeout=None):
+        """Finish queued work and stop the dispatcher threads
+
+        Waits up to `timeout` seconds (CLOSE_TIMEOUT if None) for room to queue
+        the stop signal; if the dispatchers are stalled and the queue stays
+        full, the queued items fail with RuntimeError instead.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=CLOSE_TIMEOUT if timeout is None else timeout)
+        except queue.Full:
+            self._fail_queued()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _fail_queued(self):
+        """Fail every queued item until the stop signal fits in the queue"""
+        error = RuntimeError(f"{self.name} closed before the item ran")
+        while True:
+            try:
+                self._queue.put_nowait(None)
+                return
+            except queue.Full:
+                pass
+            while True:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None and entry[1].set_running_or_notify_cancel():
+                    entry[1].set_exception(error)
+                    instrumentation.count(f'{self.name}.failed_on_close')
@@ -0,0 +1,139 @@
+"""
+Shared helpers for the micro-benchmark suite: synthetic data, timing and
+baseline storage.
+"""
+
+import contextlib
+import json
+import os
+import statistics
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import nepalifood
+
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+IMAGE_SIZES = [(320, 240), (640, 480), (1280, 960), (1920, 1080), (4032, 3024)]
+
+
+def synthetic_catalog(size):
+    """Build a catalog shaped like NEPALI_FOODS_DATABASE with `size` entries
+
+    Entries reuse the info dicts of the real catalog so a 1M-item catalog only
+    costs the memory of its keys, while category and health-flag filters still
+    see a realistic mix of values.
+    """
+    templates = list(nepalifood.NEPALI_FOODS_DATABASE.items())
+    catalog = {}
+    for i in range(size):
+        base_name, info = templates[i % len(templates)]
+        catalog[f"{base_name} #{i}"] = info
+    return catalog
+
+
+def synthetic_detections(size):
+    """Build a list of `size` detections as returned by detect_food_items"""
+    names = ['Dal Bhat', 'Momo', 'Gundruk Soup', 'Sel Roti', 'Chatamari']
+    return [
+        {
+            'name': names[i % len(names)],
+            'confidence': 0.9,
+            'calories': 100 + (i % 7) * 40,
+            'quantity': 1,
+            'serving_info': '1 serving'
+        }
+        for i in range(size)
+    ]
+
+
+def synthetic_intake(size):
+    """Build a list of `size` intake items with macronutrients"""
+    foods = list(nepalifood.NEPALI_FOODS_DATABASE.values())
+    return [
+        {
+            'calories': foods[i % len(foods)]['calories'],
+            'protein': foods[i % len(foods)]['protein'],
+            'carbs': foods[i % len(foods)]['carbs'],
+            'fat': foods[i % len(foods)]['fat']
+        }
+        for i in range(size)
+    ]
+
+
+def synthetic_image(width, height, seed=0):
+    """Build a random BGR image of the given size"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+@contextlib.contextmanager
+def patched_catalog(catalog):
+    """Temporarily swap nepalifood's module-level database"""
+    original = nepalifood.NEPALI_FOODS_DATABASE
+    nepalifood.NEPALI_FOODS_DATABASE = catalog
+    try:
+        yield
+    finally:
+        nepalifood.NEPALI_FOODS_DATABASE = original
+
+
+def measure(func, repeat=5):
+    """Time `func` and return per-call statistics in seconds"""
+    timer = timeit.Timer(func)
+    # autorange picks a loop count that takes at least 0.2s per repeat
+    number, _ = timer.autorange()
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'max': max(runs),
+        'number': number,
+        'repeat': repeat
+    }
+
+
+def load_baseline(path):
+    """Load stored results, returning an empty mapping if the file is missing"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """Store results as JSON so later runs can be compared against them"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, threshold=1.2):
+    """Compare medians against a baseline and return the regressed entries"""
+    regressions = []
+    for name, by_size in results.items():
+        for size, stats in by_size.items():
+            previous = baseline.get(name, {}).get(size)
+            if not previous:
+                continue
+            ratio = stats['median'] / previous['median']
+            if ratio > threshold:
+                regressions.append((name, size, ratio))
+    return regressions
+
+
+def format_seconds(seconds):
+    """Format a duration with a unit that keeps it readable"""
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.0f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
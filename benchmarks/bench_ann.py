@@ -0,0 +1,70 @@
+"""
+Recall@k and query latency of the IVF dish index versus exact search.
+
+Usage:
+    python benchmarks/bench_ann.py
+    python benchmarks/bench_ann.py --sizes 1000 100000 --nprobe 1 4 16
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import _common
+from ann_index import IVFIndex, exact_search
+from features import FEATURE_DIM
+
+
+def synthetic_embeddings(size, dim=FEATURE_DIM, clusters=64, seed=0):
+    """Clustered vectors, closer to real dish signatures than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.random((clusters, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, size)
+    return centers[labels] + rng.normal(0, 0.05, (size, dim)).astype(np.float32)
+
+
+def timed_queries(search, queries):
+    """Run every query once; return results and mean seconds per query"""
+    start = time.perf_counter()
+    results = [search(query) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'dishes':>8} {'lists':>6} {'nprobe':>7} {f'recall@{args.k}':>10} {'ann query':>12} {'exact query':>12}")
+    for size in args.sizes:
+        vectors = synthetic_embeddings(size)
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.integers(0, size, args.queries)] + \
+            rng.normal(0, 0.05, (args.queries, vectors.shape[1])).astype(np.float32)
+
+        build_start = time.perf_counter()
+        index = IVFIndex.build(vectors)
+        build_seconds = time.perf_counter() - build_start
+
+        exact, exact_seconds = timed_queries(lambda q: exact_search(vectors, q, args.k)[0], queries)
+        truth = [set(ids.tolist()) for ids in exact]
+
+        for nprobe in args.nprobe:
+            if nprobe > len(index.centroids):
+                continue
+            approx, ann_seconds = timed_queries(lambda q: index.search(q, args.k, nprobe=nprobe)[0], queries)
+            recall = np.mean([len(truth[i] & set(ids.tolist())) / args.k for i, ids in enumerate(approx)])
+            print(f"{size:>8} {len(index.centroids):>6} {nprobe:>7} {recall:>10.3f} "
+                  f"{_common.format_seconds(ann_seconds):>12} {_common.format_seconds(exact_seconds):>12}")
+        print(f"{'':>8} build: {_common.format_seconds(build_seconds)}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Load test of the JSON API against a local server.
+
+Starts api_server.py in a subprocess, then drives each endpoint with N
+concurrent keep-alive clients for a fixed time and reports requests/sec and
+latency percentiles.
+
+Usage:
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --concurrency 1 16 64 --duration 10 --workers 4
+    python benchmarks/bench_api.py --url http://127.0.0.1:8000   # existing server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+import _common
+
+PROFILE = {
+    'age': 28, 'weight': 58, 'height': 162, 'gender': 'Female',
+    'activity_level': 'Moderate', 'goal': 'Maintain Weight', 'health_conditions': ['Diabetes']
+}
+
+
+def thali_jpeg():
+    """A synthetic three-dish plate, JPEG encoded"""
+    image = np.full((480, 640, 3), (225, 228, 230), np.uint8)
+    cv2.circle(image, (260, 200), 80, (250, 250, 250), -1)
+    cv2.circle(image, (420, 220), 60, (40, 190, 230), -1)
+    cv2.circle(image, (300, 350), 50, (40, 150, 60), -1)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+def scenarios():
+    """(name, method, path, body, content type) per endpoint"""
+    return [
+        ('search', 'GET', '/foods/search?q=momo', b'', None),
+        ('metrics', 'POST', '/metrics', json.dumps(PROFILE).encode(), 'application/json'),
+        ('analyze', 'POST', '/analyze?conditions=Diabetes', thali_jpeg(), 'image/jpeg'),
+    ]
+
+
+async def _request(reader, writer, host, method, path, body, content_type):
+    """One HTTP/1.1 request on an open keep-alive connection; returns the status code"""
+    headers = [f'{method} {path} HTTP/1.1', f'Host: {host}', f'Content-Length: {len(body)}']
+    if content_type:
+        headers.append(f'Content-Type: {content_type}')
+    writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    length = next((int(line.split(':', 1)[1]) for line in lines[1:] if line.lower().startswith('content-length:')), 0)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, scenario, stop_at, latencies, errors):
+    _, method, path, body, content_type = scenario
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, method, path, body, content_type)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load(host, port, scenario, concurrency, duration):
+    """Run one scenario; returns requests/sec, latency percentiles and error count"""
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, scenario, start + duration, latencies, errors)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0, 0, 0)
+    return {'rps': len(latencies) / elapsed, 'p50': p50, 'p95': p95, 'p99': p99, 'errors': len(errors)}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers):
+    """Launch api_server.py on a free port and wait until it answers"""
+    port = _free_port()
+    command = [sys.executable, os.path.join(_common.ROOT, 'api_server.py'), '--port', str(port)]
+    if workers:
+        command += ['--workers', str(workers)]
+    server = subprocess.Popen(command, cwd=_common.ROOT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server, port
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("API server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='test a running server instead of starting one')
+    parser.add_argument('--workers', type=int, help='recognition processes of the started server')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario and concurrency')
+    parser.add_argument('--filter', help='only run scenarios containing this text')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        server, port = start_server(args.workers)
+        host = '127.0.0.1'
+
+    try:
+        print(f"{'endpoint':<10} {'clients':>8} {'req/s':>10} {'p50':>10} {'p95':>10} {'p99':>10} {'errors':>7}")
+        for scenario in scenarios():
+            if args.filter and args.filter not in scenario[0]:
+                continue
+            for concurrency in args.concurrency:
+                stats = asyncio.run(load(host, port, scenario, concurrency, args.duration))
+                print(f"{scenario[0]:<10} {concurrency:>8} {stats['rps']:>10.1f} "
+                      f"{_common.format_seconds(stats['p50']):>10} {_common.format_seconds(stats['p95']):>10} "
+                      f"{_common.format_seconds(stats['p99']):>10} {stats['errors']:>7}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Benchmarks for prefix autocomplete (autocomplete.py) and the calorie tracker
+search it feeds.
+
+The registered cases time completions over a synthetic catalog; the trie is
+built once per size. Run directly to also see trie build time and the render
+time of the calorie tracker page searching a large catalog, driven through
+Streamlit's AppTest with a throwaway data directory.
+
+Usage:
+    python benchmarks/bench_autocomplete.py
+    python benchmarks/bench_autocomplete.py --sizes 1000 100000 --render-size 50000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import _common
+from autocomplete import Autocomplete
+
+PREFIXES = [
+    ('short', 'm'),
+    ('word', 'momo'),
+    ('second_word', 'bhat'),
+    ('deep', 'chicken mo'),
+    ('miss', 'xyz'),
+]
+RENDER_QUERIES = ['momo', 'dal', 'chiken']
+
+
+def _counts(catalog):
+    return {name: i % 50 for i, name in enumerate(catalog) if i % 7 == 0}
+
+
+def cases(size):
+    """Yield (name, callable) pairs completing prefixes over a synthetic catalog"""
+    catalog = _common.synthetic_catalog(size)
+    completer = Autocomplete(catalog, counts=_counts(catalog))
+    names = list(catalog)
+    for label, prefix in PREFIXES:
+        yield f'complete[{label}]', lambda prefix=prefix: completer.complete(prefix)
+    yield 'bump', lambda: completer.bump(names[size // 2])
+
+
+def render_tracker(size, runs=5):
+    """Median seconds to rerun the tracker page per query, and buttons rendered"""
+    from streamlit.testing.v1 import AppTest
+
+    catalog = _common.synthetic_catalog(size)
+    results = []
+    with tempfile.TemporaryDirectory() as directory, _common.patched_catalog(catalog):
+        os.environ['SWASTHYA_DATA_DIR'] = directory
+        at = AppTest.from_file(os.path.join(_common.ROOT, 'app.py'), default_timeout=600)
+        at.run()
+        at.sidebar.selectbox[0].set_value("🍽️ Calorie Tracker").run()
+        for query in RENDER_QUERIES:
+            at.text_input[0].set_value(query).run()
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                at.run()
+                timings.append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+            results.append((query, statistics.median(timings), len(at.button)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000])
+    parser.add_argument('--render-size', type=int, default=50_000, help='catalog size for the tracker render (0 to skip)')
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        catalog = _common.synthetic_catalog(size)
+        start = time.perf_counter()
+        Autocomplete(catalog, counts=_counts(catalog))
+        print(f"{'build':<28} {size:>10} {_common.format_seconds(time.perf_counter() - start):>12}")
+        for name, func in cases(size):
+            print(f"{name:<28} {size:>10} {_common.format_seconds(_common.measure(func)['median']):>12}")
+
+    if args.render_size:
+        print(f"\nCalorie tracker rerun, {args.render_size} foods")
+        for query, seconds, buttons in render_tracker(args.render_size):
+            print(f"{'render[' + query + ']':<28} {buttons:>6} buttons {_common.format_seconds(seconds):>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Catalog build time (catalog_build.py) for large catalogs.
+
+Writes a synthetic catalog of N foods as CSV, then times reading it,
+validating and deriving fields, and writing the compiled .npz, plus the
+same compile from in-memory columns.
+
+Usage:
+    python benchmarks/bench_catalog_build.py
+    python benchmarks/bench_catalog_build.py --rows 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import _common
+import catalog_build
+
+
+def write_source(path, rows):
+    """CSV of `rows` synthetic foods with the source fields only"""
+    import pandas as pd
+    catalog = _common.synthetic_catalog(rows)
+    columns = catalog_build.columns_from_catalog(catalog)
+    columns.pop('low_sodium', None)
+    pd.DataFrame(columns).to_csv(path, index=False)
+    return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000])
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'compile':>10} {'cli total':>10} {'MB out':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            source = os.path.join(directory, f'foods-{rows}.csv')
+            output = os.path.join(directory, f'foods-{rows}.npz')
+            columns = write_source(source, rows)
+
+            start = time.perf_counter()
+            catalog_build.compile_catalog(columns)
+            compiled = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if catalog_build.main([source, '-o', output]):
+                raise RuntimeError("Catalog build failed")
+            total = time.perf_counter() - start
+            print(f"{rows:>10} {_common.format_seconds(compiled):>10} {_common.format_seconds(total):>10} "
+                  f"{os.path.getsize(output) / 2**20:>8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
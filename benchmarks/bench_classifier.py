@@ -0,0 +1,68 @@
+"""
+Inference time and memory of the CPU food classifier versus image size.
+
+Usage:
+    python benchmarks/bench_classifier.py --model model.int8.onnx
+    python benchmarks/bench_classifier.py --model model.onnx --threads 1 --repeat 20
+"""
+
+import argparse
+import resource
+import sys
+
+import _common
+from classifier import FoodClassifier, load_labels
+from foodrecognition import NepaleseFoodRecognizer
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        # ru_maxrss is the peak in KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (2**20 if sys.platform == 'darwin' else 2**10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--model', required=True, help='path to the .onnx model')
+    parser.add_argument('--labels', help='labels file, one dish name per line')
+    parser.add_argument('--threads', type=int, default=1, help='intra-op threads')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repeats per image size')
+    args = parser.parse_args(argv)
+
+    recognizer = NepaleseFoodRecognizer()
+    labels = load_labels(args.labels) if args.labels else list(recognizer.food_database)
+
+    rss_before = current_rss_mb()
+    classifier = FoodClassifier(args.model, labels, num_threads=args.threads)
+    rss_loaded = current_rss_mb()
+    print(f"backend={classifier.backend} threads={args.threads} model load: +{rss_loaded - rss_before:.1f} MB RSS")
+    print(f"{'image':>12} {'preprocess':>12} {'inference':>12} {'end-to-end':>12} {'rss MB':>9}")
+
+    for width, height in _common.IMAGE_SIZES:
+        image = _common.synthetic_image(width, height)
+        processed = recognizer.preprocess_image(image)
+        classifier.predict([processed])  # warm-up
+
+        preprocess = _common.measure(lambda: recognizer.preprocess_image(image), repeat=args.repeat)
+        inference = _common.measure(lambda: classifier.predict([processed]), repeat=args.repeat)
+        end_to_end = _common.measure(lambda: classifier.predict([recognizer.preprocess_image(image)]),
+                                     repeat=args.repeat)
+
+        label = f"{width}x{height}"
+        print(f"{label:>12} "
+              f"{_common.format_seconds(preprocess['median']):>12} "
+              f"{_common.format_seconds(inference['median']):>12} "
+              f"{_common.format_seconds(end_to_end['median']):>12} "
+              f"{current_rss_mb():>9.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Throughput, output size and peak memory of history exports.
+
+Fills a fresh meal store with N synthetic meals, then runs exporter.py once
+per format and compression in a child process, so the peak RSS reported is
+that of the export alone.
+
+Usage:
+    python benchmarks/bench_exporter.py
+    python benchmarks/bench_exporter.py --rows 10000000 --formats csv parquet
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import _common
+import nepalifood
+import storage
+
+CASES = [('csv', None), ('csv', 'gzip'), ('jsonl', None), ('jsonl', 'gzip'), ('parquet', 'snappy'),
+         ('parquet', 'zstd')]
+USERS = 1000
+
+
+def fill_store(store, rows, batch_size=100_000):
+    """`rows` meals spread over USERS users, one every 10 minutes per user"""
+    names = nepalifood.FOOD_NAMES
+    start = 1_600_000_000
+    for first in range(0, rows, batch_size):
+        store.log_meals([
+            (f'user-{i % USERS}', time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(start + 600 * (i // USERS))),
+             names[i % len(names)], 100 + i % 500, None if i % 4 else '1 serving(s)', 'Import')
+            for i in range(first, min(rows, first + batch_size))
+        ])
+
+
+def run_export(directory, path, fmt, compression):
+    """Export in a child process; returns (seconds, peak RSS in MB)"""
+    command = [sys.executable, os.path.join(_common.ROOT, 'exporter.py'), path, '--format', fmt,
+               '--data-dir', directory]
+    if compression:
+        command += ['--compression', compression]
+    start = time.perf_counter()
+    child = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(child.pid, 0)
+    elapsed = time.perf_counter() - start
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode:
+        raise RuntimeError(f"Export failed: {' '.join(command)}")
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'jsonl', 'parquet'])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = storage.MealStore(directory)
+        start = time.perf_counter()
+        fill_store(store, args.rows)
+        print(f"Filled {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'format':<10} {'compression':<12} {'seconds':>8} {'rows/s':>10} {'MB out':>8} {'peak MB':>8}")
+        for fmt, compression in CASES:
+            if fmt not in args.formats:
+                continue
+            path = os.path.join(directory, 'export.out')
+            seconds, peak = run_export(directory, path, fmt, compression)
+            size = os.path.getsize(path) / 2**20
+            os.remove(path)
+            print(f"{fmt:<10} {compression or '-':<12} {seconds:>8.2f} {args.rows / seconds:>10.0f} "
+                  f"{size:>8.1f} {peak:>8.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
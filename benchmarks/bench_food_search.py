@@ -0,0 +1,48 @@
+"""
+Benchmarks for the ranked, typo-tolerant food search in food_search.py
+
+The index is built once per catalog size; only queries are timed. Run
+directly to also see index build time per size.
+"""
+
+import sys
+import time
+
+import _common
+from food_search import FoodSearch
+
+QUERIES = [
+    ('exact', 'momo'),
+    ('romanized', 'dal bhaat'),
+    ('joined', 'selroti'),
+    ('devanagari', 'मोमो'),
+    ('typo', 'chiken momo'),
+    ('prefix', 'gund'),
+    ('ingredient', 'lentils'),
+    ('miss', 'xyzzy'),
+]
+
+
+def cases(size):
+    """Yield (name, callable) pairs querying a FoodSearch over a synthetic catalog"""
+    catalog = _common.synthetic_catalog(size)
+    engine = FoodSearch(catalog)
+    engine.set_popularity({name: i % 50 for i, name in enumerate(catalog) if i % 7 == 0})
+    for label, query in QUERIES:
+        yield f'search[{label}]', lambda query=query: engine.search(query)
+
+
+def main(argv=None):
+    sizes = [int(size) for size in (argv if argv is not None else sys.argv[1:])] or [1_000, 100_000]
+    for size in sizes:
+        catalog = _common.synthetic_catalog(size)
+        start = time.perf_counter()
+        FoodSearch(catalog)
+        print(f"build {size:>10} {_common.format_seconds(time.perf_counter() - start):>12}")
+        for name, func in cases(size):
+            print(f"{name:<24} {size:>10} {_common.format_seconds(_common.measure(func)['median']):>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
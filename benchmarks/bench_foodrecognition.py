@@ -0,0 +1,31 @@
+"""
+Benchmarks for NepaleseFoodRecognizer in foodrecognition.py
+"""
+
+from features import extract_features
+from foodrecognition import NepaleseFoodRecognizer
+from segmentation import propose_regions
+
+from _common import IMAGE_SIZES, synthetic_detections, synthetic_image
+
+
+def cases(size):
+    """Yield (name, callable) pairs; `size` scales the detection list"""
+    recognizer = NepaleseFoodRecognizer()
+    detections = synthetic_detections(size)
+    conditions = ['Diabetes', 'Hypertension', 'Heart Disease']
+
+    yield 'analyze_nutritional_content', lambda: recognizer.analyze_nutritional_content(detections)
+    yield 'get_health_recommendations', lambda: recognizer.get_health_recommendations(detections, conditions)
+
+
+def image_cases():
+    """Yield (name, callable) pairs for every benchmark image size"""
+    recognizer = NepaleseFoodRecognizer()
+    for width, height in IMAGE_SIZES:
+        image = synthetic_image(width, height)
+        label = f"{width}x{height}"
+        yield f"preprocess_image[{label}]", lambda image=image: recognizer.preprocess_image(image)
+        yield f"extract_features[{label}]", lambda image=image: extract_features(recognizer.preprocess_image(image))
+        yield f"propose_regions[{label}]", lambda image=image: propose_regions(recognizer.preprocess_image(image))
+        yield f"detect_food_items[{label}]", lambda image=image: recognizer.detect_food_items(image)
@@ -0,0 +1,32 @@
+"""
+Benchmarks for the per-user quick-add counters in frequent_foods.py
+
+`size` is the number of meals in the user's history. Logging a food and
+reading the quick-add strip should not depend on it; the rescan case shows
+what recounting the history on every read would cost instead.
+"""
+
+import random
+import time
+from collections import Counter
+
+import _common
+from frequent_foods import FrequentFoods
+
+
+def cases(size):
+    """Yield (name, callable) pairs over a history of `size` meals"""
+    names = list(_common.synthetic_catalog(max(1, min(size, 2_000))))
+    rng = random.Random(0)
+    # Skewed like real logs: a few foods make up most meals
+    history = [names[min(len(names) - 1, int(rng.expovariate(0.05)))] for _ in range(size)]
+    start = time.time() - 3600 * size
+    frequent = FrequentFoods()
+    for i, name in enumerate(history):
+        frequent.add(name, 300, start + 3600 * i)
+
+    favourite, rare = frequent.top()[0]['name'], names[-1]
+    yield 'add[top]', lambda: frequent.add(favourite, 300)
+    yield 'add[other]', lambda: frequent.add(rare, 300)
+    yield 'top', frequent.top
+    yield 'rescan_baseline', lambda: Counter(history).most_common(frequent.size)
@@ -0,0 +1,21 @@
+"""
+Benchmarks for the nutrient gap recommender in gap_recommender.py
+
+The catalog matrices are built once per size; only scoring is timed.
+"""
+
+import _common
+from gap_recommender import GapRecommender
+
+GAPS = [
+    ('morning', {'calories': 1800, 'protein': 110, 'carbs': 200, 'fat': 60}),
+    ('protein_short', {'calories': 400, 'protein': 45, 'carbs': 5, 'fat': 2}),
+]
+
+
+def cases(size):
+    """Yield (name, callable) pairs scoring a synthetic catalog against nutrient gaps"""
+    recommender = GapRecommender(_common.synthetic_catalog(size))
+    for label, gap in GAPS:
+        yield f'recommend[{label}]', lambda gap=gap: recommender.recommend(gap)
+    yield 'recommend[conditions]', lambda: recommender.recommend(GAPS[0][1], ['Diabetes', 'Hypertension'])
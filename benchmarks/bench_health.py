@@ -0,0 +1,42 @@
+"""
+Benchmarks for HealthCalculator and NutritionAnalyzer
+"""
+
+from healthcalc import HealthCalculator, NutritionAnalyzer
+
+from _common import synthetic_intake
+
+PROFILE = {
+    'name': 'Benchmark User',
+    'age': 28,
+    'weight': 58,
+    'height': 162,
+    'gender': 'Female',
+    'activity_level': 'Sedentary',
+    'goal': 'Lose Weight',
+    'health_conditions': ['Diabetes', 'Hypertension', 'Heart Disease']
+}
+
+
+def cases(size):
+    """Yield (name, callable) pairs; `size` scales the intake list"""
+    intake = synthetic_intake(size)
+
+    yield 'analyze_daily_intake', lambda: NutritionAnalyzer.analyze_daily_intake(intake)
+
+
+def fixed_cases():
+    """Yield (name, callable) pairs for methods whose cost does not scale"""
+    conditions = PROFILE['health_conditions']
+
+    yield 'calculate_bmi', lambda: HealthCalculator.calculate_bmi(58, 162)
+    yield 'get_bmi_category', lambda: HealthCalculator.get_bmi_category(22.1)
+    yield 'calculate_bmr', lambda: HealthCalculator.calculate_bmr(58, 162, 28, 'Female')
+    yield 'calculate_daily_calories', lambda: HealthCalculator.calculate_daily_calories(1350, 'Moderate', 'Lose Weight')
+    yield 'calculate_macronutrient_needs', lambda: HealthCalculator.calculate_macronutrient_needs(1800, 'Lose Weight')
+    yield 'calculate_water_needs', lambda: HealthCalculator.calculate_water_needs(58, 'Active')
+    yield 'estimate_calories_burned', lambda: HealthCalculator.estimate_calories_burned('Jogging', 30, 58)
+    yield 'HealthCalculator.get_health_recommendations', lambda: HealthCalculator.get_health_recommendations(
+        PROFILE, conditions)
+    yield 'get_meal_timing_recommendations', NutritionAnalyzer.get_meal_timing_recommendations
+    yield 'suggest_meal_improvements', lambda: NutritionAnalyzer.suggest_meal_improvements([], conditions)
@@ -0,0 +1,74 @@
+"""
+Time and memory of a bulk history import.
+
+Writes a synthetic export with N rows (food names spelled the way other
+trackers spell them, plus some foods that are not in the catalog), imports
+it into a fresh meal store and reports rows/sec and peak memory.
+
+Usage:
+    python benchmarks/bench_importer.py
+    python benchmarks/bench_importer.py --rows 1000000 --format json
+"""
+
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import _common
+import importer
+import storage
+
+SPELLINGS = [
+    'dal bhat', 'Dal-Bhat', 'DAL BHAT (large plate)', 'chicken momo', 'Momo, chicken (steamed)', 'veg momo',
+    'Vegetable Momos', 'gundruk soup', 'sel roti', 'Selroti', 'Thukpa (veg)', 'aloo tama', 'kheer',
+    'Masala Chai', 'Banana', 'Boiled egg', 'Chatamari', 'dhido', 'Samay baji', 'Yak cheese'
+]
+
+
+def write_export(path, rows, fmt):
+    """A synthetic export with `rows` entries, one every 20 minutes"""
+    start = 1_500_000_000
+    with open(path, 'w', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['Date', 'Food', 'Calories', 'Quantity'])
+            for i in range(rows):
+                calories = '' if i % 3 == 0 else 100 + (i * 37) % 400
+                writer.writerow([time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(start + 1200 * i)),
+                                 SPELLINGS[i % len(SPELLINGS)], calories, 1 + i % 2])
+        else:
+            for i in range(rows):
+                f.write(json.dumps({'timestamp': start + 1200 * i, 'food': SPELLINGS[i % len(SPELLINGS)],
+                                    'kcal': 100 + (i * 37) % 400}) + '\n')
+
+
+def _peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>10} {'seconds':>9} {'rows/s':>10} {'matched':>9} {'skipped':>8} {'peak MB':>8}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f'export.{args.format}')
+            write_export(path, rows, args.format)
+            store = storage.MealStore(os.path.join(directory, 'store'))
+            with open(path, newline='') as f:
+                stats = importer.import_file(f, store, 'bench', args.format)
+            print(f"{rows:>10} {stats['seconds']:>9.2f} {stats['rows'] / stats['seconds']:>10.0f} "
+                  f"{stats['matched']:>9} {stats['skipped']:>8} {_peak_mb():>8.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
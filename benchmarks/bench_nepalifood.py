@@ -0,0 +1,26 @@
+"""
+Benchmarks for the catalog query functions in nepalifood.py
+"""
+
+import nepalifood
+
+from _common import patched_catalog, synthetic_catalog
+
+
+def cases(size):
+    """Yield (name, callable) pairs timed against a synthetic catalog
+
+    The catalog stays patched in for as long as the runner iterates, so each
+    callable can be timed without paying for the swap on every call.
+    """
+    catalog = synthetic_catalog(size)
+    with patched_catalog(catalog):
+        yield 'search_foods[name]', lambda: nepalifood.search_foods('momo')
+        yield 'search_foods[ingredient]', lambda: nepalifood.search_foods('lentils')
+        yield 'search_foods[miss]', lambda: nepalifood.search_foods('pizza')
+        yield 'get_foods_by_category', lambda: nepalifood.get_foods_by_category('Snack')
+        yield 'get_diabetic_friendly_foods', nepalifood.get_diabetic_friendly_foods
+        yield 'get_heart_healthy_foods', nepalifood.get_heart_healthy_foods
+        yield 'get_low_sodium_foods', nepalifood.get_low_sodium_foods
+        yield 'get_food_recommendations', lambda: nepalifood.get_food_recommendations(
+            ['Diabetes', 'Hypertension', 'Heart Disease'])
@@ -0,0 +1,95 @@
+"""
+Memory per entry and DataFrame construction time of the intake log.
+
+Compares the old list of dicts with a list of __slots__ entries and the
+struct-of-arrays IntakeLog. Timings also run as part of benchmarks/run.py.
+
+Usage:
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --sizes 1000 1000000
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+import pandas as pd
+
+import _common
+import nepalifood
+from records import IntakeEntry, IntakeLog
+
+METHODS = ['Manual Entry', 'Camera Scan', 'Meal Plan']
+
+
+def synthetic_entries(size):
+    """(name, calories, timestamp, method) tuples drawn from the real catalog"""
+    catalog = _common.synthetic_catalog(30)
+    names = list(catalog)
+    return [
+        (names[i % len(names)], catalog[names[i % len(names)]]['calories'], 1_700_000_000 + 60 * i, METHODS[i % 3])
+        for i in range(size)
+    ]
+
+
+def as_dicts(entries):
+    return [
+        {'name': name, 'calories': calories, 'time': f'{(timestamp // 3600) % 24:02d}:{(timestamp // 60) % 60:02d}',
+         'method': method}
+        for name, calories, timestamp, method in entries
+    ]
+
+
+def as_slots(entries):
+    return [IntakeEntry(name, calories, timestamp, method, 0, 1.0) for name, calories, timestamp, method in entries]
+
+
+def as_log(entries):
+    log = IntakeLog()
+    for name, calories, timestamp, method in entries:
+        log.append(name, calories, method=method, timestamp=timestamp)
+    return log
+
+
+def cases(size):
+    """Yield (name, callable) pairs; `size` is the number of logged entries"""
+    entries = synthetic_entries(size)
+    dicts, log = as_dicts(entries), as_log(entries)
+
+    yield 'DataFrame[dicts]', lambda: pd.DataFrame(dicts)
+    yield 'IntakeLog.to_frame', log.to_frame
+    yield 'total_calories[dicts]', lambda: sum(item['calories'] for item in dicts)
+    yield 'IntakeLog.total_calories', log.total_calories
+    yield 'macro_totals[dicts]', lambda: {
+        field: sum(nepalifood.NEPALI_FOODS_DATABASE.get(item['name'], {}).get(field, 0) for item in dicts)
+        for field in ('protein', 'carbs', 'fat')
+    }
+    yield 'IntakeLog.nutrient_totals', log.nutrient_totals
+
+
+def bytes_per_entry(build, entries):
+    """Traced allocation of build(entries), divided by the entry count"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(entries)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return (after - before) / len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000], help='log lengths')
+    args = parser.parse_args(argv)
+
+    print(f"{'entries':>10} {'dicts':>12} {'slots':>12} {'IntakeLog':>12}   (bytes per entry)")
+    for size in args.sizes:
+        entries = synthetic_entries(size)
+        row = [bytes_per_entry(build, entries) for build in (as_dicts, as_slots, as_log)]
+        print(f"{size:>10} " + ' '.join(f"{value:>12.1f}" for value in row))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Benchmarks for the compiled recommendation rules
+"""
+
+import numpy as np
+
+from rules import RULESETS
+
+CONDITIONS = ['Diabetes', 'Hypertension', 'Heart Disease', 'None']
+FOODS = ['Dal Bhat', 'Momo', 'Gundruk Soup', 'Sel Roti', 'Chatamari']
+ACTIVITY_LEVELS = ['Sedentary', 'Light', 'Moderate', 'Active', 'Very Active']
+
+
+def synthetic_user_days(size, seed=0):
+    """Random condition lists, meals, BMIs and activity levels for `size` user-days"""
+    rng = np.random.default_rng(seed)
+    conditions = [[CONDITIONS[i] for i in np.flatnonzero(row)] for row in rng.random((size, 4)) < 0.2]
+    meals = [[FOODS[i] for i in rng.integers(0, len(FOODS), 3)] for _ in range(size)]
+    bmi = rng.normal(24, 4, size).round(1)
+    activity = np.array(ACTIVITY_LEVELS)[rng.integers(0, len(ACTIVITY_LEVELS), size)]
+    return conditions, meals, bmi, activity
+
+
+def cases(size):
+    """Yield (name, callable) pairs; `size` is the number of user-days"""
+    conditions, meals, bmi, activity = synthetic_user_days(size)
+    scan, profile = RULESETS['scan'], RULESETS['health_profile']
+    scan_conditions, scan_foods = scan.encode_conditions(conditions), scan.encode_foods(meals)
+    profile_conditions = profile.encode_conditions(conditions)
+
+    yield 'encode_conditions', lambda: scan.encode_conditions(conditions)
+    yield 'encode_foods', lambda: scan.encode_foods(meals)
+    yield 'scan.evaluate_batch', lambda: scan.evaluate_batch(scan_conditions, scan_foods)
+    yield 'health_profile.evaluate_batch', lambda: profile.evaluate_batch(
+        profile_conditions, bmi=bmi, activity_level=activity)
+
+
+def fixed_cases():
+    """Yield (name, callable) pairs for single-subject evaluation"""
+    yield 'scan.evaluate', lambda: RULESETS['scan'].evaluate(['Diabetes'], ['Dal Bhat (1 plate)', 'Sel Roti'])
+    yield 'health_profile.evaluate', lambda: RULESETS['health_profile'].evaluate(
+        ['Hypertension'], bmi=27.1, activity_level='Sedentary')
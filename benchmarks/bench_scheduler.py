@@ -0,0 +1,96 @@
+"""
+Scan throughput with and without the micro-batching scheduler.
+
+N client threads scan synthetic photos for a fixed time, either calling
+detect_food_items directly (each call runs alone) or submitting to a
+MicroBatcher in front of detect_food_items_batch. Reports images/sec,
+latency percentiles and the mean batch size per concurrency level.
+
+Usage:
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --concurrency 1 8 32 --max-batch 16 --max-latency 0.01
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import _common
+from batch_scheduler import MAX_BATCH, MAX_LATENCY, MicroBatcher
+from foodrecognition import get_recognizer
+
+
+def thali(seed):
+    """A synthetic plate with a few dishes at random places"""
+    rng = np.random.default_rng(seed)
+    image = np.full((480, 640, 3), (225, 228, 230), np.uint8)
+    for color in [(250, 250, 250), (40, 190, 230), (40, 150, 60)]:
+        center = (int(rng.integers(120, 520)), int(rng.integers(100, 380)))
+        cv2.circle(image, center, int(rng.integers(40, 90)), color, -1)
+    return image
+
+
+def load(scan, images, concurrency, duration):
+    """Run `concurrency` threads calling scan(image); returns images/sec and latencies"""
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset):
+        mine = []
+        i = offset
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            scan(images[i % len(images)])
+            mine.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(mine)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, [50, 99]) if latencies else (0, 0)
+    return {'ips': len(latencies) / elapsed, 'p50': p50, 'p99': p99}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='concurrent scanning threads')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per mode and concurrency')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-latency', type=float, default=MAX_LATENCY)
+    args = parser.parse_args(argv)
+
+    recognizer = get_recognizer()
+    images = [thali(seed) for seed in range(32)]
+    recognizer.detect_food_items(images[0])
+
+    print(f"{'mode':<10} {'threads':>8} {'img/s':>10} {'p50':>10} {'p99':>10} {'batch':>7}")
+    for concurrency in args.concurrency:
+        direct = load(recognizer.detect_food_items, images, concurrency, args.duration)
+        print(f"{'direct':<10} {concurrency:>8} {direct['ips']:>10.1f} {_common.format_seconds(direct['p50']):>10} "
+              f"{_common.format_seconds(direct['p99']):>10} {1:>7.1f}")
+
+        # Unbounded queue: the clients block on their results, not on admission
+        scheduler = MicroBatcher(recognizer.detect_food_items_batch, max_batch=args.max_batch,
+                                 max_latency=args.max_latency, max_queue=0, name='bench_scheduler')
+        batched = load(lambda image: scheduler.submit(image).result(), images, concurrency, args.duration)
+        mean_batch = scheduler.stats()['mean_batch']
+        scheduler.close()
+        print(f"{'batched':<10} {concurrency:>8} {batched['ips']:>10.1f} {_common.format_seconds(batched['p50']):>10} "
+              f"{_common.format_seconds(batched['p99']):>10} {mean_batch:>7.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
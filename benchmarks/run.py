@@ -0,0 +1,101 @@
+"""
+Run the micro-benchmark suite and compare against stored baselines.
+
+Usage:
+    python benchmarks/run.py
+    python benchmarks/run.py --sizes 100 10000 --filter search
+    python benchmarks/run.py --save benchmarks/baselines/main.json
+    python benchmarks/run.py --compare benchmarks/baselines/main.json
+"""
+
+import argparse
+import sys
+
+import _common
+import bench_autocomplete
+import bench_food_search
+import bench_foodrecognition
+import bench_frequent_foods
+import bench_gap_recommender
+import bench_health
+import bench_nepalifood
+import bench_records
+import bench_rules
+
+SIZED_SUITES = [
+    ('nepalifood', bench_nepalifood.cases),
+    ('foodrecognition', bench_foodrecognition.cases),
+    ('health', bench_health.cases),
+    ('rules', bench_rules.cases),
+    ('records', bench_records.cases),
+    ('food_search', bench_food_search.cases),
+    ('autocomplete', bench_autocomplete.cases),
+    ('frequent_foods', bench_frequent_foods.cases),
+    ('gap_recommender', bench_gap_recommender.cases),
+]
+
+FIXED_SUITES = [
+    ('foodrecognition', bench_foodrecognition.image_cases),
+    ('health', bench_health.fixed_cases),
+    ('rules', bench_rules.fixed_cases),
+]
+
+FIXED_SIZE = 'fixed'
+
+
+def run(sizes, repeat, name_filter=None):
+    """Run every suite and return {benchmark: {size: stats}}"""
+    results = {}
+
+    def record(suite, name, size_label, func):
+        full_name = f"{suite}.{name}"
+        if name_filter and name_filter not in full_name:
+            return
+        stats = _common.measure(func, repeat=repeat)
+        results.setdefault(full_name, {})[size_label] = stats
+        print(f"{full_name:<60} {size_label:>10} {_common.format_seconds(stats['median']):>12}")
+
+    for size in sizes:
+        for suite, cases in SIZED_SUITES:
+            for name, func in cases(size):
+                record(suite, name, str(size), func)
+
+    for suite, cases in FIXED_SUITES:
+        for name, func in cases():
+            record(suite, name, FIXED_SIZE, func)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=_common.DEFAULT_SIZES,
+                        help='synthetic catalog sizes to benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repeats per benchmark')
+    parser.add_argument('--filter', dest='name_filter', help='only run benchmarks containing this text')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='compare results against this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='median slowdown ratio that counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.name_filter)
+
+    if args.save:
+        _common.save_baseline(args.save, results)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        baseline = _common.load_baseline(args.compare)
+        regressions = _common.compare(results, baseline, args.threshold)
+        for name, size, ratio in regressions:
+            print(f"REGRESSION {name} [{size}]: {ratio:.2f}x slower than baseline")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
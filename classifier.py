@@ -0,0 +1,123 @@
+"""
+CPU food classifier for the food scanner.
+
+Runs a small image classification network (MobileNet-class, exported to ONNX)
+on a single CPU core. ONNX Runtime is used when it is installed, otherwise the
+model is loaded with OpenCV's DNN module, which ships with opencv-python.
+
+The model is configured with environment variables:
+    SWASTHYA_MODEL_PATH    path to the .onnx model (int8 models recommended)
+    SWASTHYA_MODEL_LABELS  optional labels file, one dish name per line;
+                           defaults to <model path>.labels.txt
+
+Use `quantize_model` (or `python classifier.py quantize in.onnx out.onnx`) to
+produce an int8 model from a float32 export.
+"""
+
+import os
+import sys
+
+import cv2
+import numpy as np
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+MODEL_PATH = os.environ.get('SWASTHYA_MODEL_PATH')
+LABELS_PATH = os.environ.get('SWASTHYA_MODEL_LABELS')
+
+INPUT_SIZE = 224
+# ImageNet normalization used by MobileNet-style backbones
+MEAN_RGB = (0.485, 0.456, 0.406)
+STD_RGB = (0.229, 0.224, 0.225)
+
+
+def load_labels(path):
+    """Read one label per line, skipping blank lines"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _softmax(logits):
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class FoodClassifier:
+    """Batched image classifier returning one probability per label"""
+
+    def __init__(self, model_path, labels, input_size=INPUT_SIZE, num_threads=1):
+        self.model_path = model_path
+        self.labels = list(labels)
+        self.input_size = input_size
+        self.backend = 'onnxruntime' if onnxruntime is not None else 'opencv'
+
+        if self.backend == 'onnxruntime':
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._session = onnxruntime.InferenceSession(
+                model_path, sess_options=options, providers=['CPUExecutionProvider'])
+            self._input_name = self._session.get_inputs()[0].name
+        else:
+            cv2.setNumThreads(num_threads)
+            self._net = cv2.dnn.readNetFromONNX(model_path)
+            self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    @classmethod
+    def from_env(cls, default_labels):
+        """Build the classifier configured by SWASTHYA_MODEL_PATH, or None"""
+        if not MODEL_PATH or not os.path.exists(MODEL_PATH):
+            return None
+        labels_path = LABELS_PATH or MODEL_PATH + '.labels.txt'
+        labels = load_labels(labels_path) if os.path.exists(labels_path) else default_labels
+        return cls(MODEL_PATH, labels)
+
+    def preprocess(self, images):
+        """Turn BGR uint8 images into one normalized NCHW float32 batch"""
+        size = (self.input_size, self.input_size)
+        # blobFromImages resizes, swaps BGR->RGB and scales in one native pass
+        blob = cv2.dnn.blobFromImages(images, scalefactor=1.0 / 255, size=size, swapRB=True, crop=False)
+        blob -= np.array(MEAN_RGB, dtype=np.float32).reshape(1, 3, 1, 1)
+        blob /= np.array(STD_RGB, dtype=np.float32).reshape(1, 3, 1, 1)
+        return blob
+
+    def predict(self, images):
+        """Return an (N, len(labels)) array of class probabilities"""
+        blob = self.preprocess(images)
+
+        if self.backend == 'onnxruntime':
+            outputs = self._session.run(None, {self._input_name: blob})[0]
+        else:
+            self._net.setInput(blob)
+            outputs = self._net.forward()
+
+        outputs = outputs.reshape(len(images), -1)[:, :len(self.labels)].astype(np.float32)
+        # Models exported without a final softmax return logits
+        row_sums = outputs.sum(axis=1)
+        if outputs.min() < 0 or not np.allclose(row_sums, 1.0, atol=1e-3):
+            outputs = _softmax(outputs)
+        return outputs
+
+
+def quantize_model(src_path, dst_path):
+    """Write an int8 dynamically quantized copy of an ONNX model"""
+    if onnxruntime is None:
+        raise RuntimeError("onnxruntime is required for quantization: pip install onnxruntime")
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+    return dst_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == 'quantize':
+        print(quantize_model(sys.argv[2], sys.argv[3]))
+    else:
+        print("Usage: python classifier.py quantize <model.onnx> <model.int8.onnx>")
+        sys.exit(1)
@@ -0,0 +1,202 @@
+"""
+Chunked export of intake and exercise history.
+
+Rows are read from the meal store CHUNK_SIZE at a time and encoded chunk by
+chunk, so neither the rows nor the output are ever held in memory whole:
+
+    csv      header plus one line per row
+    jsonl    one JSON object per line
+    parquet  one row group per chunk (needs the optional pyarrow package)
+
+CSV and JSON Lines can be gzip, bz2 or xz compressed on the fly; for
+Parquet the compression names the column codec (snappy, gzip, zstd...).
+The API server streams the same chunks over HTTP (see api_server.py).
+
+Usage:
+    python exporter.py meals.csv.gz --user patient-17
+    python exporter.py - --kind exercises --format jsonl > exercises.jsonl
+    python exporter.py all.parquet --compression zstd
+"""
+
+import argparse
+import bz2
+import csv
+import io
+import json
+import lzma
+import sys
+import time
+import zlib
+
+import storage
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CHUNK_SIZE = 50_000
+
+KINDS = {
+    'meals': ('id', 'user_id', 'logged_at', 'name', 'calories', 'serving_info', 'method'),
+    'exercises': ('id', 'user_id', 'logged_at', 'exercise', 'duration', 'calories'),
+}
+FORMATS = ('csv', 'jsonl', 'parquet')
+STREAM_COMPRESSIONS = {
+    'gzip': lambda: zlib.compressobj(6, zlib.DEFLATED, 31),
+    'bz2': bz2.BZ2Compressor,
+    'xz': lzma.LZMACompressor,
+}
+# Parquet column types; other columns are strings
+_INTEGER_COLUMNS = {'id', 'calories'}
+MEDIA_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+
+
+def _csv_chunks(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _jsonl_chunks(chunks, columns):
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for rows in chunks:
+        yield ''.join([encode(dict(zip(columns, row))) + '\n' for row in rows]).encode()
+
+
+class _Drain:
+    """Write-only file object whose contents are taken after each write"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _parquet_chunks(chunks, columns, compression):
+    schema = pyarrow.schema([
+        (column, pyarrow.int64() if column in _INTEGER_COLUMNS else pyarrow.string()) for column in columns
+    ])
+    sink = _Drain()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=compression)
+    for rows in chunks:
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def _compressed(chunks, compression):
+    compressor = STREAM_COMPRESSIONS[compression]()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(store, kind='meals', fmt='csv', user_id=None, compression=None, chunk_size=CHUNK_SIZE):
+    """Encoded bytes of an export, one piece per chunk of rows"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown export kind {kind!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    if fmt == 'parquet':
+        # Checked up front: a streaming response cannot fail cleanly halfway
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is required for Parquet export: pip install pyarrow")
+        compression = compression or 'snappy'
+        try:
+            available = pyarrow.Codec.is_available(compression)
+        except ValueError:
+            available = False
+        if not available:
+            raise ValueError(f"Unknown Parquet compression {compression!r}")
+    elif compression and compression not in STREAM_COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}")
+
+    columns = KINDS[kind]
+    rows = store.iter_rows(kind, columns, user_id, chunk_size)
+    if fmt == 'parquet':
+        return _parquet_chunks(rows, columns, compression)
+    chunks = _csv_chunks(rows, columns) if fmt == 'csv' else _jsonl_chunks(rows, columns)
+    return _compressed(chunks, compression) if compression else chunks
+
+
+def export(store, f, kind='meals', fmt='csv', user_id=None, compression=None, chunk_size=CHUNK_SIZE):
+    """Write an export to a binary file object; returns bytes written and seconds taken"""
+    start = time.perf_counter()
+    written = 0
+    for data in export_chunks(store, kind, fmt, user_id, compression, chunk_size):
+        f.write(data)
+        written += len(data)
+    return {'bytes': written, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def filename(kind, fmt, user_id=None, compression=None):
+    """Suggested download name, e.g. 'meals-patient-17.csv.gz'"""
+    suffix = EXTENSIONS.get(compression, '') if fmt != 'parquet' else ''
+    return f"{kind}-{user_id or 'all'}.{fmt}{suffix}"
+
+
+def _guess_format(path):
+    for fmt in FORMATS:
+        if f'.{fmt}' in path:
+            return fmt
+    return 'csv'
+
+
+def _guess_compression(path):
+    for compression, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export intake or exercise history from the meal store')
+    parser.add_argument('path', help="output file, or - for stdout")
+    parser.add_argument('--kind', choices=list(KINDS), default='meals')
+    parser.add_argument('--format', choices=FORMATS, help='default: from the file name')
+    parser.add_argument('--compression', help='gzip, bz2 or xz (Parquet: a column codec); default: from the file name')
+    parser.add_argument('--user', help='only this user (default: everyone)')
+    parser.add_argument('--data-dir', help=f'meal store directory (default: {storage.DATA_DIR})')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows read and encoded at a time')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or _guess_format(args.path)
+    compression = args.compression or (None if fmt == 'parquet' else _guess_compression(args.path))
+    store = storage.MealStore(args.data_dir)
+
+    if args.path == '-':
+        stats = export(store, sys.stdout.buffer, args.kind, fmt, args.user, compression, args.chunk_size)
+    else:
+        with open(args.path, 'wb') as f:
+            stats = export(store, f, args.kind, fmt, args.user, compression, args.chunk_size)
+    print(f"Wrote {stats['bytes'] / 2**20:.1f} MB in {stats['seconds']:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
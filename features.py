@@ -0,0 +1,405 @@
+"""
+Classical computer vision features for Nepalese dishes.
+
+`extract_features` turns an image into a small fixed-length vector (HSV colour
+histograms, colour fractions, contour shape and texture descriptors) computed
+on a thumbnail, so it costs a few milliseconds per image on one CPU core.
+
+Every dish in the recognizer's food_database gets a signature vector in the
+same space. Signatures averaged from labelled photos are built offline (see
+main(), one folder of photos per dish) and loaded from SIGNATURES_PATH;
+without that file they fall back to hand-set prototypes of the dish's
+`visual_features` tags (`golden_color`, `ring_shape`, ...), which are only a
+rough guide. `SignatureMatcher` compares an image against all signatures in
+one vectorized operation and rejects images that are far from every dish.
+
+Usage:
+    python features.py photos/ -o dish_signatures.npz   # photos/<dish name>/*.jpg
+"""
+
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from ann_index import INDEX_PATH, IVFIndex
+
+SIGNATURES_PATH = os.environ.get('SWASTHYA_SIGNATURES_PATH',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dish_signatures.npz'))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# Longest side of the thumbnail the features are computed on
+FEATURE_SIZE = 128
+
+HUE_BINS = 12       # OpenCV hue spans 0-180, so 15 degrees per bin
+SAT_BINS = 4
+VAL_BINS = 4
+
+# Pixels below these are treated as achromatic (white rice, plates, shadows)
+CHROMA_MIN_SAT = 50
+CHROMA_MIN_VAL = 40
+
+FEATURE_NAMES = (
+    [f'hue_{i}' for i in range(HUE_BINS)] +
+    [f'sat_{i}' for i in range(SAT_BINS)] +
+    [f'val_{i}' for i in range(VAL_BINS)] +
+    ['chromatic_fraction', 'white_fraction', 'dark_fraction',
+     'blob_count', 'circularity', 'solidity', 'hole_ratio', 'foreground_fraction',
+     'edge_density', 'texture']
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+FEATURE_DIM = len(FEATURE_NAMES)
+
+# Per-feature weights so each histogram counts about as much as one scalar
+# descriptor group instead of drowning them out by dimension count
+FEATURE_WEIGHTS = np.array(
+    [3.0 / HUE_BINS] * HUE_BINS +
+    [1.0 / SAT_BINS] * SAT_BINS +
+    [1.0 / VAL_BINS] * VAL_BINS +
+    [1.0] * (FEATURE_DIM - HUE_BINS - SAT_BINS - VAL_BINS),
+    dtype=np.float32
+)
+# Plates and table cloths make white share noisy; holes are rare and telling
+FEATURE_WEIGHTS[FEATURE_INDEX['white_fraction']] = 0.5
+FEATURE_WEIGHTS[FEATURE_INDEX['hole_ratio']] = 3.0
+
+MAX_BLOBS = 12
+
+_MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+
+def _thumbnail(image):
+    height, width = image.shape[:2]
+    scale = FEATURE_SIZE / max(height, width)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def _shape_features(saturation):
+    """Blob count, circularity, solidity and hole ratio of the food mask"""
+    blurred = cv2.GaussianBlur(saturation, (5, 5), 0)
+    _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, _MORPH_KERNEL)
+
+    contours, hierarchy = cv2.findContours(mask, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return 0.0, 0.0, 0.0, 0.0, 0.0
+
+    min_area = 0.005 * mask.size
+    areas = np.array([cv2.contourArea(c) for c in contours], dtype=np.float32)
+    parents = hierarchy[0][:, 3]
+    outer = np.flatnonzero((parents < 0) & (areas >= min_area))
+    if outer.size == 0:
+        return 0.0, 0.0, 0.0, 0.0, float(np.count_nonzero(mask)) / mask.size
+
+    largest = outer[np.argmax(areas[outer])]
+    contour = contours[largest]
+    area = float(areas[largest])
+    perimeter = cv2.arcLength(contour, True)
+    hull_area = cv2.contourArea(cv2.convexHull(contour))
+
+    circularity = min(1.0, 4 * np.pi * area / (perimeter * perimeter)) if perimeter else 0.0
+    solidity = area / hull_area if hull_area else 0.0
+    hole_ratio = float(areas[parents == largest].sum()) / area if area else 0.0
+
+    return (
+        min(outer.size, MAX_BLOBS) / MAX_BLOBS,
+        circularity,
+        solidity,
+        min(1.0, hole_ratio),
+        float(np.count_nonzero(mask)) / mask.size
+    )
+
+
+def extract_features(image):
+    """Return the float32 feature vector of a BGR image"""
+    small = _thumbnail(image)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hue, saturation, value = cv2.split(hsv)
+    pixels = float(hue.size)
+
+    chromatic = ((saturation >= CHROMA_MIN_SAT) & (value >= CHROMA_MIN_VAL)).astype(np.uint8)
+    chromatic_count = float(np.count_nonzero(chromatic))
+
+    hue_hist = cv2.calcHist([hue], [0], chromatic, [HUE_BINS], [0, 180]).ravel()
+    hue_hist /= max(chromatic_count, 1.0)
+    sat_hist = cv2.calcHist([saturation], [0], None, [SAT_BINS], [0, 256]).ravel() / pixels
+    val_hist = cv2.calcHist([value], [0], None, [VAL_BINS], [0, 256]).ravel() / pixels
+
+    white_fraction = np.count_nonzero((saturation < CHROMA_MIN_SAT) & (value > 180)) / pixels
+    dark_fraction = np.count_nonzero(value < CHROMA_MIN_VAL) / pixels
+
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    edge_density = np.count_nonzero(cv2.Canny(gray, 50, 150)) / pixels
+    # Laplacian variance grows with fine texture; log-scale it into roughly 0-1
+    texture = min(1.0, np.log1p(cv2.Laplacian(gray, cv2.CV_32F).var()) / 10.0)
+
+    vector = np.empty(FEATURE_DIM, dtype=np.float32)
+    vector[:HUE_BINS] = hue_hist
+    vector[HUE_BINS:HUE_BINS + SAT_BINS] = sat_hist
+    vector[HUE_BINS + SAT_BINS:HUE_BINS + SAT_BINS + VAL_BINS] = val_hist
+    vector[FEATURE_INDEX['chromatic_fraction']] = chromatic_count / pixels
+    vector[FEATURE_INDEX['white_fraction']] = white_fraction
+    vector[FEATURE_INDEX['dark_fraction']] = dark_fraction
+    (vector[FEATURE_INDEX['blob_count']],
+     vector[FEATURE_INDEX['circularity']],
+     vector[FEATURE_INDEX['solidity']],
+     vector[FEATURE_INDEX['hole_ratio']],
+     vector[FEATURE_INDEX['foreground_fraction']]) = _shape_features(saturation)
+    vector[FEATURE_INDEX['edge_density']] = edge_density
+    vector[FEATURE_INDEX['texture']] = texture
+    return vector
+
+
+def extract_features_batch(images):
+    """Return an (N, FEATURE_DIM) matrix for a list of BGR images"""
+    if not images:
+        return np.empty((0, FEATURE_DIM), dtype=np.float32)
+    return np.stack([extract_features(image) for image in images])
+
+
+# Feature values of a plain, unremarkable plate of food
+NEUTRAL_FEATURES = {
+    'chromatic_fraction': 0.4,
+    'white_fraction': 0.35,
+    'dark_fraction': 0.05,
+    'blob_count': 2 / MAX_BLOBS,
+    'circularity': 0.6,
+    'solidity': 0.85,
+    'hole_ratio': 0.0,
+    'foreground_fraction': 0.5,
+    'edge_density': 0.08,
+    'texture': 0.55
+}
+
+# How each visual_features tag in food_database shifts the neutral values.
+# 'hue' entries give the expected share of chromatic pixels per hue bin.
+VISUAL_FEATURE_PROTOTYPES = {
+    'white_rice': {'white_fraction': 0.5, 'chromatic_fraction': 0.3},
+    'yellow_dal': {'hue': {1: 0.55, 2: 0.25, 0: 0.2}},
+    'mixed_colors': {'hue': {0: 0.2, 1: 0.2, 2: 0.2, 3: 0.2, 4: 0.2}, 'blob_count': 4 / MAX_BLOBS},
+    'dumpling_shape': {'blob_count': 6 / MAX_BLOBS, 'circularity': 0.75, 'solidity': 0.92,
+                       'white_fraction': 0.45, 'chromatic_fraction': 0.25},
+    'pleated_edges': {'edge_density': 0.14, 'texture': 0.65},
+    'green_color': {'hue': {2: 0.3, 3: 0.45, 4: 0.25}, 'chromatic_fraction': 0.55},
+    'liquid_consistency': {'texture': 0.35, 'edge_density': 0.04, 'circularity': 0.85,
+                           'solidity': 0.95, 'blob_count': 1 / MAX_BLOBS},
+    'ring_shape': {'hole_ratio': 0.2, 'circularity': 0.8},
+    'golden_color': {'hue': {0: 0.45, 1: 0.55}, 'chromatic_fraction': 0.5},
+    'flat_round': {'circularity': 0.85, 'solidity': 0.95, 'blob_count': 1 / MAX_BLOBS,
+                   'foreground_fraction': 0.6},
+    'crepe_like': {'texture': 0.45, 'edge_density': 0.06, 'hue': {0: 0.3, 1: 0.5, 2: 0.2}}
+}
+
+
+def signature_from_tags(tags):
+    """Build a prototype feature vector from visual_features tags"""
+    values = dict(NEUTRAL_FEATURES)
+    hue = np.zeros(HUE_BINS, dtype=np.float32)
+    hue_sources = 0
+
+    for tag in tags:
+        prototype = VISUAL_FEATURE_PROTOTYPES.get(tag, {})
+        for name, value in prototype.items():
+            if name == 'hue':
+                for bin_index, share in value.items():
+                    hue[bin_index] += share
+                hue_sources += 1
+            else:
+                values[name] = value
+
+    if hue_sources:
+        hue /= hue.sum()
+    else:
+        hue[:] = 1.0 / HUE_BINS
+
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+    vector[:HUE_BINS] = hue
+    # Flat saturation/value histograms: tags say nothing about exposure
+    vector[HUE_BINS:HUE_BINS + SAT_BINS + VAL_BINS] = 1.0 / SAT_BINS
+    for name, value in values.items():
+        vector[FEATURE_INDEX[name]] = value
+    return vector
+
+
+def build_signatures(labelled_images):
+    """Average feature vectors per dish from {dish name: [BGR images]}"""
+    names = sorted(labelled_images)
+    matrix = np.stack([extract_features_batch(labelled_images[name]).mean(axis=0) for name in names])
+    return names, matrix.astype(np.float32)
+
+
+def save_signatures(path, names, matrix):
+    """Store signatures for loading at startup"""
+    np.savez(path, names=np.array(names), matrix=matrix)
+
+
+def load_signatures(path):
+    """Load signatures written by save_signatures"""
+    with np.load(path, allow_pickle=False) as data:
+        return [str(name) for name in data['names']], data['matrix'].astype(np.float32)
+
+
+def load_labelled_images(directory):
+    """{dish name: [BGR images]} from one sub-folder of photos per dish"""
+    labelled = {}
+    for name in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, name)
+        if not os.path.isdir(folder):
+            continue
+        images = [cv2.imread(os.path.join(folder, file)) for file in sorted(os.listdir(folder))
+                  if file.lower().endswith(IMAGE_EXTENSIONS)]
+        images = [image for image in images if image is not None]
+        if images:
+            labelled[name] = images
+    return labelled
+
+
+def dish_signatures(food_database):
+    """(names, matrix) of the dishes in food_database
+
+    Read from SIGNATURES_PATH when it exists (dishes missing from
+    food_database are dropped), else built from visual_features tags.
+    """
+    if SIGNATURES_PATH and os.path.exists(SIGNATURES_PATH):
+        names, matrix = load_signatures(SIGNATURES_PATH)
+        known = [i for i, name in enumerate(names) if name in food_database]
+        return [names[i] for i in known], matrix[known]
+
+    names = list(food_database)
+    matrix = np.stack([signature_from_tags(food_database[name].get('visual_features', [])) for name in names])
+    return names, matrix
+
+
+def _softmax_negative(distances, temperature, reject_distance):
+    """Softmax over negative distances plus an implicit "none of these" option
+
+    The extra option sits at `reject_distance`, so a dish at that distance
+    gets at most half the probability and the shares of the dishes sum to
+    less than 1 for images unlike any of them. Dishes beyond it get 0.
+    """
+    logits = -distances / temperature
+    reject = np.full(logits.shape[:-1] + (1,), -reject_distance / temperature, dtype=logits.dtype)
+    logits = np.concatenate([logits, reject], axis=-1)
+    logits -= logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    probabilities = exp[..., :-1] / exp.sum(axis=-1, keepdims=True)
+    return np.where(distances <= reject_distance, probabilities, 0.0).astype(np.float32)
+
+
+class SignatureMatcher:
+    """Nearest-signature matching over the whole dish catalog
+
+    Large catalogs can be served from an ANN index (see ann_index.py) instead
+    of the in-memory signature matrix. `candidates` then only looks at the
+    probed lists; `distances` and `probabilities` scan every indexed vector.
+    """
+
+    # Softmax temperature on weighted squared distances: a dish 0.07 closer
+    # than another is e times as likely
+    TEMPERATURE = 0.07
+
+    # Weighted squared distance beyond which an image is not taken for a dish.
+    # Plate regions drawn with each dish's colours and shapes fall within
+    # 0.4-0.85 of it; blank, single-colour and noise images are 1.25 or more from all
+    MAX_DISTANCE = 1.0
+
+    # Dishes considered per query
+    CANDIDATES = 5
+
+    def __init__(self, names, matrix, weights=FEATURE_WEIGHTS, index=None):
+        self.names = list(names)
+        self.weights = weights
+        self.index = index
+        self._weight_scale = np.sqrt(weights).astype(np.float32)
+        if matrix is None:
+            self.matrix = None
+        else:
+            self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+            # Scale columns once so each query is one matrix-vector product
+            self._scaled = self.matrix * self._weight_scale
+            self._norms = (self._scaled ** 2).sum(axis=1)
+
+    @classmethod
+    def from_food_database(cls, food_database):
+        """Signatures from the ANN index if SWASTHYA_ANN_INDEX is set, else see dish_signatures()"""
+        if INDEX_PATH and os.path.isdir(INDEX_PATH):
+            index = IVFIndex.load(INDEX_PATH)
+            return cls(index.names, None, index=index)
+        return cls(*dish_signatures(food_database))
+
+    def distances(self, vectors):
+        """Weighted squared distances, shape (N queries, dishes)"""
+        queries = np.atleast_2d(vectors).astype(np.float32) * self._weight_scale
+        query_norms = (queries ** 2).sum(axis=1, keepdims=True)
+        if self.matrix is None:
+            # The index holds weighted vectors ordered by list; ids maps them back to dishes
+            vectors = self.index.vectors
+            norms = np.einsum('ij,ij->i', vectors, vectors)
+            distances = np.empty((len(queries), len(self.names)), dtype=np.float32)
+            distances[:, self.index.ids] = query_norms + norms - 2.0 * queries @ vectors.T
+        else:
+            distances = query_norms + self._norms - 2.0 * queries @ self._scaled.T
+        return np.maximum(distances, 0.0)
+
+    def probabilities(self, vectors):
+        """Softmax over negative distances, shape (N queries, dishes); 0 beyond MAX_DISTANCE"""
+        return _softmax_negative(self.distances(vectors), self.TEMPERATURE, self.MAX_DISTANCE)
+
+    def candidates(self, vector, k=None):
+        """Return (names, probabilities) of the k nearest dishes to one vector
+
+        Without an index the probabilities are those of `probabilities`, over
+        the whole catalog. With an index only the k candidates are known, so
+        the softmax runs over them and the "none of these" option alone; the
+        dishes left out would each have taken a share, so these values are an
+        upper bound on the catalog-wide ones, close to it when the k-th
+        candidate is already well behind the first.
+        """
+        k = k or self.CANDIDATES
+        if self.index is None:
+            return self.candidates_batch(np.atleast_2d(vector), k)[0]
+        ids, distances = self.index.search(np.asarray(vector, dtype=np.float32) * self._weight_scale, k)
+        if ids.size == 0:
+            return [], np.empty(0, dtype=np.float32)
+        return [self.names[i] for i in ids], _softmax_negative(distances, self.TEMPERATURE, self.MAX_DISTANCE)
+
+    def candidates_batch(self, vectors, k=None):
+        """`candidates` for every row of an (N, FEATURE_DIM) matrix
+
+        Without an index all rows are scored with a single matrix product.
+        """
+        if self.index is not None:
+            return [self.candidates(vector, k) for vector in vectors]
+
+        k = min(k or self.CANDIDATES, len(self.names))
+        probabilities = self.probabilities(vectors)
+        ids = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+        nearest = np.take_along_axis(probabilities, ids, axis=1)
+        return [([self.names[i] for i in row], nearest[n]) for n, row in enumerate(ids)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build dish signatures from labelled photos')
+    parser.add_argument('photos', help='folder with one sub-folder of photos per dish, named like the dish')
+    parser.add_argument('-o', '--output', default=SIGNATURES_PATH, help=f'signatures file (default: {SIGNATURES_PATH})')
+    args = parser.parse_args(argv)
+
+    labelled = load_labelled_images(args.photos)
+    if not labelled:
+        print(f"No photos found under {args.photos}", file=sys.stderr)
+        return 1
+    names, matrix = build_signatures(labelled)
+    save_signatures(args.output, names, matrix)
+    for name in names:
+        print(f"  {name}: {len(labelled[name])} photos")
+    print(f"Wrote {len(names)} signatures to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
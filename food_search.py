@@ -0,0 +1,314 @@
+"""
+Food search that tolerates the ways people spell Nepali dishes.
+
+Text goes through the same normalization at index and query time:
+    - Devanagari is transliterated ('मोमो' -> 'momo', 'दाल भात' -> 'daal bhaat')
+    - accents and joiners are dropped ('mo:mo' -> 'momo', 'Dal-Bhat' -> 'dal bhat')
+    - common Romanization variants fold together ('bhaat' -> 'bhat',
+      'kheer'/'khir', 'aloo'/'alu', 'chhoila'/'choila')
+Adjacent words are also indexed joined, so 'selroti' finds 'Sel Roti'.
+
+Typos are matched with a SymSpell-style index: every term is stored under
+each string obtained by deleting up to MAX_EDIT_DISTANCE characters, so the
+candidates of a query word are found by dictionary lookups of its own
+deletions, then verified with a real edit distance. The last query word also
+matches as a prefix, for search-as-you-type.
+
+Each catalog field has postings (term -> item ids, stored as CSR arrays). A food's score for a
+query word is the best match quality times the field weight; foods must match
+every word, and the mean over words plus an exact-name bonus and a
+popularity boost gives the ranking.
+
+    engine = FoodSearch()
+    engine.set_popularity({'Chicken Momo (6 pieces)': 120})
+    engine.search('mo:mo')   # [('Chicken Momo (6 pieces)', 1.2), ...]
+"""
+
+import bisect
+import math
+import re
+import unicodedata
+
+import numpy as np
+
+import nepalifood
+
+MAX_RESULTS = 20
+MAX_EDIT_DISTANCE = 2
+# Candidate terms taken for a prefix; short prefixes match many terms
+MAX_PREFIX_TERMS = 256
+POPULARITY_WEIGHT = 0.2
+EXACT_NAME_BONUS = 1.0
+
+FIELD_WEIGHTS = {'name': 1.0, 'alias': 0.9, 'ingredient': 0.5, 'category': 0.5}
+QUALITY_EXACT = 1.0
+QUALITY_PREFIX = 0.85
+QUALITY_EDIT = {1: 0.7, 2: 0.5}
+
+# Other names people search catalog foods by
+ALIASES = {
+    'Dal Bhat (1 plate)': ['dal bhat tarkari', 'daal bhaat', 'दाल भात'],
+    'Chicken Momo (6 pieces)': ['mo:mo', 'dumplings', 'मोमो'],
+    'Vegetable Momo (6 pieces)': ['veg momo', 'dumplings', 'मोमो'],
+    'Cauliflower Momo (6 pieces)': ['cauli momo', 'मोमो'],
+    'Gundruk Soup (1 bowl)': ['fermented greens soup', 'गुन्द्रुक'],
+    'Samay Baji (1 plate)': ['samya baji', 'समय बजि'],
+    'Chatamari (2 pieces)': ['newari pizza', 'rice crepe', 'चतामरी'],
+    'Aloo Tama (1 bowl)': ['potato bamboo shoot curry', 'आलु तामा'],
+    'Dhido (1 bowl)': ['dhindo', 'ढिडो'],
+    'Kheer (1 bowl)': ['rice pudding', 'खीर'],
+    'Sel Roti (2 pieces)': ['ring doughnut', 'सेल रोटी'],
+    'Sukuti (30g)': ['dried meat', 'सुकुटी'],
+    'Thukpa (1 bowl)': ['noodle soup', 'थुक्पा'],
+    'Lapsi (1 bowl)': ['hog plum', 'लप्सी'],
+    'Yak Cheese (50g)': ['chhurpi', 'छुर्पी'],
+}
+
+_VOWELS = {'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu', 'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai',
+           'ओ': 'o', 'औ': 'au'}
+_VOWEL_SIGNS = {'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri', 'े': 'e', 'ै': 'ai', 'ो': 'o',
+                'ौ': 'au'}
+_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'ng', 'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n', 'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm', 'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh',
+    'ष': 'sh', 'स': 's', 'ह': 'h'
+}
+_MARKS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'}
+_DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+_VIRAMA = '्'
+_NUKTA = '़'
+
+# Applied in order after lowercasing; then doubled letters collapse
+_SPELLING_RULES = [('chh', 'ch'), ('ee', 'i'), ('ii', 'i'), ('oo', 'u'), ('uu', 'u'), ('sh', 's')]
+_JOINERS = re.compile(r"[:'’`.]")
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+_DOUBLED = re.compile(r'(.)\1+')
+_SERVING = re.compile(r'\([^)]*\)')
+
+
+def transliterate(text):
+    """Romanize Devanagari; other characters pass through
+
+    Consonants carry an inherent 'a' unless a vowel sign or virama follows;
+    it is dropped at the end of a word, as in speech ('भात' -> 'bhaat').
+    """
+    out = []
+    pending = False
+    for ch in text:
+        if ch in _CONSONANTS:
+            if pending:
+                out.append('a')
+            out.append(_CONSONANTS[ch])
+            pending = True
+            continue
+        if ch in _VOWEL_SIGNS:
+            out.append(_VOWEL_SIGNS[ch])
+        elif ch == _VIRAMA:
+            pass
+        elif ch == _NUKTA:
+            continue
+        else:
+            if pending and ch in _MARKS:
+                out.append('a')
+            out.append(_VOWELS.get(ch) or _MARKS.get(ch) or _DIGITS.get(ch) or ch)
+        pending = False
+    return ''.join(out)
+
+
+def _fold(word):
+    for old, new in _SPELLING_RULES:
+        word = word.replace(old, new)
+    return _DOUBLED.sub(r'\1', word)
+
+
+def normalize(text):
+    """Normalized words of a text, e.g. 'Mo:Mo (6 pcs)' -> ['momo', '6', 'pcs']"""
+    text = text.lower()
+    if not text.isascii():
+        text = transliterate(text)
+        text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(' ', _JOINERS.sub('', text))
+    return [_fold(word) for word in text.split()]
+
+
+def _with_joins(words):
+    """Words plus each adjacent pair of alphabetic words written together"""
+    return words + [a + b for a, b in zip(words, words[1:]) if a.isalpha() and b.isalpha()]
+
+
+def _deletes(term, distance):
+    """Strings obtained by deleting up to `distance` characters of term"""
+    found = {term}
+    frontier = {term}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier if len(word) > 1 for i in range(len(word))}
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def allowed_distance(word):
+    """Typos tolerated in a query word of this length"""
+    if len(word) < 4 or not word.isalpha():
+        return 0
+    return 1 if len(word) < 7 else MAX_EDIT_DISTANCE
+
+
+class FoodSearch:
+    """Ranked, typo-tolerant search over a catalog like NEPALI_FOODS_DATABASE"""
+
+    def __init__(self, catalog=None, aliases=None):
+        self.catalog = nepalifood.NEPALI_FOODS_DATABASE if catalog is None else catalog
+        self.names = list(self.catalog)
+        aliases = ALIASES if aliases is None else aliases
+        # Items by their whole normalized name, for the exact-name bonus
+        self.exact_names = {}
+
+        # Term ids are shared by all fields; each field collects (term id, item) pairs
+        self.term_ids = {}
+        pairs = {field: ([], []) for field in FIELD_WEIGHTS}
+        # Ingredient and category texts repeat across foods; normalize each once
+        memo = {}
+
+        def words_of(text):
+            words = memo.get(text)
+            if words is None:
+                words = memo[text] = normalize(text)
+            return words
+
+        for item, (name, info) in enumerate(self.catalog.items()):
+            name_words = normalize(_SERVING.sub(' ', name))
+            self.exact_names.setdefault(' '.join(name_words), []).append(item)
+            fields = {
+                'name': _with_joins(name_words),
+                'alias': [term for alias in aliases.get(name, ()) for term in _with_joins(words_of(alias))],
+                'ingredient': [term for ingredient in info.get('ingredients', ()) for term in words_of(ingredient)],
+                'category': words_of(info.get('category', ''))
+            }
+            for field, terms in fields.items():
+                term_list, item_list = pairs[field]
+                for term in set(terms):
+                    term_list.append(self.term_ids.setdefault(term, len(self.term_ids)))
+                    item_list.append(item)
+
+        # Postings in CSR form: the items of term t in a field are
+        # items[offsets[t]:offsets[t + 1]], one array per field
+        self.postings = {}
+        for field, (term_list, item_list) in pairs.items():
+            terms = np.array(term_list, dtype=np.int64)
+            order = np.argsort(terms, kind='stable')
+            offsets = np.zeros(len(self.term_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(terms, minlength=len(self.term_ids)), out=offsets[1:])
+            self.postings[field] = (offsets, np.array(item_list, dtype=np.int32)[order])
+        self.vocabulary = sorted(self.term_ids)
+
+        self.deletes = {}
+        for term in self.vocabulary:
+            if not term.isalpha():
+                continue
+            for deleted in _deletes(term, MAX_EDIT_DISTANCE):
+                self.deletes.setdefault(deleted, []).append(term)
+
+        self.popularity = np.zeros(len(self.names), dtype=np.float32)
+        self._name_ids = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def set_popularity(self, counts):
+        """Boost foods by how often they are logged, from {name: count}"""
+        popularity = np.zeros(len(self.names), dtype=np.float32)
+        for name, count in counts.items():
+            item = self._name_ids.get(name)
+            if item is not None:
+                popularity[item] = math.log1p(count)
+        peak = popularity.max(initial=0.0)
+        self.popularity = popularity / peak if peak > 0 else popularity
+
+    def candidates(self, word, prefix=False):
+        """{term: match quality} of the indexed terms a query word can mean"""
+        found = {word: QUALITY_EXACT} if word in self.term_ids else {}
+        distance = allowed_distance(word)
+        if distance:
+            for deleted in _deletes(word, distance):
+                for term in self.deletes.get(deleted, ()):
+                    if term not in found:
+                        d = edit_distance(word, term, distance)
+                        if d <= distance:
+                            found[term] = QUALITY_EDIT[d]
+
+        if prefix and len(word) >= 2:
+            start = bisect.bisect_left(self.vocabulary, word)
+            for term in self.vocabulary[start:start + MAX_PREFIX_TERMS]:
+                if not term.startswith(word):
+                    break
+                if found.get(term, 0.0) < QUALITY_PREFIX:
+                    found[term] = QUALITY_PREFIX
+        return found
+
+    def _word_scores(self, word, prefix):
+        scores = np.zeros(len(self.names), dtype=np.float32)
+        for term, quality in self.candidates(word, prefix).items():
+            term_id = self.term_ids[term]
+            for field, weight in FIELD_WEIGHTS.items():
+                offsets, postings = self.postings[field]
+                items = postings[offsets[term_id]:offsets[term_id + 1]]
+                if len(items):
+                    scores[items] = np.maximum(scores[items], quality * weight)
+        return scores
+
+    def scores(self, query):
+        """Relevance of every catalog item for a query (0 = no match)"""
+        words = normalize(query)
+        if not words:
+            return np.zeros(len(self.names), dtype=np.float32)
+        per_word = [self._word_scores(word, prefix=i == len(words) - 1) for i, word in enumerate(words)]
+        total = np.sum(per_word, axis=0) / len(words)
+        matched_all = np.logical_and.reduce([scores > 0 for scores in per_word])
+        # Prefer foods matching every word; fall back to any word
+        if matched_all.any():
+            total = np.where(matched_all, total, 0.0)
+
+        exact = self.exact_names.get(' '.join(words))
+        if exact:
+            total[exact] += EXACT_NAME_BONUS
+        return np.where(total > 0, total + POPULARITY_WEIGHT * self.popularity, 0.0)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """[(name, score)] best first; limit=None returns every match"""
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores)
+        if limit is not None and len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        order = hits[np.lexsort((hits, -scores[hits]))]
+        return [(self.names[item], float(scores[item])) for item in order]
+
+
+_engine = None
+
+
+def get_engine():
+    """Shared engine over nepalifood's current catalog, rebuilt if the catalog is replaced"""
+    global _engine
+    if _engine is None or _engine.catalog is not nepalifood.NEPALI_FOODS_DATABASE:
+        _engine = FoodSearch()
+    return _engine
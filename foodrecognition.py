@@ -1,17 +1,39 @@
 """
 Food Recognition Module for Nepalese Cuisine
-This module simulates AI-powered food recognition for Nepalese dishes.
-In a production environment, this would use computer vision models.
+Recognizes Nepalese dishes with a CPU classifier (see classifier.py) when a
+model is configured, and otherwise by matching classical image features
+against per-dish signatures (see features.py).
 """
 
 import cv2
 import numpy as np
 from PIL import Image
-import random
+
+from batch_scheduler import MicroBatcher
+from classifier import FoodClassifier
+from features import SignatureMatcher, extract_features_batch
+from instrumentation import timed
+from nepalifood import food_id
+from portion import count_pieces_in_regions, estimate_servings
+from rules import RULESETS
+from segmentation import MAX_REGIONS, crop, is_flat, propose_regions, whole_image_region
+
+# Most dishes reported for a single photo
+MAX_DETECTIONS = MAX_REGIONS
+
+# Recognizer dish names mapped to the matching tracker entries
+SCANNER_FOOD_NAMES = {
+    'Dal Bhat': 'Dal Bhat (1 plate)',
+    'Momo': 'Chicken Momo (6 pieces)',
+    'Gundruk Soup': 'Gundruk Soup (1 bowl)',
+    'Sel Roti': 'Sel Roti (2 pieces)',
+    'Chatamari': 'Chatamari (2 pieces)'
+}
+SCANNER_FOOD_IDS = {dish: food_id(name) for dish, name in SCANNER_FOOD_NAMES.items()}
 
 class NepaleseFoodRecognizer:
-    def __init__(self):
-        # Simulated food database with confidence scores
+    def __init__(self, classifier=None):
+        # Food database with per-dish confidence thresholds
         self.food_database = {
             'Dal Bhat': {
                 'calories_per_serving': 420,
@@ -44,12 +66,19 @@ class NepaleseFoodRecognizer:
                 'visual_features': ['flat_round', 'crepe_like']
             }
         }
+        
+        # Classifier labels must be dish names from food_database
+        self.classifier = classifier if classifier is not None else FoodClassifier.from_env(list(self.food_database))
+        
+        # Signature vectors for every dish, matched when no model is configured
+        self.matcher = SignatureMatcher.from_food_database(self.food_database)
     
+    @timed()
     def preprocess_image(self, image):
         """Preprocess image for analysis"""
         # Convert PIL image to OpenCV format
         if isinstance(image, Image.Image):
-            image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+            image = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
         
         # Resize image for processing
         height, width = image.shape[:2]
@@ -61,52 +90,136 @@ class NepaleseFoodRecognizer:
         
         return image
     
-    def detect_food_items(self, image):
-        """
-        Simulate food detection using computer vision
-        In production, this would use trained ML models
+    def _build_detection(self, food_name, confidence, processed_image=None, regions=None, filled_pixels=None):
+        """Build a detection entry with quantity and calorie estimates
+        regions (the dish's segmentation regions) and filled_pixels refer to
+        the processed image; without them the dish is assumed to be one piece
+        or one serving
         """
-        processed_image = self.preprocess_image(image)
+        food_info = self.food_database[food_name]
         
-        # Simulate detection results
-        detected_foods = []
+        if 'calories_per_piece' in food_info:
+            quantity = count_pieces_in_regions(processed_image, regions) if regions else 1
+            calories = food_info['calories_per_piece'] * quantity
+            serving_info = _serving_label(quantity, 'piece')
+        else:
+            serving_key = 'calories_per_serving' if 'calories_per_serving' in food_info else 'calories_per_bowl'
+            if filled_pixels is not None:
+                frame_pixels = processed_image.shape[0] * processed_image.shape[1]
+                quantity = estimate_servings(filled_pixels, frame_pixels, serving_key)
+            else:
+                quantity = 1.0
+            calories = int(round(food_info.get(serving_key, 200) * quantity))
+            unit = 'bowl' if serving_key == 'calories_per_bowl' else 'serving'
+            serving_info = _serving_label(quantity, unit)
         
-        # Random detection simulation
-        num_foods = random.randint(1, 3)
-        available_foods = list(self.food_database.keys())
+        return {
+            'name': food_name,
+            'food_id': SCANNER_FOOD_IDS.get(food_name),
+            'confidence': confidence,
+            'calories': calories,
+            'quantity': quantity,
+            'serving_info': serving_info
+        }
+    
+    def _best_dish(self, labels, probabilities):
+        """Most likely known dish that clears its confidence threshold, or None"""
+        for index in np.argsort(probabilities)[::-1]:
+            food_name = labels[index]
+            food_info = self.food_database.get(food_name)
+            if food_info is None:
+                continue
+            if probabilities[index] >= food_info['confidence_threshold']:
+                return food_name, float(probabilities[index])
+        return None
+    
+    def _classify_crops(self, crops):
+        """Return (labels, probabilities) per crop from one batched call"""
+        if not crops:
+            return []
+        if self.classifier is not None:
+            probabilities = self.classifier.predict(crops)
+            return [(self.classifier.labels, row) for row in probabilities]
         
-        for _ in range(num_foods):
-            food_name = random.choice(available_foods)
-            confidence = random.uniform(0.7, 0.95)
+        return self.matcher.candidates_batch(extract_features_batch(crops))
+    
+    def _propose(self, processed_image):
+        """Return (regions, segmented); the whole image if no regions are found, none if it is flat"""
+        if is_flat(processed_image):
+            return [], False
+        regions = propose_regions(processed_image)
+        if regions:
+            return regions, True
+        return [whole_image_region(processed_image)], False
+    
+    def _assemble(self, processed_image, scale, regions, segmented, classified):
+        """Turn classified regions of one image into sorted detections"""
+        # Several regions of one dish (e.g. separate momos) become one item
+        dishes = {}
+        for region, (labels, probabilities) in zip(regions, classified):
+            best = self._best_dish(labels, probabilities)
+            if best is None:
+                continue
             
-            # Estimate quantity based on food type
-            if 'Momo' in food_name:
-                quantity = random.randint(4, 8)
-                calories = self.food_database[food_name]['calories_per_piece'] * quantity
-                serving_info = f"{quantity} pieces"
-            elif 'Sel Roti' in food_name:
-                quantity = random.randint(1, 3)
-                calories = self.food_database[food_name]['calories_per_piece'] * quantity
-                serving_info = f"{quantity} pieces"
+            food_name, confidence = best
+            filled_pixels = cv2.countNonZero(region['mask'])
+            if food_name in dishes:
+                dish = dishes[food_name]
+                dish['confidence'] = max(dish['confidence'], confidence)
+                dish['bbox'] = _union_bbox(dish['bbox'], region['bbox'])
+                dish['regions'].append(region)
+                dish['filled_pixels'] += filled_pixels
             else:
-                quantity = 1
-                calories = self.food_database[food_name].get('calories_per_serving', 
-                          self.food_database[food_name].get('calories_per_bowl', 200))
-                serving_info = "1 serving"
-            
-            detected_foods.append({
-                'name': food_name,
-                'confidence': confidence,
-                'calories': calories,
-                'quantity': quantity,
-                'serving_info': serving_info
-            })
-            
-            # Remove from available foods to avoid duplicates
-            available_foods.remove(food_name)
+                dishes[food_name] = {'confidence': confidence, 'bbox': region['bbox'], 'regions': [region],
+                                     'filled_pixels': filled_pixels}
         
-        return detected_foods
+        detections = []
+        for food_name, dish in dishes.items():
+            if segmented:
+                detection = self._build_detection(food_name, dish['confidence'], processed_image,
+                                                  dish['regions'], dish['filled_pixels'])
+            else:
+                detection = self._build_detection(food_name, dish['confidence'])
+            detection['bbox'] = tuple(int(round(v * scale)) for v in dish['bbox'])
+            detections.append(detection)
+        
+        detected_foods = sorted(detections, key=lambda food: food['confidence'], reverse=True)
+        return detected_foods[:MAX_DETECTIONS]
     
+    @timed()
+    def detect_food_items(self, image):
+        """
+        Detect foods in an image
+        The plate is split into colour regions and all regions are recognized
+        in one batch. Returns a list of dicts with name, confidence, calories,
+        quantity, serving_info and bbox (x, y, w, h in the input image's
+        pixels); only dishes above their confidence threshold are kept
+        """
+        return self.detect_food_items_batch([image])[0]
+    
+    @timed()
+    def detect_food_items_batch(self, images):
+        """Detect foods in several images, classifying every region in one call"""
+        prepared = []
+        crops = []
+        for image in images:
+            original_width = image.size[0] if isinstance(image, Image.Image) else image.shape[1]
+            processed_image = self.preprocess_image(image)
+            regions, segmented = self._propose(processed_image)
+            prepared.append((processed_image, original_width / processed_image.shape[1], regions, segmented))
+            crops.extend(crop(processed_image, region) for region in regions)
+        
+        classified = self._classify_crops(crops)
+        
+        results = []
+        offset = 0
+        for processed_image, scale, regions, segmented in prepared:
+            results.append(self._assemble(processed_image, scale, regions, segmented,
+                                          classified[offset:offset + len(regions)]))
+            offset += len(regions)
+        return results
+    
+    @timed()
     def analyze_nutritional_content(self, detected_foods):
         """Analyze nutritional content of detected foods"""
         total_calories = sum(food['calories'] for food in detected_foods)
@@ -149,39 +262,44 @@ class NepaleseFoodRecognizer:
             'fat': round(total_fat, 1)
         }
     
+    @timed()
     def get_health_recommendations(self, detected_foods, user_health_conditions):
         """Provide health recommendations based on detected foods and user conditions"""
-        recommendations = []
-        
-        for condition in user_health_conditions:
-            if condition == 'Diabetes':
-                for food in detected_foods:
-                    if 'Dal Bhat' in food['name']:
-                        recommendations.append("Consider brown rice instead of white rice for better blood sugar control")
-                    elif 'Sel Roti' in food['name']:
-                        recommendations.append("Limit sweet items like Sel Roti due to high sugar content")
-            
-            elif condition == 'Hypertension':
-                recommendations.append("Be mindful of salt content in traditional preparations")
-                recommendations.append("Consider steamed momos instead of fried versions")
-            
-            elif condition == 'Heart Disease':
-                recommendations.append("Choose lean protein options and limit ghee usage")
-                recommendations.append("Include more vegetables in your Dal Bhat")
-        
-        if not recommendations:
-            recommendations.append("Your food choices look balanced! Maintain portion control.")
-        
-        return recommendations
+        foods = [food['name'] for food in detected_foods]
+        return RULESETS['scan'].evaluate(user_health_conditions, foods)
 
-# Example usage function
-def analyze_food_image(image, user_health_conditions=None):
-    """Main function to analyze food image and return results"""
-    recognizer = NepaleseFoodRecognizer()
-    
-    # Detect foods in image
-    detected_foods = recognizer.detect_food_items(image)
-    
+def _serving_label(quantity, unit):
+    """'1 piece', '0.5 bowl', '1.5 servings': plural only above one"""
+    return f"{quantity:g} {unit}s" if quantity > 1 else f"{quantity:g} {unit}"
+
+def _union_bbox(a, b):
+    """Smallest (x, y, w, h) box containing both boxes"""
+    x, y = min(a[0], b[0]), min(a[1], b[1])
+    right, bottom = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return (x, y, right - x, bottom - y)
+
+_recognizer = None
+
+def get_recognizer():
+    """Return a shared recognizer so the model is only loaded once per process"""
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = NepaleseFoodRecognizer()
+    return _recognizer
+
+_scan_scheduler = None
+
+def get_scan_scheduler():
+    """Shared micro-batcher over the recognizer: concurrent detect calls run as one batch
+    submit(image) returns a Future with that image's detections
+    """
+    global _scan_scheduler
+    if _scan_scheduler is None:
+        _scan_scheduler = MicroBatcher(get_recognizer().detect_food_items_batch, name='scan_scheduler')
+    return _scan_scheduler
+
+def _analysis(recognizer, detected_foods, user_health_conditions):
+    """Nutrition and recommendations for one image's detections"""
     # Analyze nutritional content
     nutrition = recognizer.analyze_nutritional_content(detected_foods)
     
@@ -195,4 +313,27 @@ def analyze_food_image(image, user_health_conditions=None):
         'detected_foods': detected_foods,
         'nutrition': nutrition,
         'recommendations': recommendations
-    }
\ No newline at end of file
+    }
+
+# Example usage function
+@timed()
+def analyze_food_image(image, user_health_conditions=None):
+    """Main function to analyze food image and return results"""
+    recognizer = get_recognizer()
+    
+    # Detect foods in image
+    detected_foods = recognizer.detect_food_items(image)
+    
+    return _analysis(recognizer, detected_foods, user_health_conditions)
+
+@timed()
+def analyze_food_images(images, user_health_conditions=None):
+    """analyze_food_image for several images with one batched recognition call
+    user_health_conditions is one list per image, or None
+    """
+    recognizer = get_recognizer()
+    conditions = user_health_conditions or [None] * len(images)
+    return [
+        _analysis(recognizer, detected_foods, image_conditions)
+        for detected_foods, image_conditions in zip(recognizer.detect_food_items_batch(images), conditions)
+    ]
@@ -0,0 +1,178 @@
+"""
+Per-user frequently eaten foods for one-tap re-logging.
+
+Each food a user logs has an exponentially decayed count: a log made
+HALF_LIFE_DAYS ago counts half as much as one made now, so the score mixes
+how often and how recently a food was eaten. Decaying every count as time
+passes would touch every food; instead a log at time t adds 2**(t / half
+life), which only grows, and counts are compared as they stand. Scores are
+kept as log2 of that sum so they never overflow; decayed_count() turns one
+back into an ordinary count.
+
+FrequentFoods keeps the top `size` foods in a min-heap with a position index:
+logging a food is a dict update plus at most one sift, O(log k), and top()
+is a copy of k cached entries. The meal store keeps the same scores in its
+food_stats table (see storage.py), so a session is loaded from there rather
+than by rescanning the user's history.
+
+    frequent = FrequentFoods.from_rows(store.food_stats('patient-17'))
+    frequent.add('Dal Bhat (1 plate)', 420)
+    frequent.top()      # [{'name': 'Dal Bhat (1 plate)', 'calories': 420, 'count': 5.3}, ...]
+"""
+
+import heapq
+import math
+import sys
+import time
+
+HALF_LIFE_DAYS = 14
+QUICK_ADD_SIZE = 8
+
+_HALF_LIFE_SECONDS = HALF_LIFE_DAYS * 24 * 3600
+# A removal leaving less than this share of a food's score drops the food;
+# it absorbs the few seconds between a meal's stored and in-memory times
+_EMPTY = 1e-4
+
+
+def log_weight(timestamp):
+    """log2 of the weight of one log at `timestamp` (epoch seconds)"""
+    return timestamp / _HALF_LIFE_SECONDS
+
+
+def log_add(a, b):
+    """log2(2**a + 2**b); either may be None for an empty count"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def log_sub(a, b):
+    """log2(2**a - 2**b), or None when nothing is left"""
+    if a is None:
+        return None
+    if b is None:
+        return a
+    remaining = 1 - 2 ** (b - a)
+    return None if remaining < _EMPTY else a + math.log2(remaining)
+
+
+def decayed_count(score, now=None):
+    """Count a score stands for at `now`, each log weighted by its age"""
+    return 2 ** (score - log_weight(time.time() if now is None else now))
+
+
+class FrequentFoods:
+    """Decayed per-food counts with an incrementally maintained top-k"""
+
+    def __init__(self, size=QUICK_ADD_SIZE):
+        self.size = size
+        # name -> [score, calories of the latest log]
+        self.foods = {}
+        # Min-heap of [score, name] over the top foods, and name -> heap index
+        self._heap = []
+        self._positions = {}
+        self._top = None
+
+    @classmethod
+    def from_rows(cls, rows, size=QUICK_ADD_SIZE):
+        """Build from store.food_stats() rows (name, score, calories)"""
+        frequent = cls(size)
+        for row in rows:
+            frequent.foods[row['name']] = [row['score'], row['calories']]
+        frequent._rebuild()
+        return frequent
+
+    def __len__(self):
+        return len(self.foods)
+
+    def add(self, name, calories, timestamp=None):
+        """Count one log of `name`; O(log size)"""
+        food = self.foods.get(name)
+        weight = log_weight(time.time() if timestamp is None else timestamp)
+        if food is None:
+            food = self.foods[name] = [weight, calories]
+        else:
+            food[0] = log_add(food[0], weight)
+            food[1] = calories
+        score = food[0]
+        self._top = None
+
+        heap = self._heap
+        position = self._positions.get(name)
+        if position is not None:
+            # Scores only grow, so a food already in the heap can only sink
+            heap[position][0] = score
+            self._sift_down(position)
+        elif len(heap) < self.size:
+            heap.append([score, name])
+            self._positions[name] = len(heap) - 1
+            self._sift_up(len(heap) - 1)
+        elif [score, name] > heap[0]:
+            # Everything outside the heap scores at most the evicted minimum
+            del self._positions[heap[0][1]]
+            heap[0] = [score, name]
+            self._positions[name] = 0
+            self._sift_down(0)
+
+    def remove(self, name, timestamp):
+        """Take back one log of `name` made at `timestamp`, e.g. a deleted entry"""
+        food = self.foods.get(name)
+        if food is None:
+            return
+        food[0] = log_sub(food[0], log_weight(timestamp))
+        if food[0] is None:
+            del self.foods[name]
+        # A lowered food may fall behind one outside the heap; removals are
+        # rare, so the heap is rebuilt rather than tracking the runner-up
+        if name in self._positions:
+            self._rebuild()
+
+    def top(self, now=None):
+        """Top foods, highest score first, as dicts of name, calories and decayed count"""
+        if self._top is None:
+            self._top = sorted(self._heap, reverse=True)
+        return [
+            {'name': name, 'calories': self.foods[name][1], 'count': round(decayed_count(score, now), 2)}
+            for score, name in self._top
+        ]
+
+    def nbytes(self):
+        """Approximate memory held by the counters"""
+        return (sys.getsizeof(self.foods) + sys.getsizeof(self._heap) + sys.getsizeof(self._positions)
+                + sum(sys.getsizeof(name) + sys.getsizeof(food) for name, food in self.foods.items()))
+
+    def _rebuild(self):
+        best = heapq.nlargest(self.size, ([food[0], name] for name, food in self.foods.items()))
+        self._heap = best[::-1]
+        self._positions = {name: i for i, (_, name) in enumerate(self._heap)}
+        self._top = None
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._positions[heap[i][1]] = i
+        self._positions[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        heap = self._heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[i] >= heap[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        heap = self._heap
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap) and heap[child] < heap[smallest]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
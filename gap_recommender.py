@@ -0,0 +1,129 @@
+"""
+Next-food recommendations that fill what is left of a user's daily targets.
+
+The remaining calories and macros (daily targets from
+HealthCalculator.calculate_macronutrient_needs minus today's intake, see
+nutrient_gap()) are scored against every catalog food at once:
+
+    shape    cosine between the food's protein/carb/fat calories and the
+             calories still missing from each macro, one matrix-vector product
+    portion  how much of a meal (MEAL_CALORIES, or what is left if less) it is
+    overshoot  calories beyond what is left, penalized
+
+Health conditions mask out foods without the matching flag (diabetic
+friendly, low sodium, heart healthy), and foods can be excluded by name.
+The catalog matrices are built once per catalog; a 100k-food catalog is
+scored in a few milliseconds.
+
+    gap = nutrient_gap(user.metrics(), user.intake.nutrient_totals())
+    get_recommender().recommend(gap, conditions=['Diabetes'])   # [(name, score), ...]
+"""
+
+import numpy as np
+
+import nepalifood
+from instrumentation import timed
+
+MAX_RECOMMENDATIONS = 10
+# A portion this size counts as a full meal
+MEAL_CALORIES = 600
+PORTION_WEIGHT = 0.3
+OVERSHOOT_PENALTY = 2.0
+
+# Health condition -> catalog flag a food needs to be recommended
+CONDITION_FLAGS = {
+    'Diabetes': 'diabetic_friendly',
+    'Hypertension': 'low_sodium',
+    'Heart Disease': 'heart_healthy',
+}
+# Calories per gram of each macro, in the order of the score matrix
+MACRO_CALORIES = {'protein': 4, 'carbs': 4, 'fat': 9}
+
+
+def nutrient_gap(metrics, totals):
+    """Calories and macro grams still missing today
+
+    `metrics` are derived_metrics() of the profile and `totals` are
+    IntakeLog.nutrient_totals(); values go negative once a target is passed.
+    """
+    macros = metrics['macros']
+    return {
+        'calories': metrics['daily_calories'] - totals['calories'],
+        'protein': macros['protein_grams'] - totals['protein'],
+        'carbs': macros['carb_grams'] - totals['carbs'],
+        'fat': macros['fat_grams'] - totals['fat'],
+    }
+
+
+class GapRecommender:
+    """Catalog as nutrient matrices, scored against a nutrient gap"""
+
+    def __init__(self, catalog=None):
+        self.catalog = nepalifood.NEPALI_FOODS_DATABASE if catalog is None else catalog
+        self.names = list(self.catalog)
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        infos = list(self.catalog.values())
+
+        self.calories = np.array([info['calories'] for info in infos], dtype=np.float32)
+        # Calories each food gets from protein, carbs and fat
+        self.macros = np.array([[info[macro] * factor for macro, factor in MACRO_CALORIES.items()] for info in infos],
+                               dtype=np.float32).reshape(len(infos), len(MACRO_CALORIES))
+        norms = np.linalg.norm(self.macros, axis=1)
+        self._inverse_norms = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+        self.flags = {
+            flag: np.array([bool(info.get(flag)) for info in infos], dtype=bool)
+            for flag in CONDITION_FLAGS.values()
+        }
+
+    def __len__(self):
+        return len(self.names)
+
+    def allowed(self, conditions=(), exclude=()):
+        """Boolean mask of foods suitable for all `conditions`, minus `exclude` names"""
+        mask = np.ones(len(self.names), dtype=bool)
+        for condition in conditions:
+            flag = CONDITION_FLAGS.get(condition)
+            if flag is not None:
+                mask &= self.flags[flag]
+        excluded = [self._ids[name] for name in exclude if name in self._ids]
+        mask[excluded] = False
+        return mask
+
+    def scores(self, gap, conditions=(), exclude=()):
+        """Score of every food against `gap`; -inf for foods that are masked out"""
+        remaining = max(float(gap['calories']), 1.0)
+        missing = np.maximum([gap[macro] * factor for macro, factor in MACRO_CALORIES.items()], 0).astype(np.float32)
+        missing_norm = np.linalg.norm(missing)
+
+        if missing_norm > 0:
+            shape = (self.macros @ (missing / missing_norm)) * self._inverse_norms
+        else:
+            shape = np.zeros(len(self.names), dtype=np.float32)
+        portion = np.minimum(self.calories / min(remaining, MEAL_CALORIES), 1)
+        overshoot = np.maximum(self.calories / remaining - 1, 0)
+        scores = shape + PORTION_WEIGHT * portion - OVERSHOOT_PENALTY * overshoot
+        scores[~self.allowed(conditions, exclude)] = -np.inf
+        return scores
+
+    @timed('gap_recommender.recommend')
+    def recommend(self, gap, conditions=(), exclude=(), limit=MAX_RECOMMENDATIONS):
+        """[(name, score)] of the best next foods, best first; [] once the calories are used up"""
+        if gap['calories'] <= 0:
+            return []
+        scores = self.scores(gap, conditions, exclude)
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.names[item], round(float(scores[item]), 3)) for item in order]
+
+
+_recommender = None
+
+
+def get_recommender():
+    """Shared recommender over nepalifood's current catalog, rebuilt if the catalog is replaced"""
+    global _recommender
+    if _recommender is None or _recommender.catalog is not nepalifood.NEPALI_FOODS_DATABASE:
+        _recommender = GapRecommender()
+    return _recommender
@@ -5,6 +5,8 @@ Health calculation utilities for the Swasthya app
 import math
 from datetime import datetime, timedelta
 
+from rules import RULESETS
+
 class HealthCalculator:
     """Class for various health-related calculations"""
     
@@ -143,39 +145,9 @@ class HealthCalculator:
     @staticmethod
     def get_health_recommendations(user_profile, health_conditions):
         """Generate personalized health recommendations"""
-        recommendations = []
-        
-        # BMI-based recommendations
         bmi = HealthCalculator.calculate_bmi(user_profile['weight'], user_profile['height'])
-        bmi_info = HealthCalculator.get_bmi_category(bmi)
-        recommendations.append(bmi_info['recommendation'])
-        
-        # Health condition specific recommendations
-        for condition in health_conditions:
-            if condition == 'Diabetes':
-                recommendations.extend([
-                    'Choose brown rice over white rice in Dal Bhat',
-                    'Monitor portion sizes and eat regular meals',
-                    'Include high-fiber vegetables in every meal'
-                ])
-            elif condition == 'Hypertension':
-                recommendations.extend([
-                    'Reduce salt in cooking and avoid pickled foods',
-                    'Include potassium-rich foods like bananas',
-                    'Limit processed and canned foods'
-                ])
-            elif condition == 'Heart Disease':
-                recommendations.extend([
-                    'Choose lean proteins and limit red meat',
-                    'Include omega-3 rich foods like fish',
-                    'Use minimal ghee and oil in cooking'
-                ])
-        
-        # Activity-based recommendations
-        if user_profile['activity_level'] == 'Sedentary':
-            recommendations.append('Try to include at least 30 minutes of walking daily')
-        
-        return recommendations
+        return RULESETS['health_profile'].evaluate(health_conditions, bmi=bmi,
+                                                   activity_level=user_profile['activity_level'])
 
 class NutritionAnalyzer:
     """Class for analyzing nutritional content of meals"""
@@ -218,26 +190,4 @@ class NutritionAnalyzer:
     @staticmethod
     def suggest_meal_improvements(current_meal, health_conditions):
         """Suggest improvements for current meal based on health conditions"""
-        suggestions = []
-        
-        for condition in health_conditions:
-            if condition == 'Diabetes':
-                suggestions.extend([
-                    'Add more fiber-rich vegetables',
-                    'Choose whole grains over refined grains',
-                    'Include lean protein to slow carb absorption'
-                ])
-            elif condition == 'Hypertension':
-                suggestions.extend([
-                    'Reduce salt and use herbs for flavor',
-                    'Add potassium-rich foods like tomatoes',
-                    'Include garlic for natural blood pressure support'
-                ])
-            elif condition == 'Heart Disease':
-                suggestions.extend([
-                    'Use minimal oil and choose healthy fats',
-                    'Include antioxidant-rich colorful vegetables',
-                    'Add omega-3 sources like walnuts or fish'
-                ])
-        
-        return suggestions
\ No newline at end of file
+        return RULESETS['meal'].evaluate(health_conditions)
\ No newline at end of file
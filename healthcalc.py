@@ -0,0 +1,30 @@
+"""
+Import shim for the health calculation utilities.
+
+The module lives in `health calculation.py`, whose filename contains a space
+and therefore cannot be imported with a normal import statement.
+"""
+
+import importlib.util
+import os
+import sys
+
+_MODULE_NAME = 'health_calculation'
+_MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'health calculation.py')
+
+
+def _load():
+    """Load `health calculation.py` once and register it in sys.modules"""
+    if _MODULE_NAME in sys.modules:
+        return sys.modules[_MODULE_NAME]
+    spec = importlib.util.spec_from_file_location(_MODULE_NAME, _MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[_MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_health_calculation = _load()
+
+HealthCalculator = _health_calculation.HealthCalculator
+NutritionAnalyzer = _health_calculation.NutritionAnalyzer
@@ -0,0 +1,333 @@
+"""
+Bulk import of intake history exported from other trackers.
+
+Reads CSV, JSON Lines or a top-level JSON array one record at a time, maps
+each food name onto the catalog with FoodMatcher, and writes the rows into
+the meal store in transactions of BATCH_SIZE rows, so memory stays bounded
+however long the file is.
+
+Recognized columns (first match wins, case-insensitive):
+    name       name, food, food_name, item, description, meal
+    calories   calories, kcal, energy, cal
+    logged_at  logged_at, timestamp, datetime, date (plus a separate time column)
+    servings   servings, quantity, qty, amount
+Rows without a usable time, with negative or non-finite numbers, or without
+calories for a food that is not in the catalog, are skipped and counted.
+
+Usage:
+    python importer.py history.csv --user patient-17
+    python importer.py export.jsonl --data-dir /srv/swasthya
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+import nepalifood
+import storage
+
+BATCH_SIZE = 10_000
+MATCH_THRESHOLD = 0.6
+# Distinct raw names remembered by a matcher; exports repeat the same few
+MATCH_CACHE_SIZE = 100_000
+# Distinct unmatched names counted for the report; later new names are not
+UNMATCHED_NAMES = 10_000
+
+FIELD_ALIASES = {
+    'name': ('name', 'food', 'food_name', 'item', 'description', 'meal'),
+    'calories': ('calories', 'kcal', 'energy', 'cal'),
+    'logged_at': ('logged_at', 'timestamp', 'datetime', 'date'),
+    'servings': ('servings', 'quantity', 'qty', 'amount'),
+}
+
+_SERVING = re.compile(r'\([^)]*\)')
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_name(name):
+    """Lowercase words of a food name without its serving, e.g. 'chicken momo'"""
+    return ' '.join(_NON_WORD.sub(' ', _SERVING.sub(' ', name.lower())).split())
+
+
+def _trigrams(text):
+    """Padded per-word trigrams, so word order does not matter"""
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FoodMatcher:
+    """Fuzzy food name -> catalog name lookup over a prebuilt trigram index"""
+
+    def __init__(self, names=None, threshold=MATCH_THRESHOLD):
+        self.names = list(nepalifood.FOOD_NAMES if names is None else names)
+        self.threshold = threshold
+        self.exact = {}
+        self.sizes = []
+        self.postings = {}
+        for i, name in enumerate(self.names):
+            normalized = normalize_name(name)
+            self.exact.setdefault(normalized, i)
+            grams = _trigrams(normalized)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+        self._cache = {}
+
+    def _search(self, normalized):
+        if normalized in self.exact:
+            return self.exact[normalized]
+        grams = _trigrams(normalized)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        best, best_score = None, self.threshold
+        for i, count in shared.items():
+            # Dice coefficient of the two trigram sets
+            score = 2 * count / (len(grams) + self.sizes[i])
+            if score >= best_score:
+                best, best_score = i, score
+        return best
+
+    def match(self, name):
+        """Catalog name for a raw food name, or None"""
+        found = self._cache.get(name, -1)
+        if found == -1:
+            found = self._search(normalize_name(name))
+            if len(self._cache) >= MATCH_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[name] = found
+        return None if found is None else self.names[found]
+
+
+def _resolve_columns(header):
+    """{field: column} for the fields FIELD_ALIASES finds in a header"""
+    lowered = {column.strip().lower(): column for column in header}
+    columns = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                columns[field] = lowered[alias]
+                break
+    # Some exports split date and time of day into two columns
+    if columns.get('logged_at') == lowered.get('date') and 'time' in lowered:
+        columns['time'] = lowered['time']
+    return columns
+
+
+def parse_time(value):
+    """ISO string or epoch (seconds or milliseconds) -> local ISO time, or None"""
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, (int, float)) or value.replace('.', '', 1).isdigit():
+            seconds = float(value)
+            moment = datetime.fromtimestamp(seconds / 1000 if seconds > 1e11 else seconds)
+        else:
+            moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+            if moment.tzinfo is not None:
+                moment = moment.astimezone().replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return moment.isoformat(timespec='seconds')
+
+
+def _number(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_csv(f):
+    """Records of a CSV file as dicts keyed by field name"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = _resolve_columns(header)
+    positions = {field: header.index(column) for field, column in columns.items()}
+    width = len(header)
+    for row in reader:
+        if len(row) < width:
+            row += [''] * (width - len(row))
+        yield {field: row[position] for field, position in positions.items()}
+
+
+def _json_array_items(f, chunk_size=1 << 16):
+    """Items of a top-level JSON array, decoded incrementally"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Expected a JSON array")
+    position = 1
+    while True:
+        # Skip separators, refilling the buffer as needed
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                break
+            more = f.read(chunk_size)
+            if not more:
+                return
+            buffer, position = more, 0
+        if buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            more = f.read(chunk_size)
+            if not more:
+                raise
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield item
+        # Consumed text is dropped once per chunk, when the buffer is refilled
+        position = end
+
+
+def read_json(f):
+    """Records of a JSON array or JSON Lines file as dicts keyed by field name"""
+    first = f.read(1)
+    while first.isspace():
+        first = f.read(1)
+    if first == '[':
+        items = _json_array_items(_Prefixed(first, f))
+    else:
+        items = (json.loads(line) for line in _Prefixed(first, f) if line.strip())
+
+    # Records may differ in their keys; resolve each distinct key set once
+    resolved = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        keys = tuple(item)
+        columns = resolved.get(keys)
+        if columns is None:
+            columns = resolved[keys] = _resolve_columns(keys)
+        yield {field: item.get(column) for field, column in columns.items()}
+
+
+class _Prefixed:
+    """File-like object that yields `prefix` before the rest of `f`"""
+
+    def __init__(self, prefix, f):
+        self.prefix = prefix
+        self.f = f
+
+    def read(self, size=-1):
+        prefix, self.prefix = self.prefix, ''
+        return prefix + self.f.read(size if size < 0 else max(0, size - len(prefix)))
+
+    def __iter__(self):
+        prefix, self.prefix = self.prefix, ''
+        lines = iter(self.f)
+        first = next(lines, '')
+        if prefix or first:
+            yield prefix + first
+        yield from lines
+
+
+def read_records(f, fmt):
+    return read_csv(f) if fmt == 'csv' else read_json(f)
+
+
+def detect_format(filename):
+    return 'json' if filename.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv'
+
+
+def import_records(records, store, user_id='default', matcher=None, batch_size=BATCH_SIZE, method='Import'):
+    """Write records from read_records() into the store; returns import statistics"""
+    matcher = matcher or FoodMatcher()
+    catalog = nepalifood.NEPALI_FOODS_DATABASE
+    stats = {'rows': 0, 'imported': 0, 'matched': 0, 'unmatched': 0, 'skipped': 0}
+    unmatched = Counter()
+    start = time.perf_counter()
+
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        rows = []
+        for record in chunk:
+            raw_name = str(record.get('name') or '').strip()
+            logged_at = parse_time(record.get('logged_at'))
+            if record.get('time') and logged_at and logged_at.endswith('T00:00:00'):
+                logged_at = parse_time(f"{logged_at[:10]}T{str(record['time']).strip()}") or logged_at
+            if not raw_name or logged_at is None:
+                stats['skipped'] += 1
+                continue
+
+            servings = _number(record.get('servings'))
+            calories = _number(record.get('calories'))
+            if any(value is not None and not (math.isfinite(value) and value >= 0) for value in (servings, calories)):
+                stats['skipped'] += 1
+                continue
+            name = matcher.match(raw_name)
+            if name is None:
+                if raw_name in unmatched or len(unmatched) < UNMATCHED_NAMES:
+                    unmatched[raw_name] += 1
+                name = raw_name
+            elif calories is None:
+                calories = catalog[name]['calories'] * (servings or 1)
+            if calories is None:
+                stats['skipped'] += 1
+                continue
+
+            stats['matched' if name in catalog else 'unmatched'] += 1
+            serving_info = f"{servings:g} serving(s)" if servings else None
+            rows.append((user_id, logged_at, name, round(calories), serving_info, method))
+
+        store.log_meals(rows)
+        stats['rows'] += len(chunk)
+        stats['imported'] += len(rows)
+
+    stats['seconds'] = round(time.perf_counter() - start, 3)
+    stats['top_unmatched'] = unmatched.most_common(20)
+    return stats
+
+
+def import_file(f, store, user_id='default', fmt='csv', **options):
+    """Import an open text file (or binary upload) of the given format"""
+    if isinstance(f.read(0), bytes):
+        f = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+    return import_records(read_records(f, fmt), store, user_id, **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import intake history from a CSV or JSON export')
+    parser.add_argument('path')
+    parser.add_argument('--user', default='default', help='user id the meals belong to')
+    parser.add_argument('--format', choices=['csv', 'json'], help='default: from the file extension')
+    parser.add_argument('--data-dir', help=f'meal store directory (default: {storage.DATA_DIR})')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='rows per transaction')
+    args = parser.parse_args(argv)
+
+    store = storage.MealStore(args.data_dir)
+    with open(args.path, encoding='utf-8-sig', newline='') as f:
+        stats = import_file(f, store, args.user, args.format or detect_format(args.path), batch_size=args.batch_size)
+
+    print(f"Imported {stats['imported']} of {stats['rows']} rows in {stats['seconds']:.1f}s "
+          f"({stats['matched']} matched to the catalog, {stats['unmatched']} kept as written, "
+          f"{stats['skipped']} skipped)")
+    for name, count in stats['top_unmatched']:
+        print(f"  unmatched: {name!r} x{count}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
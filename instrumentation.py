@@ -0,0 +1,195 @@
+"""
+Lightweight hot-path instrumentation for the Swasthya app.
+
+Timers and counters are aggregated per process and can be read through the
+hidden diagnostics page or scraped as Prometheus text. Instrumentation is off
+unless SWASTHYA_METRICS is set; when it is off, `timed` hands back the
+undecorated function, so disabled timers cost nothing at call time.
+
+Environment variables:
+    SWASTHYA_METRICS=1          enable timers and counters
+    SWASTHYA_METRICS_PORT=9464  also serve /metrics on this port
+"""
+
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get('SWASTHYA_METRICS', '').lower() in ('1', 'true', 'yes', 'on')
+METRICS_PORT = os.environ.get('SWASTHYA_METRICS_PORT')
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_server = None
+
+
+class _TimerStats:
+    """Aggregated durations for one instrumented function or block"""
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+
+def record(name, seconds):
+    """Record one duration for `name`"""
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            stats = _timers[name] = _TimerStats()
+        stats.add(seconds)
+
+
+def timed(name=None):
+    """Decorator that records the wall time of every call
+
+    Returns the function unchanged when instrumentation is disabled.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        metric_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(metric_name, time.perf_counter() - start)
+
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def _timer_block(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def timer(name):
+    """Context manager that times a block, e.g. chart building inside a page"""
+    if not ENABLED:
+        return _NULL_CONTEXT
+    return _timer_block(name)
+
+
+def count(name, amount=1):
+    """Increment the counter `name`"""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset():
+    """Clear all aggregated timers and counters"""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """Return timer and counter values as plain dicts for display"""
+    with _lock:
+        timers = [
+            {
+                'name': name,
+                'calls': stats.count,
+                'total_ms': round(stats.total * 1000, 3),
+                'mean_ms': round(stats.total / stats.count * 1000, 3) if stats.count else 0,
+                'max_ms': round(stats.max * 1000, 3)
+            }
+            for name, stats in _timers.items()
+        ]
+        counters = dict(_counters)
+    timers.sort(key=lambda row: row['total_ms'], reverse=True)
+    return {'timers': timers, 'counters': counters}
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = [
+        '# HELP swasthya_duration_seconds Wall time of instrumented functions and blocks.',
+        '# TYPE swasthya_duration_seconds histogram'
+    ]
+    with _lock:
+        timers = [(name, stats.count, stats.total, list(stats.buckets)) for name, stats in _timers.items()]
+        counters = list(_counters.items())
+
+    for name, calls, total, buckets in sorted(timers):
+        label = _escape_label(name)
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            cumulative += bucket_count
+            lines.append(f'swasthya_duration_seconds_bucket{{name="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'swasthya_duration_seconds_bucket{{name="{label}",le="+Inf"}} {calls}')
+        lines.append(f'swasthya_duration_seconds_sum{{name="{label}"}} {total}')
+        lines.append(f'swasthya_duration_seconds_count{{name="{label}"}} {calls}')
+
+    lines.append('# HELP swasthya_events_total Instrumented event counters.')
+    lines.append('# TYPE swasthya_events_total counter')
+    for name, value in sorted(counters):
+        lines.append(f'swasthya_events_total{{name="{_escape_label(name)}"}} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood the app's stderr
+        pass
+
+
+def start_metrics_server(port=None, host='0.0.0.0'):
+    """Serve /metrics on a background thread; later calls are no-ops"""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        port = int(port or METRICS_PORT or 9464)
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=_server.serve_forever, name='swasthya-metrics', daemon=True)
+    thread.start()
+    return _server
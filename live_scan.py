@@ -0,0 +1,182 @@
+"""
+Continuous food scanning on a video stream.
+
+`LiveScanner` runs the recognizer only on keyframes: every `stride`-th frame,
+and only if that frame differs visibly from the last keyframe (mean absolute
+difference of tiny grayscale thumbnails). In-between frames reuse the last
+result, so the stream stays real-time on a laptop CPU. Detections are
+smoothed across keyframes with an exponential moving average so a dish does
+not flicker in and out when one frame is misread.
+
+In the app the stream comes from the browser through streamlit-webrtc; for
+testing, any file or camera OpenCV can open works:
+    python live_scan.py meal.mp4
+    python live_scan.py 0            # first local camera
+"""
+
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from foodrecognition import get_recognizer
+
+# Size of the thumbnail used for the frame-difference check
+DIFF_SIZE = (32, 24)
+
+
+def _frame_signature(frame):
+    small = cv2.resize(frame, DIFF_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+class LiveScanner:
+    """Keyframe-based recognition with temporal smoothing"""
+
+    def __init__(self, recognizer=None, stride=3, change_threshold=6.0, smoothing=0.5, show_threshold=0.4):
+        self.recognizer = recognizer or get_recognizer()
+        # Run recognition on at most every stride-th frame
+        self.stride = stride
+        # Mean grey-level change (0-255) below which a frame counts as unchanged
+        self.change_threshold = change_threshold
+        # Weight of the newest keyframe in the moving average
+        self.smoothing = smoothing
+        # Smoothed confidence a dish needs to be shown
+        self.show_threshold = show_threshold
+
+        self.frames = 0
+        self.keyframes = 0
+        self.skipped_unchanged = 0
+        self._signature = None
+        self.keyframe = None
+        self._scores = {}
+        self._latest = {}
+        self._current = []
+        self._lock = threading.Lock()
+
+    def _is_unchanged(self, signature):
+        if self._signature is None:
+            return False
+        return float(np.abs(signature - self._signature).mean()) < self.change_threshold
+
+    def _smooth(self, detections):
+        seen = {food['name']: food for food in detections}
+        alpha = self.smoothing
+
+        for name in set(self._scores) | set(seen):
+            confidence = seen[name]['confidence'] if name in seen else 0.0
+            self._scores[name] = alpha * confidence + (1 - alpha) * self._scores.get(name, 0.0)
+            if name in seen:
+                self._latest[name] = seen[name]
+
+        # Forget dishes that have faded out completely
+        for name in [name for name, score in self._scores.items() if score < 0.05]:
+            del self._scores[name]
+            self._latest.pop(name, None)
+
+        return sorted(
+            (dict(self._latest[name], confidence=score)
+             for name, score in self._scores.items() if score >= self.show_threshold),
+            key=lambda food: food['confidence'],
+            reverse=True
+        )
+
+    def process(self, frame):
+        """Feed one BGR frame; returns the current smoothed detections"""
+        self.frames += 1
+        if (self.frames - 1) % self.stride:
+            return self.current
+
+        signature = _frame_signature(frame)
+        if self._is_unchanged(signature):
+            self.skipped_unchanged += 1
+            return self.current
+
+        detections = self.recognizer.detect_food_items(frame)
+        self._signature = signature
+        self.keyframe = frame
+        self.keyframes += 1
+
+        smoothed = self._smooth(detections)
+        with self._lock:
+            self._current = smoothed
+        return smoothed
+
+    @property
+    def current(self):
+        """Latest smoothed detections; safe to read from another thread"""
+        with self._lock:
+            return list(self._current)
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'keyframes': self.keyframes,
+            'skipped_unchanged': self.skipped_unchanged
+        }
+
+
+def draw_detections(frame, detections):
+    """Draw boxes and labels for detections onto a copy of frame"""
+    annotated = frame.copy()
+    for food in detections:
+        if 'bbox' not in food:
+            continue
+        x, y, w, h = food['bbox']
+        cv2.rectangle(annotated, (x, y), (x + w, y + h), (94, 197, 34), 2)
+        label = f"{food['name']} {food['confidence']:.0%}"
+        cv2.putText(annotated, label, (x + 4, max(16, y - 6)), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                    (94, 197, 34), 1, cv2.LINE_AA)
+    return annotated
+
+
+class WebRTCProcessor:
+    """streamlit-webrtc video processor: scans each frame and draws the boxes"""
+
+    def __init__(self):
+        self.scanner = LiveScanner()
+
+    def recv(self, frame):
+        image = frame.to_ndarray(format='bgr24')
+        annotated = draw_detections(image, self.scanner.process(image))
+        # Build the reply with the incoming frame's class so av is not imported here
+        return type(frame).from_ndarray(annotated, format='bgr24')
+
+
+def frames_from_source(source, max_frames=None):
+    """Yield BGR frames from a video file path or camera index"""
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video source {source!r}")
+    try:
+        count = 0
+        while max_frames is None or count < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            count += 1
+            yield frame
+    finally:
+        capture.release()
+
+
+def scan_source(source, max_frames=None, **scanner_options):
+    """Run a LiveScanner over a local source and return (scanner, frames per second)"""
+    scanner = LiveScanner(**scanner_options)
+    start = time.perf_counter()
+    for frame in frames_from_source(source, max_frames):
+        scanner.process(frame)
+    elapsed = time.perf_counter() - start
+    return scanner, scanner.frames / elapsed if elapsed else 0.0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python live_scan.py <video file or camera index>")
+        sys.exit(1)
+    scanner, fps = scan_source(sys.argv[1])
+    print(f"{fps:.1f} frames/s {scanner.stats()}")
+    for food in scanner.current:
+        print(f"  {food['name']}: {food['confidence']:.0%} ({food['serving_info']}, {food['calories']} cal)")
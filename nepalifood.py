@@ -1,7 +1,18 @@
 """
 Comprehensive database of Nepalese foods with nutritional information
+
+Entries hold the measured values and curated flags only; catalog_build.py
+validates them and adds the derived fields (energy from macros, low_sodium,
+serving sizes, densities per 100 g) when this module is imported.
 """
 
+import os
+
+import numpy as np
+
+import catalog_build
+from instrumentation import timed
+
 NEPALI_FOODS_DATABASE = {
     # Main Courses
     'Dal Bhat (1 plate)': {
@@ -16,8 +27,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Steamed rice with cooked lentils',
         'health_benefits': ['High in protein', 'Good source of complex carbs', 'Rich in fiber'],
         'diabetic_friendly': False,
-        'heart_healthy': True,
-        'low_sodium': False
+        'heart_healthy': True
     },
     
     'Brown Rice Dal Bhat (1 plate)': {
@@ -32,8 +42,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Brown rice with protein-rich lentils',
         'health_benefits': ['Lower glycemic index', 'Higher fiber', 'Better for diabetes'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': False
+        'heart_healthy': True
     },
     
     # Snacks and Appetizers
@@ -49,8 +58,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Steamed dumplings with chicken filling',
         'health_benefits': ['High protein', 'Moderate calories'],
         'diabetic_friendly': False,
-        'heart_healthy': False,
-        'low_sodium': False
+        'heart_healthy': False
     },
     
     'Vegetable Momo (6 pieces)': {
@@ -65,8 +73,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Steamed dumplings with vegetable filling',
         'health_benefits': ['Lower calories than meat version', 'Good fiber content'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': False
+        'heart_healthy': True
     },
     
     'Cauliflower Momo (6 pieces)': {
@@ -81,8 +88,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Low-carb dumplings with cauliflower',
         'health_benefits': ['Lower carbs', 'High fiber', 'Diabetes-friendly'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': False
+        'heart_healthy': True
     },
     
     # Traditional Dishes
@@ -98,8 +104,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional fermented vegetable soup',
         'health_benefits': ['Probiotic benefits', 'Low calories', 'High in vitamins'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     'Samay Baji (1 plate)': {
@@ -114,8 +119,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional Newari feast platter',
         'health_benefits': ['Variety of nutrients', 'Cultural significance'],
         'diabetic_friendly': False,
-        'heart_healthy': False,
-        'low_sodium': False
+        'heart_healthy': False
     },
     
     'Chatamari (2 pieces)': {
@@ -130,8 +134,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Newari rice crepe with toppings',
         'health_benefits': ['Gluten-free', 'Customizable toppings'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     # Curries and Vegetables
@@ -147,8 +150,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional potato and bamboo shoot curry',
         'health_benefits': ['High fiber', 'Low calories', 'Traditional flavors'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': False
+        'heart_healthy': True
     },
     
     'Methi Leaves Curry (1 bowl)': {
@@ -163,8 +165,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Diabetes-friendly fenugreek curry',
         'health_benefits': ['Blood sugar control', 'High iron', 'Low sodium'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     'Bitter Gourd Curry (1 bowl)': {
@@ -179,8 +180,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional bitter gourd preparation',
         'health_benefits': ['Natural insulin properties', 'Low calories', 'Antioxidants'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     # Grains and Staples
@@ -196,8 +196,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional millet porridge',
         'health_benefits': ['Gluten-free', 'High fiber', 'Traditional grain'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     'Oats Dhido (1 bowl)': {
@@ -212,8 +211,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Modern healthy version with oats',
         'health_benefits': ['Beta-glucan for cholesterol', 'Heart healthy', 'High fiber'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     # Desserts and Sweets
@@ -229,8 +227,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional rice pudding',
         'health_benefits': ['Calcium from milk', 'Energy from carbs'],
         'diabetic_friendly': False,
-        'heart_healthy': False,
-        'low_sodium': True
+        'heart_healthy': False
     },
     
     'Sel Roti (2 pieces)': {
@@ -245,8 +242,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional ring-shaped sweet bread',
         'health_benefits': ['Cultural significance', 'Quick energy'],
         'diabetic_friendly': False,
-        'heart_healthy': False,
-        'low_sodium': True
+        'heart_healthy': False
     },
     
     'Lapsi (1 bowl)': {
@@ -261,8 +257,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Sweet broken wheat pudding',
         'health_benefits': ['Whole grain', 'Moderate calories'],
         'diabetic_friendly': False,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     # Proteins and Dairy
@@ -278,8 +273,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional dried meat',
         'health_benefits': ['High protein', 'Low carbs', 'Long shelf life'],
         'diabetic_friendly': True,
-        'heart_healthy': False,
-        'low_sodium': False
+        'heart_healthy': False
     },
     
     'Yak Cheese (50g)': {
@@ -294,8 +288,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Traditional high-altitude cheese',
         'health_benefits': ['High protein', 'Calcium rich', 'Traditional'],
         'diabetic_friendly': True,
-        'heart_healthy': False,
-        'low_sodium': False
+        'heart_healthy': False
     },
     
     # Soups and Broths
@@ -311,8 +304,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Tibetan-style noodle soup',
         'health_benefits': ['Complete meal', 'Warming', 'Balanced nutrition'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': False
+        'heart_healthy': True
     },
     
     # Healthy Alternatives
@@ -328,8 +320,7 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Low-oil version of traditional Dal Bhat',
         'health_benefits': ['Lower calories', 'Heart healthy', 'Low sodium'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
     },
     
     'Cucumber Raita (1 bowl)': {
@@ -344,44 +335,79 @@ NEPALI_FOODS_DATABASE = {
         'preparation': 'Cooling yogurt-based side dish',
         'health_benefits': ['Cooling effect', 'Low sodium', 'Probiotic'],
         'diabetic_friendly': True,
-        'heart_healthy': True,
-        'low_sodium': True
+        'heart_healthy': True
+    },
+    
+    # Platters
+    'Newari Khaja Set': {
+        'calories': 450,
+        'protein': 16,
+        'carbs': 48,
+        'fat': 22,
+        'category': 'Traditional'
     }
 }
 
+# Food ids are positions in this table and are stored in logs, so new foods
+# are only ever appended to NEPALI_FOODS_DATABASE, never inserted or reordered
+FOOD_NAMES = list(NEPALI_FOODS_DATABASE)
+FOOD_IDS = {name: food_id for food_id, name in enumerate(FOOD_NAMES)}
+
+# Validated columns with derived fields, read from the compiled catalog built
+# from these entries; run python catalog_build.py after editing them. An
+# empty SWASTHYA_CATALOG compiles them at import instead
+COMPILED_CATALOG = os.environ.get('SWASTHYA_CATALOG', catalog_build.COMPILED_CATALOG) or None
+COMPILED = catalog_build.attach(NEPALI_FOODS_DATABASE, COMPILED_CATALOG)
+
+# Per-food nutrient rows indexed by food id, for array-based totals; fiber
+# and sodium an entry does not list count as 0 there
+NUTRIENT_FIELDS = ('calories', 'protein', 'carbs', 'fat', 'fiber', 'sodium')
+NUTRIENTS = np.nan_to_num(np.column_stack([COMPILED[field] for field in NUTRIENT_FIELDS])).astype(np.float32)
+
+def food_id(name):
+    """Stable integer id of a catalog food, or None"""
+    return FOOD_IDS.get(name)
+
+def food_by_id(food_id):
+    """Catalog entry of a food id"""
+    return NEPALI_FOODS_DATABASE[FOOD_NAMES[food_id]]
+
+@timed()
 def get_foods_by_category(category):
     """Get all foods in a specific category"""
     return {name: info for name, info in NEPALI_FOODS_DATABASE.items() 
             if info['category'] == category}
 
+@timed()
 def get_diabetic_friendly_foods():
     """Get all diabetes-friendly foods"""
     return {name: info for name, info in NEPALI_FOODS_DATABASE.items() 
-            if info['diabetic_friendly']}
+            if info.get('diabetic_friendly')}
 
+@timed()
 def get_heart_healthy_foods():
     """Get all heart-healthy foods"""
     return {name: info for name, info in NEPALI_FOODS_DATABASE.items() 
-            if info['heart_healthy']}
+            if info.get('heart_healthy')}
 
+@timed()
 def get_low_sodium_foods():
     """Get all low-sodium foods"""
     return {name: info for name, info in NEPALI_FOODS_DATABASE.items() 
-            if info['low_sodium']}
+            if info.get('low_sodium')}
 
+@timed()
 def search_foods(query):
-    """Search foods by name or ingredients"""
-    query = query.lower()
-    results = {}
-    
-    for name, info in NEPALI_FOODS_DATABASE.items():
-        if (query in name.lower() or 
-            any(query in ingredient.lower() for ingredient in info['ingredients']) or
-            query in info['category'].lower()):
-            results[name] = info
-    
-    return results
+    """Search foods by name, alias, ingredients or category, best match first
+    Tolerates typos, Romanization variants and Devanagari (see food_search.py)
+    """
+    if not query.strip():
+        return dict(NEPALI_FOODS_DATABASE)
+    # Imported here: food_search builds its index from this module's catalog
+    from food_search import get_engine
+    return {name: NEPALI_FOODS_DATABASE[name] for name, _ in get_engine().search(query, limit=None)}
 
+@timed()
 def get_food_recommendations(health_conditions, dietary_preferences=None):
     """Get food recommendations based on health conditions"""
     recommendations = {}
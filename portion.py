@@ -0,0 +1,106 @@
+"""
+Portion and quantity estimation for recognized dishes.
+
+Piece-based foods (anything with `calories_per_piece` in the recognizer's
+food_database) are counted as blobs of the dish's colour clusters over the
+whole frame, so other dishes nearby are not counted and pieces beyond the
+segmentation's region limit still are; touching pieces are split by
+comparing each blob to the typical piece size of the dish. Served foods
+(`calories_per_serving` / `calories_per_bowl`) are scaled by how much of the
+frame they fill compared with a reference portion.
+"""
+
+import cv2
+import numpy as np
+
+# Blobs smaller than this share of the crop are crumbs, garnish or noise
+MIN_PIECE_FRACTION = 0.01
+MAX_PIECES = 30
+
+# Share of the frame one standard portion fills in a top-down photo
+REFERENCE_FILL = {
+    'calories_per_serving': 0.30,
+    'calories_per_bowl': 0.20
+}
+MIN_SERVINGS = 0.5
+MAX_SERVINGS = 3.0
+
+_OPEN_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+
+def foreground_mask(image):
+    """Mask of pixels that differ from the crop's border (plate) colour"""
+    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB).astype(np.float32)
+    border = np.concatenate([lab[0], lab[-1], lab[:, 0], lab[:, -1]])
+    distance = np.linalg.norm(lab - np.median(border, axis=0), axis=2)
+    distance = cv2.normalize(distance, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    _, mask = cv2.threshold(distance, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, _OPEN_KERNEL)
+
+
+def _blob_areas(mask):
+    """Areas of the blobs in a binary mask that are big enough to be pieces"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    areas = stats[1:count, cv2.CC_STAT_AREA]
+    return areas[areas >= MIN_PIECE_FRACTION * mask.size]
+
+
+def _pieces(areas):
+    if areas.size == 0:
+        return 1
+
+    # The smallest real blob is taken as one piece, unless it is far below
+    # the median, in which case it is more likely a broken or hidden piece
+    typical = max(areas.min(), np.median(areas) / 2)
+    pieces = np.maximum(1, np.floor(areas / typical + 0.5)).sum()
+    return int(min(pieces, MAX_PIECES))
+
+
+def count_pieces(mask):
+    """Count pieces in a binary mask, splitting blobs of touching pieces"""
+    return _pieces(_blob_areas(mask))
+
+
+def count_pieces_in(image, bbox, mask=None):
+    """Count pieces inside bbox (x, y, w, h) of a BGR image
+
+    `mask` (bbox-sized, non-zero where the dish is, e.g. a segmentation
+    region's) is counted instead of the pixels that stand out from the box's
+    border, so other food reaching into the box is not counted.
+    """
+    return count_pieces_in_regions(image, [{'bbox': bbox, 'mask': mask}])
+
+
+def count_pieces_in_regions(image, regions):
+    """Count pieces of one dish over its regions (dicts of 'bbox' and optional 'mask')
+
+    Regions from propose_regions() are counted on the union of their
+    'cluster_mask's, which holds every piece of the dish's colours. Other
+    regions' blobs are pooled, so a region of touching pieces is split by the
+    size of single pieces found in the others.
+    """
+    cluster_masks = {id(region['cluster_mask']): region['cluster_mask']
+                     for region in regions if region.get('cluster_mask') is not None}
+    if cluster_masks:
+        masks = iter(cluster_masks.values())
+        dish = next(masks).copy()
+        for mask in masks:
+            dish |= mask
+        return count_pieces(dish)
+
+    areas = []
+    for region in regions:
+        x, y, w, h = region['bbox']
+        crop = image[y:y + h, x:x + w]
+        if crop.size == 0:
+            continue
+        mask = region.get('mask')
+        areas.append(_blob_areas(foreground_mask(crop) if mask is None else mask))
+    return _pieces(np.concatenate(areas) if areas else np.empty(0))
+
+
+def estimate_servings(filled_pixels, frame_pixels, serving_key):
+    """Servings implied by how much of the frame a dish fills, in half steps"""
+    fill = filled_pixels / frame_pixels if frame_pixels else 0.0
+    servings = fill / REFERENCE_FILL.get(serving_key, REFERENCE_FILL['calories_per_serving'])
+    return float(np.clip(np.round(servings * 2) / 2, MIN_SERVINGS, MAX_SERVINGS))
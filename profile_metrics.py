@@ -0,0 +1,51 @@
+"""
+Metrics derived from a user profile.
+
+BMI, BMR, daily calories, macro and water targets only change when the
+profile does, so they are computed once per distinct set of profile fields
+and shared by every page (and every session with the same profile).
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+
+from healthcalc import HealthCalculator
+from instrumentation import timed
+
+# Profile fields the metrics depend on; name and conditions do not matter
+PROFILE_FIELDS = ('age', 'weight', 'height', 'gender', 'activity_level', 'goal')
+
+
+def profile_fingerprint(profile):
+    """Short stable hash of the profile fields the metrics depend on"""
+    fields = {field: profile[field] for field in PROFILE_FIELDS}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=1024)
+def _derive(age, weight, height, gender, activity_level, goal):
+    fields = dict(zip(PROFILE_FIELDS, (age, weight, height, gender, activity_level, goal)))
+    bmi = HealthCalculator.calculate_bmi(weight, height)
+    # Unrounded, for advice thresholds such as the profile page's bmi > 25
+    exact_bmi = weight / (height / 100) ** 2
+    bmi_info = HealthCalculator.get_bmi_category(bmi)
+    bmr = HealthCalculator.calculate_bmr(weight, height, age, gender)
+    daily_calories = HealthCalculator.calculate_daily_calories(bmr, activity_level, goal)
+    return {
+        'fingerprint': profile_fingerprint(fields),
+        'bmi': bmi,
+        'exact_bmi': exact_bmi,
+        'bmi_category': bmi_info['category'],
+        'bmi_color': bmi_info['color'],
+        'bmr': bmr,
+        'daily_calories': daily_calories,
+        'macros': HealthCalculator.calculate_macronutrient_needs(daily_calories, goal),
+        'water_liters': HealthCalculator.calculate_water_needs(weight, activity_level)
+    }
+
+
+@timed('profile_metrics.derived_metrics')
+def derived_metrics(profile):
+    """Derived metrics of a profile; the returned dict is shared, do not modify it"""
+    return _derive(*(profile[field] for field in PROFILE_FIELDS))
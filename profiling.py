@@ -0,0 +1,137 @@
+"""
+On-demand profiling of single app reruns.
+
+A rerun is profiled when the page is opened with ?profile=1, or for every
+rerun while SWASTHYA_PROFILE is set. Each capture writes two files to
+SWASTHYA_PROFILE_DIR (default: ./profiles):
+
+    <timestamp>-<label>.pstats     cProfile output, readable with pstats/snakeviz
+    <timestamp>-<label>.collapsed  sampled stacks in the collapsed format used
+                                   by flamegraph.pl and speedscope
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get('SWASTHYA_PROFILE_DIR', 'profiles')
+PROFILE_ALWAYS = os.environ.get('SWASTHYA_PROFILE', '').lower() in ('1', 'true', 'yes', 'on')
+
+# Seconds between stack samples for the collapsed-stack file
+SAMPLE_INTERVAL = 0.005
+
+# Oldest captures are deleted beyond this many
+MAX_CAPTURES = 50
+
+
+def profiling_requested(query_params=None):
+    """Return True if this rerun should be profiled"""
+    if PROFILE_ALWAYS:
+        return True
+    if query_params is None:
+        return False
+    return str(query_params.get('profile', '')).lower() in ('1', 'true', 'yes', 'on')
+
+
+class _StackSampler:
+    """Samples the stack of one thread from a background thread"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='swasthya-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # Collapsed stacks list the root frame first
+            self.stacks[';'.join(reversed(names))] += 1
+
+
+def _prune(directory, keep=MAX_CAPTURES):
+    captures = list_captures(directory, limit=None)
+    for capture in captures[keep:]:
+        for path in (capture['pstats_path'], capture['collapsed_path']):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def capture(func, label='rerun', directory=None):
+    """Run `func` under cProfile and the stack sampler and write both profiles
+
+    Returns whatever `func` returns. The profile is written even if `func`
+    raises, since slow failures are worth profiling too.
+    """
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{label}")
+
+    profiler = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident())
+    sampler.start()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+        profiler.dump_stats(stem + '.pstats')
+        with open(stem + '.collapsed', 'w') as f:
+            for stack, samples in sampler.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+        _prune(directory)
+
+
+def list_captures(directory=None, limit=20):
+    """Return recent captures, newest first"""
+    directory = directory or PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+
+    captures = []
+    for filename in os.listdir(directory):
+        if not filename.endswith('.pstats'):
+            continue
+        stem = filename[:-len('.pstats')]
+        pstats_path = os.path.join(directory, filename)
+        collapsed_path = os.path.join(directory, stem + '.collapsed')
+        captures.append({
+            'name': stem,
+            'captured_at': datetime.fromtimestamp(os.path.getmtime(pstats_path)).strftime('%Y-%m-%d %H:%M:%S'),
+            'size_kb': round(os.path.getsize(pstats_path) / 1024, 1),
+            'pstats_path': pstats_path,
+            'collapsed_path': collapsed_path if os.path.exists(collapsed_path) else None
+        })
+
+    captures.sort(key=lambda c: c['name'], reverse=True)
+    return captures if limit is None else captures[:limit]
+
+
+def summarize(pstats_path, sort='cumulative', limit=25):
+    """Return the top of a pstats report as text"""
+    stream = io.StringIO()
+    stats = pstats.Stats(pstats_path, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,288 @@
+"""
+Compact in-memory logs for food intake and completed exercises.
+
+Instead of one dict per entry, each log keeps one growable NumPy array per
+field: food and exercise names are interned to small integer ids and times
+are stored as integer epoch seconds. Catalog foods use their catalog ids;
+any other name is interned by the log itself, so user-typed names go away
+with the log (and its session) instead of piling up for the process. Indexing a log returns a small
+`__slots__` dataclass, and `to_frame()` hands the columns to pandas directly
+(names as categoricals) without walking any Python objects.
+
+    log = IntakeLog()
+    log.append('Dal Bhat (1 plate)', 420, method='Manual Entry')
+    log[0].name, log[0].time, log.total_calories(), log.to_frame()
+"""
+
+import threading
+import time as _time
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import nepalifood
+
+
+class Interner:
+    """Bidirectional string <-> small integer id table"""
+
+    def __init__(self, initial=()):
+        self.values = list(initial)
+        self.ids = {value: i for i, value in enumerate(self.values)}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    def id(self, value):
+        """Id of `value`, assigning the next free id to new values"""
+        found = self.ids.get(value)
+        if found is None:
+            # Sessions run on separate threads; ids must stay unique
+            with self._lock:
+                found = self.ids.get(value)
+                if found is None:
+                    found = len(self.values)
+                    self.values.append(value)
+                    self.ids[value] = found
+        return found
+
+    def value(self, value_id):
+        return self.values[value_id]
+
+
+# Food ids below CATALOG_SIZE are catalog food ids; foods that are not in
+# the catalog (e.g. meal plan dishes) get per-log ids after them
+CATALOG_SIZE = len(nepalifood.FOOD_NAMES)
+# Shared by every log in the process: entry methods are set by the code
+METHODS = Interner()
+
+
+class _Columns:
+    """Equal-length growable NumPy columns with amortized O(1) append"""
+
+    def __init__(self, dtypes, capacity=16):
+        self._size = 0
+        self._data = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def __len__(self):
+        return self._size
+
+    def append(self, **values):
+        if self._size == len(next(iter(self._data.values()))):
+            for name, array in self._data.items():
+                grown = np.empty(max(16, 2 * len(array)), dtype=array.dtype)
+                grown[:self._size] = array[:self._size]
+                self._data[name] = grown
+        for name, value in values.items():
+            self._data[name][self._size] = value
+        self._size += 1
+
+    def delete(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('log index out of range')
+        for array in self._data.values():
+            array[index:self._size - 1] = array[index + 1:self._size]
+        self._size -= 1
+
+    def column(self, name):
+        """Read-only view of the filled part of a column"""
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def nbytes(self):
+        return sum(array[:self._size].nbytes for array in self._data.values())
+
+
+def _clock(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M")
+
+
+@dataclass(slots=True, frozen=True)
+class IntakeEntry:
+    name: str
+    calories: int
+    timestamp: int
+    method: str
+    food_id: int
+    servings: float
+
+    @property
+    def time(self):
+        """Time of day as HH:MM"""
+        return _clock(self.timestamp)
+
+
+@dataclass(slots=True, frozen=True)
+class ExerciseEntry:
+    exercise: str
+    duration: str
+    calories: int
+    timestamp: int
+
+    @property
+    def time(self):
+        return _clock(self.timestamp)
+
+    @property
+    def date(self):
+        return datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d")
+
+
+class _Log:
+    """Shared list-like behaviour of the struct-of-arrays logs"""
+
+    DTYPES = {}
+
+    def __init__(self):
+        self._columns = _Columns(self.DTYPES)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __bool__(self):
+        return len(self._columns) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('log index out of range')
+        return self._entry(index)
+
+    def __iter__(self):
+        return (self._entry(i) for i in range(len(self)))
+
+    def pop(self, index=-1):
+        entry = self[index]
+        self._columns.delete(index)
+        return entry
+
+    def column(self, name):
+        return self._columns.column(name)
+
+    def total_calories(self):
+        return int(self.column('calories').sum(dtype=np.int64))
+
+    def nbytes(self):
+        """Bytes held by the filled columns"""
+        return self._columns.nbytes()
+
+
+class IntakeLog(_Log):
+    """Foods eaten, one row per logged item"""
+
+    DTYPES = {'food': np.int32, 'calories': np.int32, 'timestamp': np.int64, 'method': np.int8,
+              'servings': np.float32}
+
+    def __init__(self):
+        super().__init__()
+        # Names outside the catalog, as ids from CATALOG_SIZE on
+        self._other_foods = Interner()
+
+    def _food_id(self, name):
+        food = nepalifood.food_id(name)
+        return CATALOG_SIZE + self._other_foods.id(name) if food is None else food
+
+    def _food_name(self, food):
+        return nepalifood.FOOD_NAMES[food] if food < CATALOG_SIZE else self._other_foods.value(food - CATALOG_SIZE)
+
+    def append(self, name, calories, method='Manual Entry', timestamp=None, servings=None):
+        """Log a food; servings default to calories over the catalog serving
+
+        Foods outside the catalog, and catalog foods listed with 0 calories
+        (water, black tea), count as 1.0 serving.
+        """
+        food = self._food_id(name)
+        if servings is None:
+            serving_calories = nepalifood.NUTRIENTS[food, 0] if food < CATALOG_SIZE else 0
+            servings = calories / serving_calories if serving_calories > 0 else 1.0
+        self._columns.append(
+            food=food,
+            calories=calories,
+            timestamp=int(_time.time()) if timestamp is None else timestamp,
+            method=METHODS.id(method),
+            servings=servings
+        )
+
+    def _entry(self, i):
+        return IntakeEntry(
+            name=self._food_name(int(self.column('food')[i])),
+            calories=int(self.column('calories')[i]),
+            timestamp=int(self.column('timestamp')[i]),
+            method=METHODS.value(self.column('method')[i]),
+            food_id=int(self.column('food')[i]),
+            servings=float(self.column('servings')[i])
+        )
+
+    def food_counts(self):
+        """{food name: times logged}, counted on the id column"""
+        counts = np.bincount(self.column('food'))
+        return {self._food_name(int(i)): int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def nutrient_totals(self):
+        """{nutrient: total} over catalog foods, weighted by servings
+
+        Servings are summed per food id and multiplied with the catalog's
+        nutrient table, so no names are looked up. Foods outside the catalog
+        only count towards calories.
+        """
+        food = self.column('food')
+        in_catalog = food < CATALOG_SIZE
+        servings = np.bincount(food[in_catalog], weights=self.column('servings')[in_catalog], minlength=CATALOG_SIZE)
+        totals = dict(zip(nepalifood.NUTRIENT_FIELDS, (servings @ nepalifood.NUTRIENTS).tolist()))
+        totals['calories'] = self.total_calories()
+        return totals
+
+    def to_frame(self):
+        """Columnar pandas view: name, calories, time (UTC), method"""
+        return pd.DataFrame({
+            'name': pd.Categorical.from_codes(self.column('food'),
+                                              categories=[*nepalifood.FOOD_NAMES, *self._other_foods.values]),
+            'calories': self.column('calories'),
+            'time': pd.to_datetime(self.column('timestamp'), unit='s', utc=True),
+            'method': pd.Categorical.from_codes(self.column('method'), categories=METHODS.values)
+        })
+
+
+class ExerciseLog(_Log):
+    """Completed exercises, one row per session"""
+
+    DTYPES = {'exercise': np.int32, 'duration': np.int16, 'calories': np.int32, 'timestamp': np.int64}
+
+    def __init__(self):
+        super().__init__()
+        self._exercises = Interner()
+        self._durations = Interner()
+
+    def append(self, exercise, duration, calories, timestamp=None):
+        self._columns.append(
+            exercise=self._exercises.id(exercise),
+            duration=self._durations.id(duration),
+            calories=calories,
+            timestamp=int(_time.time()) if timestamp is None else timestamp
+        )
+
+    def _entry(self, i):
+        return ExerciseEntry(
+            exercise=self._exercises.value(self.column('exercise')[i]),
+            duration=self._durations.value(self.column('duration')[i]),
+            calories=int(self.column('calories')[i]),
+            timestamp=int(self.column('timestamp')[i])
+        )
+
+    def to_frame(self):
+        """Columnar pandas view: exercise, duration, calories, time (UTC)"""
+        return pd.DataFrame({
+            'exercise': pd.Categorical.from_codes(self.column('exercise'), categories=self._exercises.values),
+            'duration': pd.Categorical.from_codes(self.column('duration'), categories=self._durations.values),
+            'calories': self.column('calories'),
+            'time': pd.to_datetime(self.column('timestamp'), unit='s', utc=True)
+        })
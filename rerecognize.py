@@ -0,0 +1,216 @@
+"""
+Re-run the recognizer over every stored meal photo.
+
+After a recognizer upgrade (a new ONNX model or new dish signatures), this job
+walks the thumbnail store, recognizes the photos again and rewrites the meals
+logged from them, so historical calorie logs match what the current model
+sees:
+    python rerecognize.py
+    python rerecognize.py --workers 4 --batch-size 32 --max-rate 20 --nice 10
+
+Thumbnails are streamed from disk in digest order and split into batches.
+Each worker process owns a recognizer and classifies all regions of a batch
+in one call. Results are written back one bulk transaction per batch, and a
+checkpoint file is updated after every commit, so an interrupted run resumes
+where it stopped. The checkpoint remembers which model it belongs to; after
+another upgrade the job starts over.
+
+Photos the new model recognizes nothing in keep their old meals. Only photos
+stored before the first run started are processed; later scans were already
+made with the new model.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import cv2
+
+from features import extract_features
+from foodrecognition import SCANNER_FOOD_NAMES, NepaleseFoodRecognizer
+from storage import MealStore
+
+CHECKPOINT_NAME = 'rerecognize.checkpoint.json'
+
+# Seconds between progress lines
+REPORT_INTERVAL = 5.0
+
+_recognizer = None
+
+
+def model_tag(recognizer):
+    """Identify the recognizer's model so checkpoints of other models are ignored"""
+    if recognizer.classifier is not None:
+        path = recognizer.classifier.model_path
+        stat = os.stat(path)
+        return f'{recognizer.classifier.backend}:{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}'
+    matcher = recognizer.matcher
+    digest = hashlib.sha1(f'{matcher.TEMPERATURE}:{matcher.MAX_DISTANCE}'.encode())
+    if matcher.index is not None:
+        # The index is memory-mapped and may be large; hash its files in chunks
+        for path in matcher.index.files():
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return f'index:{digest.hexdigest()[:16]}'
+    digest.update(matcher.matrix.tobytes())
+    return f'signatures:{digest.hexdigest()[:16]}'
+
+
+def new_checkpoint(tag):
+    return {'model': tag, 'started_at': time.time(), 'last_digest': '', 'processed': 0, 'corrected': 0}
+
+
+def load_checkpoint(path, tag):
+    """Saved progress for this model, or a fresh checkpoint"""
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('model') == tag:
+            return checkpoint
+    except (OSError, ValueError):
+        pass
+    return new_checkpoint(tag)
+
+
+def save_checkpoint(path, checkpoint):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temporary, path)
+
+
+def _init_worker(nice=0):
+    """Per-process setup: one recognizer, one OpenCV thread, optional lower priority"""
+    global _recognizer
+    # Parallelism comes from the pool; extra threads per worker just contend
+    cv2.setNumThreads(1)
+    if nice:
+        os.nice(nice)
+    _recognizer = NepaleseFoodRecognizer()
+
+
+def recognize_batch(batch):
+    """Recognize a batch of thumbnails; returns (digest, foods, features) per readable image"""
+    digests, images = [], []
+    for thumbnail in batch:
+        image = cv2.imread(thumbnail['path'])
+        if image is not None:
+            digests.append(thumbnail['digest'])
+            images.append(image)
+    if not images:
+        return []
+
+    results = []
+    for digest, image, detections in zip(digests, images, _recognizer.detect_food_items_batch(images)):
+        foods = [
+            {
+                'name': SCANNER_FOOD_NAMES[food['name']],
+                'calories': food['calories'],
+                'serving_info': food['serving_info']
+            }
+            for food in detections if food['name'] in SCANNER_FOOD_NAMES
+        ]
+        features = extract_features(_recognizer.preprocess_image(image))
+        results.append((digest, foods, features))
+    return results
+
+
+def stream_batches(store, after, created_before, batch_size):
+    """Yield lists of thumbnails after `after`, reading one page at a time"""
+    while True:
+        batch = store.thumbnails_after(after, created_before, limit=batch_size)
+        if not batch:
+            return
+        yield batch
+        after = batch[-1]['digest']
+
+
+def run(store=None, workers=2, batch_size=32, max_rate=None, nice=0, checkpoint_path=None,
+        restart=False, dry_run=False, log=print):
+    """Re-recognize all stored photos; returns the final checkpoint"""
+    store = store or MealStore()
+    checkpoint_path = checkpoint_path or os.path.join(store.directory, CHECKPOINT_NAME)
+
+    _init_worker()
+    tag = model_tag(_recognizer)
+    checkpoint = new_checkpoint(tag) if restart else load_checkpoint(checkpoint_path, tag)
+    if checkpoint['last_digest']:
+        log(f"Resuming after {checkpoint['processed']} photos")
+
+    start = time.perf_counter()
+    done_this_run = 0
+    last_report = start
+
+    def commit(batch, results):
+        nonlocal done_this_run, last_report
+        corrections = [result for result in results if result[1]]
+        if not dry_run:
+            checkpoint['corrected'] += store.replace_scan_results(corrections)
+        checkpoint['last_digest'] = batch[-1]['digest']
+        checkpoint['processed'] += len(batch)
+        if not dry_run:
+            save_checkpoint(checkpoint_path, checkpoint)
+        done_this_run += len(batch)
+
+        now = time.perf_counter()
+        if now - last_report >= REPORT_INTERVAL:
+            log(f"{checkpoint['processed']} photos, {done_this_run / (now - start):.1f} images/s")
+            last_report = now
+
+        # Throttle: never run ahead of max_rate images per second on average
+        if max_rate:
+            ahead = done_this_run / max_rate - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    batches = stream_batches(store, checkpoint['last_digest'], checkpoint['started_at'], batch_size)
+    if workers <= 1:
+        if nice:
+            os.nice(nice)
+        for batch in batches:
+            commit(batch, recognize_batch(batch))
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(nice,)) as pool:
+            # A bounded window keeps workers busy without reading the whole store ahead
+            pending = deque()
+            for batch in batches:
+                pending.append((batch, pool.apply_async(recognize_batch, (batch,))))
+                if len(pending) >= 2 * workers:
+                    batch, result = pending.popleft()
+                    commit(batch, result.get())
+            while pending:
+                batch, result = pending.popleft()
+                commit(batch, result.get())
+
+    elapsed = time.perf_counter() - start
+    rate = done_this_run / elapsed if elapsed else 0.0
+    log(f"Done: {done_this_run} photos in {elapsed:.1f}s ({rate:.1f} images/s), "
+        f"{checkpoint['corrected']} meal rows rewritten")
+    return checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-run the recognizer over all stored meal photos')
+    parser.add_argument('--data-dir', help='meal store directory (default: SWASTHYA_DATA_DIR or ./data)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='recognizer processes (default: half the CPUs)')
+    parser.add_argument('--batch-size', type=int, default=32, help='photos per batch and per transaction')
+    parser.add_argument('--max-rate', type=float, help='cap on images per second')
+    parser.add_argument('--nice', type=int, default=0, help='lower the workers\' CPU priority by this much')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start over')
+    parser.add_argument('--dry-run', action='store_true', help='recognize but write nothing')
+    args = parser.parse_args(argv)
+
+    run(MealStore(args.data_dir), workers=args.workers, batch_size=args.batch_size, max_rate=args.max_rate,
+        nice=args.nice, restart=args.restart, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
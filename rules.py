@@ -0,0 +1,233 @@
+"""
+Declarative health recommendation rules.
+
+Every piece of advice the app gives is one row of RULES. A rule fires when
+all of its clauses hold:
+    'condition'  the user has this health condition
+    'food'       some food in the meal has this text in its name
+    'when'       categorical facts match, e.g. {'activity_level': 'Sedentary'}
+    'range'      numeric facts fall in [low, high), e.g. {'bmi': (25, 30)};
+                 None leaves a side open
+    'fallback'   only fires when no other rule of its set did
+
+Rules are grouped into sets, one per place advice is shown. Each set is
+compiled once into bitmasks and threshold arrays, so a whole batch of users
+(or user-days) is evaluated in a few NumPy operations:
+    RULESETS['health_profile'].evaluate(['Diabetes'], bmi=27.3, activity_level='Sedentary')
+    RULESETS['scan'].evaluate_batch(conditions, foods, bmi=bmi_array)
+
+Output is deduplicated and follows the order of RULES.
+"""
+
+import numpy as np
+
+RULES = (
+    # Scanned meals (foodrecognition)
+    {'set': 'scan', 'condition': 'Diabetes', 'food': 'Dal Bhat',
+     'advice': "Consider brown rice instead of white rice for better blood sugar control"},
+    {'set': 'scan', 'condition': 'Diabetes', 'food': 'Sel Roti',
+     'advice': "Limit sweet items like Sel Roti due to high sugar content"},
+    {'set': 'scan', 'condition': 'Hypertension',
+     'advice': "Be mindful of salt content in traditional preparations"},
+    {'set': 'scan', 'condition': 'Hypertension',
+     'advice': "Consider steamed momos instead of fried versions"},
+    {'set': 'scan', 'condition': 'Heart Disease',
+     'advice': "Choose lean protein options and limit ghee usage"},
+    {'set': 'scan', 'condition': 'Heart Disease',
+     'advice': "Include more vegetables in your Dal Bhat"},
+    {'set': 'scan', 'fallback': True,
+     'advice': "Your food choices look balanced! Maintain portion control."},
+
+    # Profile-based advice (HealthCalculator)
+    {'set': 'health_profile', 'range': {'bmi': (None, 18.5)},
+     'advice': 'Consider increasing calorie intake with healthy foods'},
+    {'set': 'health_profile', 'range': {'bmi': (18.5, 25)},
+     'advice': 'Maintain your current healthy weight'},
+    {'set': 'health_profile', 'range': {'bmi': (25, 30)},
+     'advice': 'Consider reducing calorie intake and increasing exercise'},
+    {'set': 'health_profile', 'range': {'bmi': (30, None)},
+     'advice': 'Consult healthcare provider for weight management plan'},
+    {'set': 'health_profile', 'condition': 'Diabetes', 'advice': 'Choose brown rice over white rice in Dal Bhat'},
+    {'set': 'health_profile', 'condition': 'Diabetes', 'advice': 'Monitor portion sizes and eat regular meals'},
+    {'set': 'health_profile', 'condition': 'Diabetes', 'advice': 'Include high-fiber vegetables in every meal'},
+    {'set': 'health_profile', 'condition': 'Hypertension', 'advice': 'Reduce salt in cooking and avoid pickled foods'},
+    {'set': 'health_profile', 'condition': 'Hypertension', 'advice': 'Include potassium-rich foods like bananas'},
+    {'set': 'health_profile', 'condition': 'Hypertension', 'advice': 'Limit processed and canned foods'},
+    {'set': 'health_profile', 'condition': 'Heart Disease', 'advice': 'Choose lean proteins and limit red meat'},
+    {'set': 'health_profile', 'condition': 'Heart Disease', 'advice': 'Include omega-3 rich foods like fish'},
+    {'set': 'health_profile', 'condition': 'Heart Disease', 'advice': 'Use minimal ghee and oil in cooking'},
+    {'set': 'health_profile', 'when': {'activity_level': 'Sedentary'},
+     'advice': 'Try to include at least 30 minutes of walking daily'},
+
+    # Meal improvement suggestions (NutritionAnalyzer)
+    {'set': 'meal', 'condition': 'Diabetes', 'advice': 'Add more fiber-rich vegetables'},
+    {'set': 'meal', 'condition': 'Diabetes', 'advice': 'Choose whole grains over refined grains'},
+    {'set': 'meal', 'condition': 'Diabetes', 'advice': 'Include lean protein to slow carb absorption'},
+    {'set': 'meal', 'condition': 'Hypertension', 'advice': 'Reduce salt and use herbs for flavor'},
+    {'set': 'meal', 'condition': 'Hypertension', 'advice': 'Add potassium-rich foods like tomatoes'},
+    {'set': 'meal', 'condition': 'Hypertension', 'advice': 'Include garlic for natural blood pressure support'},
+    {'set': 'meal', 'condition': 'Heart Disease', 'advice': 'Use minimal oil and choose healthy fats'},
+    {'set': 'meal', 'condition': 'Heart Disease', 'advice': 'Include antioxidant-rich colorful vegetables'},
+    {'set': 'meal', 'condition': 'Heart Disease', 'advice': 'Add omega-3 sources like walnuts or fish'},
+
+    # Profile page of the app
+    {'set': 'profile_page', 'range': {'bmi': (None, 18.5)},
+     'advice': "Consider increasing calorie intake with healthy Nepali foods like nuts and dairy"},
+    # The page has always used bmi > 25 on the unrounded BMI, so 25 itself is excluded
+    {'set': 'profile_page', 'range': {'bmi': (np.nextafter(25, np.inf), None)},
+     'advice': "Focus on portion control and include more vegetables in your Dal Bhat"},
+    {'set': 'profile_page', 'condition': 'Diabetes',
+     'advice': "Choose brown rice over white rice and monitor carbohydrate portions"},
+    {'set': 'profile_page', 'condition': 'Hypertension',
+     'advice': "Reduce salt in your cooking and avoid pickled foods"},
+    {'set': 'profile_page', 'fallback': True,
+     'advice': "Maintain your current healthy lifestyle with balanced Nepali meals!"},
+)
+
+# Categorical code of a rule that does not test that fact
+_ANY = -1
+# Categorical code of a value no rule mentions
+_UNKNOWN = -2
+
+
+def _vocabulary(values):
+    """Stable index of distinct values in first-seen order"""
+    index = {}
+    for value in values:
+        index.setdefault(value, len(index))
+    return index
+
+
+class RuleSet:
+    """One set of rules compiled into bitmasks and threshold arrays"""
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = list(rules)
+
+        self.conditions = _vocabulary(rule['condition'] for rule in self.rules if 'condition' in rule)
+        self.food_tags = _vocabulary(rule['food'] for rule in self.rules if 'food' in rule)
+        if len(self.conditions) > 64 or len(self.food_tags) > 64:
+            raise ValueError(f"Rule set {name!r} has more than 64 conditions or food tags")
+
+        self.advice = list(_vocabulary(rule['advice'] for rule in self.rules))
+        advice_ids = {text: i for i, text in enumerate(self.advice)}
+
+        count = len(self.rules)
+        self._need_conditions = np.zeros(count, dtype=np.uint64)
+        self._need_foods = np.zeros(count, dtype=np.uint64)
+        self._fallback = np.zeros(count, dtype=bool)
+        self._advice_matrix = np.zeros((count, len(self.advice)), dtype=np.uint8)
+        self._ranges = {}
+        self._categories = {}
+        self._category_codes = {}
+
+        for i, rule in enumerate(self.rules):
+            if 'condition' in rule:
+                self._need_conditions[i] = np.uint64(1) << np.uint64(self.conditions[rule['condition']])
+            if 'food' in rule:
+                self._need_foods[i] = np.uint64(1) << np.uint64(self.food_tags[rule['food']])
+            self._fallback[i] = rule.get('fallback', False)
+            self._advice_matrix[i, advice_ids[rule['advice']]] = 1
+
+            for fact, (low, high) in rule.get('range', {}).items():
+                bounds = self._ranges.setdefault(fact, np.tile([-np.inf, np.inf], (count, 1)))
+                bounds[i] = (-np.inf if low is None else low, np.inf if high is None else high)
+
+            for fact, value in rule.get('when', {}).items():
+                codes = self._category_codes.setdefault(fact, {})
+                column = self._categories.setdefault(fact, np.full(count, _ANY, dtype=np.int64))
+                column[i] = codes.setdefault(value, len(codes))
+
+        self._food_masks = {}
+
+    def _food_mask(self, food_name):
+        """Tag bits of one food name; substring tests run once per distinct name"""
+        mask = self._food_masks.get(food_name)
+        if mask is None:
+            mask = 0
+            for tag, bit in self.food_tags.items():
+                if tag in food_name:
+                    mask |= 1 << bit
+            self._food_masks[food_name] = mask
+        return mask
+
+    def encode_conditions(self, condition_lists):
+        """uint64 condition bitmask per subject from lists of condition names"""
+        return np.fromiter(
+            (sum(1 << self.conditions[c] for c in set(conditions) if c in self.conditions)
+             for conditions in condition_lists),
+            dtype=np.uint64, count=len(condition_lists))
+
+    def encode_foods(self, food_lists):
+        """uint64 food tag bitmask per subject from lists of food names"""
+        if not self.food_tags:
+            return np.zeros(len(food_lists), dtype=np.uint64)
+        masks = np.zeros(len(food_lists), dtype=np.uint64)
+        for i, foods in enumerate(food_lists):
+            mask = 0
+            for food in foods:
+                mask |= self._food_mask(food)
+            masks[i] = mask
+        return masks
+
+    def _encode_category(self, fact, values):
+        codes = self._category_codes[fact]
+        values = np.asarray(values)
+        distinct, inverse = np.unique(values, return_inverse=True)
+        lookup = np.array([codes.get(value, _UNKNOWN) for value in distinct.tolist()], dtype=np.int64)
+        return lookup[inverse.reshape(values.shape)]
+
+    def fired(self, conditions, foods=None, **facts):
+        """(N, rules) boolean matrix of fired rules for encoded subjects
+
+        `conditions` and `foods` are uint64 masks from encode_conditions and
+        encode_foods; facts are arrays of numbers or category values.
+        """
+        conditions = np.asarray(conditions, dtype=np.uint64)
+        foods = np.zeros_like(conditions) if foods is None else np.asarray(foods, dtype=np.uint64)
+
+        fires = (conditions[:, None] & self._need_conditions) == self._need_conditions
+        fires &= (foods[:, None] & self._need_foods) == self._need_foods
+
+        for fact, bounds in self._ranges.items():
+            if fact not in facts:
+                raise ValueError(f"Rule set {self.name!r} needs fact {fact!r}")
+            values = np.asarray(facts[fact], dtype=np.float64)[:, None]
+            fires &= (values >= bounds[:, 0]) & (values < bounds[:, 1])
+
+        for fact, column in self._categories.items():
+            if fact not in facts:
+                raise ValueError(f"Rule set {self.name!r} needs fact {fact!r}")
+            codes = self._encode_category(fact, facts[fact])[:, None]
+            fires &= (column == _ANY) | (codes == column)
+
+        regular = fires & ~self._fallback
+        fires = regular | (fires & self._fallback & ~regular.any(axis=1, keepdims=True))
+        return fires
+
+    def evaluate_batch(self, conditions, foods=None, **facts):
+        """(N, len(self.advice)) boolean matrix: which advice each subject gets"""
+        fired = self.fired(conditions, foods, **facts)
+        return (fired.astype(np.uint8) @ self._advice_matrix) > 0
+
+    def advice_for(self, row):
+        """Advice texts of one row of evaluate_batch(), in table order"""
+        return [self.advice[i] for i in np.flatnonzero(row)]
+
+    def evaluate(self, conditions=(), foods=(), **facts):
+        """Advice for a single subject given condition names, food names and facts"""
+        batch_facts = {fact: [value] for fact, value in facts.items()}
+        matrix = self.evaluate_batch(self.encode_conditions([conditions]), self.encode_foods([foods]), **batch_facts)
+        return self.advice_for(matrix[0])
+
+
+def compile_rules(rules=RULES):
+    """Compile a rule table into {set name: RuleSet}"""
+    grouped = {}
+    for rule in rules:
+        grouped.setdefault(rule['set'], []).append(rule)
+    return {name: RuleSet(name, set_rules) for name, set_rules in grouped.items()}
+
+
+RULESETS = compile_rules()
@@ -0,0 +1,153 @@
+"""
+Region proposals for multi-dish plates.
+
+A thali keeps rice, dal, tarkari and achar in separate zones, so the scanner
+splits the preprocessed image into food regions before recognizing them.
+Pixels are clustered by colour (k-means in Lab space on a small copy of the
+image); the cluster that covers most of the image border is taken to be the
+plate or table, and connected components of the remaining clusters become
+regions. Clusters that cover a large share of the image are treated as
+plate or table too. Flat images (a blank frame, a lens cap) have no regions.
+"""
+
+import cv2
+import numpy as np
+
+# Longest side of the copy the clustering runs on
+SEGMENT_SIZE = 160
+
+COLOUR_CLUSTERS = 8
+MAX_REGIONS = 6
+
+# Regions smaller than this share of the image, or than this many pixels of
+# the clustering copy, are treated as noise
+MIN_REGION_FRACTION = 0.01
+MIN_REGION_PIXELS = 64
+# Images whose Lab channels all vary less than this are one flat colour
+MIN_COLOUR_STD = 2.0
+# Clusters larger than this share of the image are plate or table
+MAX_CLUSTER_FRACTION = 0.35
+
+_KMEANS_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+_CLOSE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+
+def _initial_labels(pixels, seed=0):
+    """k-means++ seeding with a local generator, as labels for cv2.kmeans
+
+    Seeding here rather than with cv2.setRNGSeed keeps proposals stable across
+    reruns on the same photo without touching OpenCV's global RNG.
+    """
+    rng = np.random.default_rng(seed)
+    centers = [pixels[rng.integers(len(pixels))]]
+    nearest = ((pixels - centers[0]) ** 2).sum(axis=1)
+    for _ in range(COLOUR_CLUSTERS - 1):
+        total = nearest.sum()
+        choice = rng.choice(len(pixels), p=nearest / total) if total > 0 else rng.integers(len(pixels))
+        centers.append(pixels[choice])
+        nearest = np.minimum(nearest, ((pixels - pixels[choice]) ** 2).sum(axis=1))
+    distances = ((pixels[:, None, :] - np.array(centers)[None]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1).astype(np.int32).reshape(-1, 1)
+
+
+def _cluster_labels(lab):
+    """Per-pixel colour cluster ids of a small Lab image"""
+    pixels = lab.reshape(-1, 3).astype(np.float32)
+    _, labels, _ = cv2.kmeans(pixels, COLOUR_CLUSTERS, _initial_labels(pixels), _KMEANS_CRITERIA, 1,
+                              cv2.KMEANS_USE_INITIAL_LABELS)
+    return labels.reshape(lab.shape[:2])
+
+
+def _flat(lab):
+    return lab.shape[0] * lab.shape[1] < MIN_REGION_PIXELS or lab.reshape(-1, 3).std(axis=0).max() < MIN_COLOUR_STD
+
+
+def _small(image):
+    """(copy of `image` with longest side SEGMENT_SIZE at most, scale factor)"""
+    height, width = image.shape[:2]
+    scale = min(1.0, SEGMENT_SIZE / max(height, width))
+    if scale == 1.0:
+        return image, scale
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                      interpolation=cv2.INTER_AREA), scale
+
+
+def is_flat(image):
+    """Whether a BGR image is too small or too uniform to hold any food"""
+    return _flat(cv2.cvtColor(_small(image)[0], cv2.COLOR_BGR2LAB))
+
+
+def _background_clusters(labels):
+    """Cluster ids of the plate/table: the main border cluster and any huge cluster"""
+    border = np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+    background = {int(np.bincount(border, minlength=COLOUR_CLUSTERS).argmax())}
+    sizes = np.bincount(labels.ravel(), minlength=COLOUR_CLUSTERS)
+    background.update(np.flatnonzero(sizes > MAX_CLUSTER_FRACTION * labels.size).tolist())
+    return background
+
+
+def propose_regions(image, max_regions=MAX_REGIONS):
+    """Return food regions of a BGR image, largest first
+
+    Each region is a dict with 'bbox' as (x, y, w, h) in the coordinates of
+    `image`, 'area' in pixels and a uint8 'mask' covering the bbox.
+    'cluster_mask' marks every piece of the region's colour cluster on the
+    small clustering copy, including pieces beyond max_regions; regions of
+    one cluster share it.
+    """
+    height, width = image.shape[:2]
+    small, scale = _small(image)
+    lab = cv2.cvtColor(small, cv2.COLOR_BGR2LAB)
+    if _flat(lab):
+        return []
+
+    labels = _cluster_labels(lab)
+    background = _background_clusters(labels)
+    min_area = max(MIN_REGION_FRACTION * labels.size, MIN_REGION_PIXELS)
+
+    candidates = []
+    for cluster in range(COLOUR_CLUSTERS):
+        if cluster in background:
+            continue
+        mask = (labels == cluster).astype(np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _CLOSE_KERNEL)
+        count, components, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        cluster_mask = mask * 255
+        for component in range(1, count):
+            x, y, w, h, area = stats[component]
+            if area >= min_area:
+                candidates.append((area, cluster_mask, component, components, (x, y, w, h)))
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+
+    regions = []
+    inverse = 1.0 / scale
+    for area, cluster_mask, component, components, (x, y, w, h) in candidates[:max_regions]:
+        small_mask = (components[y:y + h, x:x + w] == component).astype(np.uint8) * 255
+        bx, by = int(x * inverse), int(y * inverse)
+        bw = max(1, min(width - bx, int(np.ceil(w * inverse))))
+        bh = max(1, min(height - by, int(np.ceil(h * inverse))))
+        regions.append({
+            'bbox': (bx, by, bw, bh),
+            'area': int(area * inverse * inverse),
+            'mask': small_mask if scale == 1.0 else cv2.resize(small_mask, (bw, bh), interpolation=cv2.INTER_NEAREST),
+            'cluster_mask': cluster_mask
+        })
+
+    return regions
+
+
+def whole_image_region(image):
+    """A single region covering the whole image"""
+    height, width = image.shape[:2]
+    return {
+        'bbox': (0, 0, width, height),
+        'area': width * height,
+        'mask': np.full((height, width), 255, dtype=np.uint8)
+    }
+
+
+def crop(image, region):
+    """The part of `image` inside a region's bbox"""
+    x, y, w, h = region['bbox']
+    return image[y:y + h, x:x + w]
@@ -0,0 +1,239 @@
+"""
+Per-user state shared by every tab of the app, bounded in memory.
+
+A UserSession holds one user's profile, today's intake, today's exercise
+log and the foods they log most (frequent_foods.py, for quick-add). Every
+change is written through to the MealStore, so the in-memory copy is only
+a cache: SessionManager keeps the most recently used sessions (at
+most `capacity`), drops sessions idle for longer than `idle_seconds`, and
+rebuilds a dropped session from the store the next time that user shows up.
+Tabs of the same user share one session instead of each holding a copy.
+
+    manager = SessionManager(store, capacity=256, idle_seconds=1800)
+    session = manager.get('patient-17')
+    session.log_food('Dal Bhat (1 plate)', 420)
+    manager.memory_report()
+"""
+
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+import instrumentation
+from frequent_foods import FrequentFoods
+from profile_metrics import derived_metrics
+from records import ExerciseLog, IntakeLog
+
+SESSION_CAPACITY = 256
+SESSION_IDLE_SECONDS = 30 * 60
+EVICTION_INTERVAL_SECONDS = 60
+
+# Profile of a user who has not saved one yet
+DEFAULT_PROFILE = {
+    'name': 'Priya Sharma',
+    'age': 28,
+    'weight': 58,
+    'height': 162,
+    'gender': 'Female',
+    'activity_level': 'Moderate',
+    'goal': 'Maintain Weight',
+    'health_conditions': ['None']
+}
+
+
+def _epoch(logged_at):
+    return int(datetime.fromisoformat(logged_at).timestamp())
+
+
+def _deep_sizeof(value):
+    """Approximate bytes of a small tree of dicts, lists and scalars"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_deep_sizeof(item) for item in value)
+    return size
+
+
+class UserSession:
+    """One user's profile and today's logs, written through to the store"""
+
+    def __init__(self, store, user_id):
+        self.store = store
+        self.user_id = user_id
+        self.last_seen = time.time()
+        self._lock = threading.RLock()
+        self._metrics = None
+        self.reload()
+
+    def reload(self):
+        """Rebuild the session from the store"""
+        with self._lock:
+            self.day = date.today()
+            since = self.day.isoformat()
+            self.profile = self.store.load_profile(self.user_id) or copy.deepcopy(DEFAULT_PROFILE)
+            self._metrics = None
+
+            self.intake = IntakeLog()
+            # Store ids of the intake rows, to delete them again
+            self.meal_ids = []
+            for meal in self.store.meals_since(self.user_id, since):
+                self.intake.append(meal['name'], meal['calories'], method=meal['method'] or 'Manual Entry',
+                                   timestamp=_epoch(meal['logged_at']))
+                self.meal_ids.append(meal['id'])
+
+            # Kept current by the store; read without rescanning history
+            self.frequent = FrequentFoods.from_rows(self.store.food_stats(self.user_id))
+
+            self.exercise = ExerciseLog()
+            for row in self.store.exercises_since(self.user_id, since):
+                self.exercise.append(row['exercise'], row['duration'], row['calories'], timestamp=_epoch(row['logged_at']))
+
+    def metrics(self):
+        """derived_metrics() of the profile, recomputed only after update_profile()"""
+        if self._metrics is None:
+            self._metrics = derived_metrics(self.profile)
+        return self._metrics
+
+    def update_profile(self, **fields):
+        with self._lock:
+            self.profile.update(fields)
+            self._metrics = None
+            self.store.save_profile(self.user_id, self.profile)
+
+    def log_food(self, name, calories, method='Manual Entry', serving_info=None):
+        with self._lock:
+            meal_id = self.store.log_meal(name, calories, user_id=self.user_id, method=method,
+                                          serving_info=serving_info)
+            now = int(time.time())
+            self.intake.append(name, calories, method=method, timestamp=now)
+            self.meal_ids.append(meal_id)
+            self.frequent.add(name, calories, now)
+
+    def log_scan(self, image, foods):
+        """Store a scanned image and log each detected food"""
+        if image is None:
+            for food in foods:
+                self.log_food(food['name'], food['calories'], method='Camera Scan',
+                              serving_info=food.get('serving_info'))
+            return
+        with self._lock:
+            meal_ids = self.store.save_scan(image, foods, user_id=self.user_id)
+            now = int(time.time())
+            for food, meal_id in zip(foods, meal_ids):
+                self.intake.append(food['name'], food['calories'], method='Camera Scan', timestamp=now)
+                self.meal_ids.append(meal_id)
+                self.frequent.add(food['name'], food['calories'], now)
+
+    def remove_food(self, index):
+        with self._lock:
+            self.store.delete_meal(self.meal_ids.pop(index))
+            entry = self.intake.pop(index)
+            self.frequent.remove(entry.name, entry.timestamp)
+            return entry
+
+    def log_exercise(self, exercise, duration, calories):
+        with self._lock:
+            self.store.log_exercise(exercise, duration, calories, user_id=self.user_id)
+            self.exercise.append(exercise, duration, calories)
+
+    def nbytes(self):
+        """Approximate memory held by this session's state"""
+        return (self.intake.nbytes() + self.exercise.nbytes() + self.frequent.nbytes() + _deep_sizeof(self.meal_ids)
+                + _deep_sizeof(self.profile) + (_deep_sizeof(self._metrics) if self._metrics else 0))
+
+
+class SessionManager:
+    """LRU cache of UserSessions with idle eviction"""
+
+    def __init__(self, store, capacity=SESSION_CAPACITY, idle_seconds=SESSION_IDLE_SECONDS):
+        self.store = store
+        self.capacity = capacity
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictor = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id):
+        """The session of `user_id`, loading it from the store on a miss"""
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._sessions.move_to_end(user_id)
+                self.hits += 1
+        if session is None:
+            instrumentation.count('sessions.misses')
+            # Loaded outside the lock so one slow load does not stall other users
+            loaded = UserSession(self.store, user_id)
+            with self._lock:
+                self.misses += 1
+                session = self._sessions.setdefault(user_id, loaded)
+                self._sessions.move_to_end(user_id)
+                while len(self._sessions) > self.capacity:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+        elif session.day != date.today():
+            # A new day starts with empty logs
+            session.reload()
+        session.last_seen = time.time()
+        return session
+
+    def evict_idle(self, now=None):
+        """Drop sessions not used for idle_seconds; returns how many"""
+        cutoff = (time.time() if now is None else now) - self.idle_seconds
+        with self._lock:
+            idle = [user_id for user_id, session in self._sessions.items() if session.last_seen < cutoff]
+            for user_id in idle:
+                del self._sessions[user_id]
+            self.evictions += len(idle)
+        instrumentation.count('sessions.idle_evictions', len(idle))
+        return len(idle)
+
+    def start_eviction(self, interval=EVICTION_INTERVAL_SECONDS):
+        """Run evict_idle() every `interval` seconds on a daemon thread; later calls are no-ops"""
+        if self._evictor is not None:
+            return self._evictor
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._evictor = threading.Thread(target=run, name='swasthya-session-eviction', daemon=True)
+        self._evictor.start()
+        return self._evictor
+
+    def memory_report(self):
+        """One row per cached session, largest first"""
+        now = time.time()
+        with self._lock:
+            sessions = list(self._sessions.values())
+        rows = [
+            {
+                'user_id': session.user_id,
+                'bytes': session.nbytes(),
+                'intake_entries': len(session.intake),
+                'exercise_entries': len(session.exercise),
+                'idle_seconds': round(now - session.last_seen)
+            }
+            for session in sessions
+        ]
+        return sorted(rows, key=lambda row: row['bytes'], reverse=True)
+
+    def stats(self):
+        return {
+            'sessions': len(self._sessions),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,546 @@
+"""
+Persistent store for scanned meals, user profiles and exercise sessions.
+
+Each logged scan keeps a small thumbnail (WebP, or JPEG where OpenCV has no
+WebP encoder) no larger than THUMBNAIL_SIZE on its longest side, plus the
+feature vector of the preprocessed image so meals can be re-recognized or
+searched later without the original photo.
+
+Thumbnails are content-addressed: the file name is the SHA-256 of the encoded
+bytes, so scanning the same photo twice stores it once. Meal rows live in a
+SQLite database next to the thumbnail directory. `compact()` deletes
+thumbnails no meal refers to any more and reclaims database space; the app
+runs it periodically on a background thread.
+
+Profiles (as JSON) and completed exercises live in the same database, so a
+user's state can be rebuilt from the store at any time (see sessions.py).
+Every meal written or deleted also updates the user's decayed count of that
+food in food_stats (see frequent_foods.py), in the same transaction.
+
+The store lives in SWASTHYA_DATA_DIR (default: ./data).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+import instrumentation
+from frequent_foods import log_add, log_sub, log_weight
+from instrumentation import timed
+
+# OpenCV, PIL and the recognizer are imported by the methods that handle
+# images, so exports, imports and the API can open a store without them
+
+DATA_DIR = os.environ.get('SWASTHYA_DATA_DIR', 'data')
+
+THUMBNAIL_SIZE = 256
+THUMBNAIL_QUALITY = 80
+
+# Files younger than this are never compacted; a scan may be mid-save
+COMPACTION_GRACE_SECONDS = 3600
+COMPACTION_INTERVAL_SECONDS = 6 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbnails (
+    digest TEXT PRIMARY KEY,
+    extension TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    features BLOB,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL DEFAULT 'default',
+    logged_at TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calories INTEGER NOT NULL,
+    serving_info TEXT,
+    method TEXT,
+    thumbnail TEXT REFERENCES thumbnails(digest)
+);
+CREATE INDEX IF NOT EXISTS meals_by_user ON meals (user_id, logged_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS meals_by_thumbnail ON meals (thumbnail);
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exercises (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    logged_at TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    calories INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exercises_by_user ON exercises (user_id, logged_at);
+CREATE TABLE IF NOT EXISTS food_stats (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    score REAL NOT NULL,
+    calories INTEGER NOT NULL,
+    last_logged TEXT NOT NULL,
+    PRIMARY KEY (user_id, name)
+);
+"""
+# Bumped when a schema change needs existing rows migrated
+_SCHEMA_VERSION = 1
+
+# Adds a meal's weight to its food's score; calories follow the latest log
+_BUMP_FOOD_STATS = (
+    'INSERT INTO food_stats (user_id, name, score, calories, last_logged) VALUES (?, ?, ?, ?, ?) '
+    'ON CONFLICT(user_id, name) DO UPDATE SET score = log_add(score, excluded.score), '
+    'calories = CASE WHEN excluded.last_logged >= last_logged THEN excluded.calories ELSE calories END, '
+    'last_logged = max(last_logged, excluded.last_logged)'
+)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """(extension, encode params): WebP if this OpenCV build can encode it, else JPEG"""
+    import cv2
+    ok, _ = cv2.imencode('.webp', np.zeros((8, 8, 3), dtype=np.uint8))
+    if ok:
+        return '.webp', [cv2.IMWRITE_WEBP_QUALITY, THUMBNAIL_QUALITY]
+    return '.jpg', [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY]
+
+
+def make_thumbnail(image, max_size=THUMBNAIL_SIZE):
+    """Downscale a BGR image so its longest side is at most max_size"""
+    import cv2
+    height, width = image.shape[:2]
+    scale = max_size / max(height, width)
+    if scale >= 1.0:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_thumbnail(image):
+    """Encode a BGR thumbnail; returns (bytes, extension)"""
+    import cv2
+    extension, params = _encoding()
+    ok, buffer = cv2.imencode(extension, image, params)
+    if not ok:
+        raise ValueError("Could not encode thumbnail")
+    return buffer.tobytes(), extension
+
+
+class MealStore:
+    """SQLite meal log with content-addressed thumbnails on disk"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or DATA_DIR
+        self.thumbnail_dir = os.path.join(self.directory, 'thumbnails')
+        self.db_path = os.path.join(self.directory, 'meals.db')
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+        self._compactor = None
+        with closing(self._connect()) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            if connection.execute('PRAGMA user_version').fetchone()[0] < 1:
+                self._backfill_food_stats(connection)
+            connection.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.create_function('log_add', 2, log_add, deterministic=True)
+        return connection
+
+    def _backfill_food_stats(self, connection):
+        """One pass over meals logged before food_stats existed"""
+        with connection:
+            connection.execute('DELETE FROM food_stats')
+            cursor = connection.execute('SELECT user_id, logged_at, name, calories FROM meals ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(50_000)
+                if not rows:
+                    break
+                self._bump_food_stats(connection, [tuple(row) for row in rows])
+
+    def _bump_food_stats(self, connection, meals):
+        """Count (user_id, logged_at, name, calories) meals in food_stats"""
+        # Meals of the same food are combined first, so imports write each food once
+        stats = {}
+        for user_id, logged_at, name, calories in meals:
+            weight = log_weight(datetime.fromisoformat(logged_at).timestamp())
+            found = stats.get((user_id, name))
+            if found is None:
+                stats[(user_id, name)] = [weight, calories, logged_at]
+            else:
+                found[0] = log_add(found[0], weight)
+                if logged_at >= found[2]:
+                    found[1:] = [calories, logged_at]
+        connection.executemany(_BUMP_FOOD_STATS, [(user_id, name, *values) for (user_id, name), values in stats.items()])
+
+    def _drop_food_stats(self, connection, meals):
+        """Take (user_id, logged_at, name) meals back out of food_stats"""
+        for user_id, logged_at, name in meals:
+            key = (user_id, name)
+            row = connection.execute('SELECT score FROM food_stats WHERE user_id = ? AND name = ?', key).fetchone()
+            score = None if row is None else log_sub(row['score'], log_weight(datetime.fromisoformat(logged_at).timestamp()))
+            if score is None:
+                connection.execute('DELETE FROM food_stats WHERE user_id = ? AND name = ?', key)
+            else:
+                connection.execute('UPDATE food_stats SET score = ? WHERE user_id = ? AND name = ?', (score, *key))
+
+    @contextmanager
+    def _transaction(self):
+        with closing(self._connect()) as connection:
+            with connection:
+                yield connection
+
+    def thumbnail_path(self, digest, extension):
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.thumbnail_dir, digest[:2], digest + extension)
+
+    def _write_thumbnail(self, data, extension):
+        """Make sure the thumbnail file exists; returns its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.thumbnail_path(digest, extension)
+        try:
+            # An existing file is reused; a fresh mtime keeps the stray-file
+            # sweep in compact() away from it while the save completes
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+        return digest
+
+    @timed('storage.save_scan')
+    def save_scan(self, image, foods, user_id='default', method='Camera Scan'):
+        """Store a scanned image once and log one meal row per food
+
+        `image` is a PIL image or BGR array; each food is a dict with 'name',
+        'calories' and optionally 'serving_info'. Returns the new meal ids.
+        """
+        from features import extract_features
+        from foodrecognition import get_recognizer
+
+        processed = get_recognizer().preprocess_image(image)
+        thumbnail = make_thumbnail(processed)
+        data, extension = encode_thumbnail(thumbnail)
+        digest = self._write_thumbnail(data, extension)
+        vector = extract_features(processed).astype(np.float32)
+        logged_at = datetime.now().isoformat(timespec='seconds')
+
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT INTO thumbnails (digest, extension, width, height, bytes, features, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(digest) DO UPDATE SET created_at = excluded.created_at',
+                (digest, extension, thumbnail.shape[1], thumbnail.shape[0], len(data), vector.tobytes(), time.time())
+            )
+            self._bump_food_stats(connection, [(user_id, logged_at, food['name'], int(food['calories'])) for food in foods])
+            meal_ids = [
+                connection.execute(
+                    'INSERT INTO meals (user_id, logged_at, name, calories, serving_info, method, thumbnail) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (user_id, logged_at, food['name'], int(food['calories']), food.get('serving_info'), method, digest)
+                ).lastrowid
+                for food in foods
+            ]
+        # compact() removes files only while holding the write lock, after
+        # checking nothing refers to them. A compaction that ran between the
+        # write above and this commit may have removed the file; once the
+        # meals are committed none can, so putting it back here is final
+        self._write_thumbnail(data, extension)
+        return meal_ids
+
+    def log_meal(self, name, calories, user_id='default', method='Manual', serving_info=None):
+        """Log a meal without an image; returns its id"""
+        logged_at = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as connection:
+            self._bump_food_stats(connection, [(user_id, logged_at, name, int(calories))])
+            return connection.execute(
+                'INSERT INTO meals (user_id, logged_at, name, calories, serving_info, method) VALUES (?, ?, ?, ?, ?, ?)',
+                (user_id, logged_at, name, int(calories), serving_info, method)
+            ).lastrowid
+
+    def log_meals(self, rows):
+        """Insert many meals in one transaction
+
+        Each row is (user_id, logged_at, name, calories, serving_info, method).
+        """
+        if not rows:
+            return
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT INTO meals (user_id, logged_at, name, calories, serving_info, method) VALUES (?, ?, ?, ?, ?, ?)',
+                rows)
+            self._bump_food_stats(connection, [(row[0], row[1], row[2], row[3]) for row in rows])
+
+    def delete_meal(self, meal_id):
+        """Remove a meal; its thumbnail goes at the next compaction"""
+        with self._transaction() as connection:
+            meal = connection.execute('DELETE FROM meals WHERE id = ? RETURNING user_id, logged_at, name',
+                                      (meal_id,)).fetchone()
+            if meal is None:
+                return
+            self._drop_food_stats(connection, [tuple(meal)])
+
+    def food_counts(self):
+        """{food name: times logged} over all users"""
+        with closing(self._connect()) as connection:
+            return dict(connection.execute('SELECT name, COUNT(*) FROM meals GROUP BY name').fetchall())
+
+    def food_stats(self, user_id):
+        """Decayed log counts of every food a user has logged (see frequent_foods.py)"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT name, score, calories, last_logged FROM food_stats WHERE user_id = ?', (user_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_meals(self, user_id='default'):
+        with closing(self._connect()) as connection:
+            return connection.execute('SELECT COUNT(*) FROM meals WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+    def meal_page(self, user_id='default', page=0, page_size=12):
+        """One page of meals, newest first, without loading any thumbnails"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT m.id, m.logged_at, m.name, m.calories, m.serving_info, m.method, m.thumbnail, t.extension '
+                'FROM meals m LEFT JOIN thumbnails t ON t.digest = m.thumbnail '
+                'WHERE m.user_id = ? ORDER BY m.logged_at DESC, m.id DESC LIMIT ? OFFSET ?',
+                (user_id, page_size, page * page_size)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def meals_since(self, user_id, since):
+        """Meals of a user logged at or after the ISO time `since`, oldest first"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT id, logged_at, name, calories, serving_info, method FROM meals '
+                'WHERE user_id = ? AND logged_at >= ? ORDER BY logged_at, id',
+                (user_id, since)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_rows(self, table, columns, user_id=None, chunk_size=50_000):
+        """Lists of row tuples of the meals or exercises table, for exports
+
+        One user's rows come in time order, everyone's in id order; rows
+        are fetched chunk_size at a time from a single cursor as plain tuples.
+        """
+        if table not in ('meals', 'exercises'):
+            raise ValueError(f"Unknown table {table!r}")
+        selected = ', '.join(columns)
+        if user_id is None:
+            query, parameters = f'SELECT {selected} FROM {table} ORDER BY id', ()
+        else:
+            query, parameters = f'SELECT {selected} FROM {table} WHERE user_id = ? ORDER BY logged_at, id', (user_id,)
+        # Streaming responses may resume the generator on another thread;
+        # only one thread uses the connection at a time
+        with closing(sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)) as connection:
+            cursor = connection.execute(query, parameters)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+
+    def load_profile(self, user_id):
+        """Saved profile dict of a user, or None"""
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT profile FROM profiles WHERE user_id = ?', (user_id,)).fetchone()
+        return None if row is None else json.loads(row['profile'])
+
+    def save_profile(self, user_id, profile):
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET profile = excluded.profile, updated_at = excluded.updated_at',
+                (user_id, json.dumps(profile), time.time())
+            )
+
+    def log_exercise(self, exercise, duration, calories, user_id='default'):
+        """Log a completed exercise; returns its id"""
+        logged_at = datetime.now().isoformat(timespec='seconds')
+        with self._transaction() as connection:
+            return connection.execute(
+                'INSERT INTO exercises (user_id, logged_at, exercise, duration, calories) VALUES (?, ?, ?, ?, ?)',
+                (user_id, logged_at, exercise, duration, int(calories))
+            ).lastrowid
+
+    def exercises_since(self, user_id, since):
+        """Exercises of a user logged at or after the ISO time `since`, oldest first"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT id, logged_at, exercise, duration, calories FROM exercises '
+                'WHERE user_id = ? AND logged_at >= ? ORDER BY logged_at, id',
+                (user_id, since)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load_thumbnail(self, meal):
+        """Encoded thumbnail bytes of a meal from meal_page(), or None"""
+        if not meal.get('thumbnail'):
+            return None
+        try:
+            with open(self.thumbnail_path(meal['thumbnail'], meal['extension']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def load_image(self, meal):
+        """Decoded thumbnail of a meal as a PIL image, or None"""
+        data = self.load_thumbnail(meal)
+        if data is None:
+            return None
+        import cv2
+        from PIL import Image
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+    def features(self, digest):
+        """Stored feature vector of a thumbnail, or None"""
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT features FROM thumbnails WHERE digest = ?', (digest,)).fetchone()
+        if row is None or row['features'] is None:
+            return None
+        return np.frombuffer(row['features'], dtype=np.float32)
+
+    def thumbnails_after(self, digest='', created_before=None, limit=256):
+        """Thumbnails in digest order after `digest`, for resumable full scans"""
+        created_before = time.time() if created_before is None else created_before
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT digest, extension FROM thumbnails WHERE digest > ? AND created_at <= ? ORDER BY digest LIMIT ?',
+                (digest, created_before, limit)
+            ).fetchall()
+        return [dict(row, path=self.thumbnail_path(row['digest'], row['extension'])) for row in rows]
+
+    @timed('storage.replace_scan_results')
+    def replace_scan_results(self, corrections):
+        """Rewrite the meals logged from each thumbnail in one transaction
+
+        `corrections` is a list of (digest, foods, features) where foods are
+        dicts like save_scan() takes and features is the new vector or None.
+        Every logged scan of a thumbnail keeps its user, time and method but
+        gets the new foods. Its meal rows are updated in place, so their ids
+        stay valid (e.g. in live sessions); only foods beyond the old count get
+        new rows and rows beyond the new count are deleted. Returns the number
+        of meal rows written.
+        """
+        if not corrections:
+            return 0
+        digests = [digest for digest, _, _ in corrections]
+        placeholders = ', '.join('?' * len(digests))
+
+        with self._transaction() as connection:
+            # digest -> (user, time, method) of each logged scan -> its meal ids
+            scans = {}
+            for row in connection.execute(
+                    f'SELECT id, thumbnail, user_id, logged_at, method FROM meals WHERE thumbnail IN ({placeholders}) '
+                    'ORDER BY id', digests):
+                scan = (row['user_id'], row['logged_at'], row['method'])
+                scans.setdefault(row['thumbnail'], {}).setdefault(scan, []).append(row['id'])
+
+            updates, inserts, deletes, written = [], [], [], []
+            for digest, foods, _ in corrections:
+                for (user_id, logged_at, method), meal_ids in scans.get(digest, {}).items():
+                    updates.extend((food['name'], int(food['calories']), food.get('serving_info'), meal_id)
+                                   for meal_id, food in zip(meal_ids, foods))
+                    inserts.extend((user_id, logged_at, food['name'], int(food['calories']), food.get('serving_info'),
+                                    method, digest) for food in foods[len(meal_ids):])
+                    deletes.extend((meal_id,) for meal_id in meal_ids[len(foods):])
+                    written.extend((user_id, logged_at, food['name'], int(food['calories'])) for food in foods)
+
+            self._drop_food_stats(connection, [
+                tuple(row) for row in connection.execute(
+                    f'SELECT user_id, logged_at, name FROM meals WHERE thumbnail IN ({placeholders})', digests)
+            ])
+            connection.executemany('UPDATE meals SET name = ?, calories = ?, serving_info = ? WHERE id = ?', updates)
+            connection.executemany(
+                'INSERT INTO meals (user_id, logged_at, name, calories, serving_info, method, thumbnail) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', inserts)
+            connection.executemany('DELETE FROM meals WHERE id = ?', deletes)
+            self._bump_food_stats(connection, written)
+            connection.executemany(
+                'UPDATE thumbnails SET features = ? WHERE digest = ?',
+                [(features.astype(np.float32).tobytes(), digest)
+                 for digest, _, features in corrections if features is not None])
+        return len(written)
+
+    @timed('storage.compact')
+    def compact(self, grace_seconds=COMPACTION_GRACE_SECONDS):
+        """Delete unreferenced thumbnails and reclaim database space
+
+        Rows and files are removed in one write transaction, after checking
+        under its lock that no meal refers to them. A save_scan() committing
+        meals either comes first, and its thumbnail is kept, or comes after
+        and writes the file again (see save_scan()).
+        """
+        cutoff = time.time() - grace_seconds
+        # Candidate files left behind by a save that never reached the database
+        old_files = [
+            os.path.join(root, name)
+            for root, _, files in os.walk(self.thumbnail_dir)
+            for name in files
+            if os.path.getmtime(os.path.join(root, name)) < cutoff
+        ]
+
+        removed = 0
+        with closing(self._connect()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                orphans = connection.execute(
+                    'SELECT digest, extension FROM thumbnails '
+                    'WHERE created_at < ? AND digest NOT IN (SELECT thumbnail FROM meals WHERE thumbnail IS NOT NULL)',
+                    (cutoff,)
+                ).fetchall()
+                connection.executemany('DELETE FROM thumbnails WHERE digest = ?', [(row['digest'],) for row in orphans])
+                known = {row['digest'] for row in connection.execute('SELECT digest FROM thumbnails')}
+
+                paths = [self.thumbnail_path(row['digest'], row['extension']) for row in orphans]
+                paths += [path for path in old_files if os.path.basename(path).split('.')[0] not in known]
+                for path in dict.fromkeys(paths):
+                    try:
+                        # A save reusing the file touches it first
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                    except FileNotFoundError:
+                        pass
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+        with closing(self._connect()) as connection:
+            connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            connection.execute('VACUUM')
+        return removed
+
+    def start_compaction(self, interval=COMPACTION_INTERVAL_SECONDS):
+        """Run compact() every `interval` seconds on a daemon thread; later calls are no-ops"""
+        if self._compactor is not None:
+            return self._compactor
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.compact()
+                except (OSError, sqlite3.Error):
+                    # Locked database or busy file; try again next round
+                    instrumentation.count('storage.compaction_failures')
+
+        self._compactor = threading.Thread(target=run, name='swasthya-compaction', daemon=True)
+        self._compactor.start()
+        return self._compactor
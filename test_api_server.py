@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import pytest
+
+import api_server
+
+GAP = {'calories': 900, 'protein': 40, 'carbs': 100, 'fat': 30}
+PROFILE = {'age': 28, 'weight': 58, 'height': 162, 'gender': 'Female', 'activity_level': 'Moderate',
+           'goal': 'Maintain Weight', 'health_conditions': ['None']}
+
+
+class _Request:
+    """The part of a Starlette request the JSON endpoints read"""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def json(self):
+        return json.loads(self.text)
+
+
+def _call(endpoint, body):
+    response = asyncio.run(endpoint(_Request(json.dumps(body))))
+    return response.status_code, json.loads(response.body)
+
+
+def test_next_foods_ranks_catalog_foods():
+    status, foods = _call(api_server.next_foods, {'remaining': GAP, 'limit': 3})
+    assert status == 200
+    assert len(foods) == 3
+    assert [food['score'] for food in foods] == sorted((food['score'] for food in foods), reverse=True)
+
+
+@pytest.mark.parametrize('body', [
+    {'remaining': dict(GAP, protein=float('nan'))},
+    {'remaining': dict(GAP, calories=float('inf'))},
+    {'remaining': GAP, 'limit': float('inf')},
+    {'remaining': dict(GAP, fat='lots')},
+])
+def test_next_foods_rejects_non_finite_numbers(body):
+    status, answer = _call(api_server.next_foods, body)
+    assert status == 400
+    assert answer['error'].startswith('Invalid request')
+
+
+def test_metrics_reject_non_finite_profiles():
+    assert _call(api_server.metrics, PROFILE)[0] == 200
+    status, answer = _call(api_server.metrics, dict(PROFILE, weight=float('nan')))
+    assert status == 400 and answer['error'].startswith('Invalid profile')
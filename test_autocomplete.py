@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+import nepalifood
+from autocomplete import MAX_DEPTH, Autocomplete, _keys
+from food_search import ALIASES, normalize
+
+
+def _brute_force(completer, prefix, k):
+    """Most logged foods with a name or alias word starting with prefix"""
+    prefix = ' '.join(normalize(prefix))
+    matches = [item for item, name in enumerate(completer.names)
+               if any(key.startswith(prefix) for text in [name, *ALIASES.get(name, ())] for key in _keys(text))]
+    matches.sort(key=completer._rank)
+    return matches[:k]
+
+
+PREFIXES = ['m', 'mo', 'momo', 'dal', 'dal bhat', 'bhat', 'chicken momo', 'vegetable mo', 'सेल', 'x', '']
+
+
+def test_completions_start_at_any_word():
+    completer = Autocomplete(counts={'Chicken Momo (6 pieces)': 9, 'Vegetable Momo (6 pieces)': 5})
+    assert completer.complete('mo', 2) == [('Chicken Momo (6 pieces)', 9), ('Vegetable Momo (6 pieces)', 5)]
+    assert completer.complete('chicken mom') == [('Chicken Momo (6 pieces)', 9)]
+    assert completer.complete('zzz') == []
+
+
+@pytest.mark.parametrize('top_k', [3, 10])
+def test_completions_match_a_full_scan(top_k):
+    rng = random.Random(0)
+    counts = {name: rng.randrange(50) for name in nepalifood.FOOD_NAMES}
+    completer = Autocomplete(counts=counts, top_k=top_k)
+    for prefix in PREFIXES + [name.lower() for name in rng.sample(nepalifood.FOOD_NAMES, 20)]:
+        assert completer.complete_ids(prefix) == _brute_force(completer, prefix, top_k), prefix
+
+
+def test_bumps_keep_every_node_ranked():
+    rng = random.Random(1)
+    completer = Autocomplete(top_k=4)
+    for _ in range(300):
+        completer.bump(rng.choice(completer.names), rng.randrange(1, 4))
+    completer.bump('Not A Food')
+
+    for prefix in PREFIXES:
+        assert completer.complete_ids(prefix) == _brute_force(completer, prefix, 4), prefix
+    # Every node's list is what a fresh build with the same counts gives
+    fresh = Autocomplete(counts=dict(zip(completer.names, completer.counts)), top_k=4)
+    stack = [(completer.root, fresh.root)]
+    while stack:
+        node, expected = stack.pop()
+        assert node.top == expected.top
+        stack.extend((child, expected.children[ch]) for ch, child in node.children.items())
+
+
+def test_prefixes_deeper_than_the_trie_use_the_key_array():
+    completer = Autocomplete(counts={'Cauliflower Momo (6 pieces)': 3})
+    prefix = 'cauliflower m'
+    assert len(prefix) > MAX_DEPTH
+    assert completer.complete(prefix) == [('Cauliflower Momo (6 pieces)', 3)]
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from batch_scheduler import MicroBatcher, QueueFull
+
+
+@pytest.fixture
+def batchers():
+    created = []
+
+    def make(batch_fn, **kwargs):
+        batcher = MicroBatcher(batch_fn, **kwargs)
+        created.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in created:
+        batcher.close(timeout=5)
+
+
+def test_concurrent_submissions_are_batched(batchers):
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = batchers(double, max_batch=4, max_latency=0.05)
+    results = {}
+
+    def call(i):
+        results[i] = batcher(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {i: i * 2 for i in range(8)}
+    assert max(sizes) <= 4 and len(sizes) < 8
+    assert batcher.stats()['items'] == 8
+
+
+def test_one_bad_item_does_not_fail_its_batch(batchers):
+    calls = []
+
+    def invert(items):
+        calls.append(list(items))
+        return [1 / item for item in items]
+
+    batcher = batchers(invert, max_batch=8, max_latency=0.05)
+    futures = [batcher.submit(item) for item in (1, 0, 4)]
+
+    assert futures[0].result(timeout=5) == 1
+    with pytest.raises(ZeroDivisionError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 0.25
+    # The failed batch, then each item alone
+    assert calls == [[1, 0, 4], [1], [0], [4]]
+
+
+def test_exception_results_fail_only_their_item(batchers):
+    batcher = batchers(lambda items: [ValueError(item) if item < 0 else item for item in items],
+                       max_batch=8, max_latency=0.05)
+    futures = [batcher.submit(item) for item in (3, -1, 5)]
+
+    assert futures[0].result(timeout=5) == 3
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 5
+
+
+def test_short_result_lists_fail_the_unmatched_items(batchers):
+    batcher = batchers(lambda items: list(items)[:1], max_batch=8, max_latency=0.05)
+    futures = [batcher.submit(item) for item in ('a', 'b', 'c')]
+
+    assert futures[0].result(timeout=5) == 'a'
+    for future in futures[1:]:
+        with pytest.raises(RuntimeError, match='1 results for 3 items'):
+            future.result(timeout=5)
+    # The dispatcher is still serving
+    assert batcher('d') == 'd'
+
+
+def test_full_queue_rejects_submissions(batchers):
+    release = threading.Event()
+
+    def wait(items):
+        release.wait(5)
+        return items
+
+    batcher = batchers(wait, max_batch=1, max_queue=2)
+    first = batcher.submit(0)
+    time.sleep(0.05)
+    batcher.submit(1)
+    batcher.submit(2)
+    with pytest.raises(QueueFull):
+        batcher.submit(3)
+    release.set()
+    assert first.result(timeout=5) == 0
+    assert batcher.stats()['rejected'] == 1
+
+
+def test_close_finishes_queued_work(batchers):
+    batcher = batchers(lambda items: items, max_batch=2)
+    futures = [batcher.submit(i) for i in range(5)]
+    batcher.close(timeout=5)
+    assert [future.result(timeout=5) for future in futures] == list(range(5))
+    with pytest.raises(RuntimeError):
+        batcher.submit(5)
+
+
+def test_close_fails_queued_items_when_the_dispatcher_is_stuck(batchers):
+    release = threading.Event()
+
+    def stuck(items):
+        release.wait(10)
+        return items
+
+    batcher = batchers(stuck, max_batch=1, max_queue=2)
+    running = batcher.submit(0)
+    time.sleep(0.05)
+    queued = [batcher.submit(1), batcher.submit(2)]
+
+    start = time.perf_counter()
+    batcher.close(timeout=0.1)
+    assert time.perf_counter() - start < 2
+    for future in queued:
+        with pytest.raises(RuntimeError, match='closed'):
+            future.result(timeout=1)
+
+    release.set()
+    assert running.result(timeout=5) == 0
+    for thread in batcher._threads:
+        thread.join(5)
+        assert not thread.is_alive()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import catalog_build
+import nepalifood
+from catalog_build import CatalogError, attach, columns_from_catalog, compile_catalog, write_compiled
+
+
+def _source(**extra):
+    return {
+        'Dal Bhat (1 plate)': {'calories': 420, 'protein': 15, 'carbs': 78, 'fat': 6, 'fiber': 8, 'sodium': 280,
+                               'category': 'Main Course', 'diabetic_friendly': False, 'heart_healthy': True},
+        'Sel Roti (2 pieces)': {'calories': 180, 'protein': 3, 'carbs': 32, 'fat': 5, 'fiber': 1, 'sodium': 320,
+                                'category': 'Snacks', 'diabetic_friendly': False, 'heart_healthy': False, **extra},
+    }
+
+
+def test_shipped_catalog_is_built_from_the_current_entries():
+    _, meta = catalog_build.load_compiled(catalog_build.COMPILED_CATALOG)
+    source = {name: {field: value for field, value in info.items() if field not in catalog_build.DERIVED_FIELDS}
+              for name, info in nepalifood.NEPALI_FOODS_DATABASE.items()}
+    assert meta['fingerprint'] == catalog_build.fingerprint(source)
+    assert meta['rows'] == len(nepalifood.FOOD_NAMES)
+
+
+def test_stale_or_missing_compiled_catalog_fails_loudly(tmp_path):
+    path = str(tmp_path / 'foods.npz')
+    with pytest.raises(RuntimeError, match='not found'):
+        attach(_source(), path)
+
+    compiled, _ = compile_catalog(columns_from_catalog(_source()))
+    write_compiled(compiled, path, catalog_build.fingerprint(_source()))
+    catalog = _source()
+    attach(catalog, path)
+    assert catalog['Dal Bhat (1 plate)']['low_sodium'] is True
+
+    edited = _source()
+    edited['Sel Roti (2 pieces)']['sodium'] = 200
+    with pytest.raises(RuntimeError, match='python catalog_build.py'):
+        attach(edited, path)
+
+
+def test_reordered_entries_need_a_rebuild(tmp_path):
+    path = str(tmp_path / 'foods.npz')
+    compiled, _ = compile_catalog(columns_from_catalog(_source()))
+    write_compiled(compiled, path, catalog_build.fingerprint(_source()))
+
+    reordered = dict(reversed(list(_source().items())))
+    assert catalog_build.fingerprint(reordered) != catalog_build.fingerprint(_source())
+    with pytest.raises(RuntimeError, match='python catalog_build.py'):
+        attach(reordered, path)
+
+    # Rows whose fingerprint matches but whose names are out of order are refused too
+    write_compiled(compiled, path, catalog_build.fingerprint(reordered))
+    with pytest.raises(RuntimeError, match='another order'):
+        attach(reordered, path)
+
+
+def test_fields_are_collected_from_every_row():
+    catalog = {f'Food {i}': dict(_source()['Dal Bhat (1 plate)']) for i in range(1500)}
+    catalog['Food 1499']['preparation'] = 'Steamed'
+    columns = columns_from_catalog(catalog)
+    assert columns['preparation'][-1] == 'Steamed'
+    assert columns['preparation'][0] == ''
+
+
+def test_low_sodium_is_derived_from_sodium():
+    compiled, report = compile_catalog(columns_from_catalog(_source(low_sodium=True)))
+    assert compiled['low_sodium'].tolist() == [True, False]
+    assert report['warnings']['low_sodium_changed'] == 1
+    assert report['examples']['low_sodium_changed'] == ['Sel Roti (2 pieces)']
+
+
+def test_unknown_fiber_and_sodium_are_not_errors():
+    catalog = _source()
+    del catalog['Sel Roti (2 pieces)']['fiber'], catalog['Sel Roti (2 pieces)']['sodium']
+    compiled, _ = compile_catalog(columns_from_catalog(catalog))
+    assert np.isnan(compiled['sodium'][1]) and not compiled['low_sodium'][1]
+
+
+def test_invalid_entries_are_all_reported():
+    catalog = _source()
+    catalog['Dal Bhat (1 plate)']['calories'] = -5
+    catalog['Sel Roti (2 pieces)']['protein'] = 'lots'
+    catalog['Sel Roti (2 pieces)']['heart_healthy'] = 'maybe'
+    with pytest.raises(CatalogError) as raised:
+        compile_catalog(columns_from_catalog(catalog))
+    assert sorted(problem for _, problem in raised.value.problems) == [
+        'calories is negative', 'heart_healthy is not a boolean', 'protein is missing or not a number']
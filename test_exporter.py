@@ -0,0 +1,74 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+
+import pytest
+
+import exporter
+import importer
+from storage import MealStore
+
+MEALS = [
+    ('patient-17', '2024-03-01T07:30:00', 'Sel Roti (2 pieces)', 180, None, 'Manual'),
+    ('patient-17', '2024-03-01T13:05:00', 'Dal Bhat (1 plate)', 420, '1 serving(s)', 'Camera Scan'),
+    ('patient-17', '2024-03-02T19:45:00', 'Pepperoni pizza, "large"', 610, None, 'Import'),
+    ('other', '2024-03-01T08:00:00', 'Kheer (1 bowl)', 250, None, 'Manual'),
+]
+DECOMPRESS = {None: lambda data: data, 'gzip': gzip.decompress, 'bz2': bz2.decompress, 'xz': lzma.decompress}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MealStore(str(tmp_path / 'source'))
+    store.log_meals(MEALS)
+    return store
+
+
+def _export(store, fmt, compression=None, user_id='patient-17', chunk_size=2):
+    out = io.BytesIO()
+    exporter.export(store, out, 'meals', fmt, user_id, compression, chunk_size)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('compression', list(DECOMPRESS))
+def test_csv_export_holds_every_row_once(store, compression):
+    text = DECOMPRESS[compression](_export(store, 'csv', compression)).decode()
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == list(exporter.KINDS['meals'])
+    assert [tuple(row[2:4]) for row in rows[1:]] == [(meal[1], meal[2]) for meal in MEALS[:3]]
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl'])
+def test_exports_import_back_unchanged(store, tmp_path, fmt):
+    data = _export(store, fmt, 'gzip')
+    copy = MealStore(str(tmp_path / 'copy'))
+    stats = importer.import_file(io.BytesIO(gzip.decompress(data)), copy, 'patient-17', 'csv' if fmt == 'csv' else 'json')
+    assert (stats['imported'], stats['skipped']) == (3, 0)
+
+    columns = ('logged_at', 'name', 'calories')
+    original = [row for rows in store.iter_rows('meals', columns, 'patient-17') for row in rows]
+    imported = [row for rows in copy.iter_rows('meals', columns, 'patient-17') for row in rows]
+    assert imported == original
+
+
+def test_jsonl_lines_are_objects_keyed_by_column(store):
+    lines = _export(store, 'jsonl', user_id=None).decode().splitlines()
+    assert len(lines) == len(MEALS)
+    assert json.loads(lines[2])['name'] == 'Pepperoni pizza, "large"'
+
+
+def test_parquet_export_has_one_row_group_per_chunk(store):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    table = pyarrow_parquet.ParquetFile(io.BytesIO(_export(store, 'parquet', user_id=None)))
+    assert table.metadata.num_row_groups == 2
+    assert table.read().column('calories').to_pylist() == [meal[3] for meal in MEALS]
+
+
+def test_unknown_options_fail_before_any_output(store):
+    with pytest.raises(ValueError, match='kind'):
+        exporter.export_chunks(store, 'steps')
+    with pytest.raises(ValueError, match='compression'):
+        exporter.export_chunks(store, 'meals', 'csv', compression='zip')
@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+import pytest
+
+from features import (FEATURE_DIM, SignatureMatcher, extract_features, load_signatures, main,
+                      signature_from_tags)
+from foodrecognition import NepaleseFoodRecognizer
+
+
+def _gundruk_plate():
+    image = np.full((240, 320, 3), 200, np.uint8)
+    cv2.ellipse(image, (160, 120), (140, 110), 0, 0, 360, (245, 245, 245), -1)
+    cv2.circle(image, (160, 120), 90, (30, 110, 70), -1)
+    return image
+
+
+@pytest.fixture(scope='module')
+def recognizer():
+    return NepaleseFoodRecognizer()
+
+
+@pytest.mark.parametrize('image', [
+    np.zeros((10, 10, 3), np.uint8),
+    np.full((240, 320, 3), (0, 220, 240), np.uint8),
+    np.full((240, 320, 3), 255, np.uint8),
+    np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8),
+], ids=['black', 'yellow', 'white', 'noise'])
+def test_images_unlike_any_dish_are_rejected(recognizer, image):
+    names, probabilities = recognizer.matcher.candidates(extract_features(image))
+    assert probabilities.max() == 0
+    assert recognizer.detect_food_items(image) == []
+
+
+def test_dish_like_plate_is_recognized(recognizer):
+    detections = recognizer.detect_food_items(_gundruk_plate())
+    assert [food['name'] for food in detections] == ['Gundruk Soup']
+
+
+def test_probabilities_leave_room_for_no_dish():
+    matcher = SignatureMatcher(['a', 'b'], np.stack([signature_from_tags(['white_rice']),
+                                                     signature_from_tags(['green_color'])]))
+    probabilities = matcher.probabilities(matcher.matrix)
+    assert np.all(probabilities.sum(axis=1) < 1)
+    assert np.argmax(probabilities[0]) == 0 and np.argmax(probabilities[1]) == 1
+
+    far = matcher.matrix[0] + 10
+    assert matcher.probabilities(far).max() == 0
+
+
+def test_signatures_are_built_from_labelled_photos(tmp_path):
+    for dish, colour in [('Gundruk Soup', (30, 110, 70)), ('Dal Bhat', (40, 190, 230))]:
+        folder = tmp_path / 'photos' / dish
+        folder.mkdir(parents=True)
+        for i in range(2):
+            image = np.full((64, 64, 3), 245, np.uint8)
+            cv2.circle(image, (32, 32), 20 + i, colour, -1)
+            cv2.imwrite(str(folder / f'{i}.png'), image)
+
+    output = tmp_path / 'signatures.npz'
+    assert main([str(tmp_path / 'photos'), '-o', str(output)]) == 0
+    names, matrix = load_signatures(str(output))
+    assert names == ['Dal Bhat', 'Gundruk Soup']
+    assert matrix.shape == (2, FEATURE_DIM)
+
+
+def test_index_mode_matches_the_signature_matrix(tmp_path, recognizer, monkeypatch):
+    import ann_index
+    import features
+
+    assert ann_index.main(['build', '--out', str(tmp_path / 'index')]) == 0
+    monkeypatch.setattr(features, 'INDEX_PATH', str(tmp_path / 'index'))
+    indexed = SignatureMatcher.from_food_database(recognizer.food_database)
+    plain = SignatureMatcher(*features.dish_signatures(recognizer.food_database))
+    assert indexed.matrix is None
+
+    vectors = np.stack([extract_features(_gundruk_plate()), extract_features(np.zeros((10, 10, 3), np.uint8))])
+    np.testing.assert_allclose(indexed.distances(vectors), plain.distances(vectors), atol=1e-4)
+    np.testing.assert_allclose(indexed.probabilities(vectors), plain.probabilities(vectors), atol=1e-4)
+
+    # Rebuilding while the recognizer serves from an index reads the signatures, not its matcher
+    assert ann_index.main(['build', '--out', str(tmp_path / 'rebuilt')]) == 0
+
+    # Over only the k candidates, probabilities are an upper bound of the catalog-wide ones
+    names, probabilities = indexed.candidates(vectors[0], k=2)
+    full = dict(zip(plain.names, plain.probabilities(vectors[0])[0]))
+    assert names[0] == 'Gundruk Soup'
+    assert all(p >= full[name] - 1e-6 for name, p in zip(names, probabilities))
@@ -0,0 +1,64 @@
+import pytest
+
+from food_search import FoodSearch, edit_distance, normalize, transliterate
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return FoodSearch()
+
+
+def _names(results):
+    return [name for name, _ in results]
+
+
+def test_normalization_folds_scripts_and_spellings():
+    assert transliterate('दाल भात') == 'daal bhaat'
+    assert normalize('Mo:Mo (6 pcs)') == ['momo', '6', 'pcs']
+    assert normalize('Daal-Bhaat') == normalize('dal bhat') == ['dal', 'bhat']
+    assert normalize('kheer') == normalize('khir')
+
+
+@pytest.mark.parametrize('query', ['momo', 'mo:mo', 'MOMO', 'मोमो'])
+def test_spellings_of_momo_find_every_momo(engine, query):
+    assert set(_names(engine.search(query))) == {
+        'Chicken Momo (6 pieces)', 'Vegetable Momo (6 pieces)', 'Cauliflower Momo (6 pieces)'}
+
+
+def test_exact_names_rank_first(engine):
+    results = engine.search('dal bhat')
+    assert results[0][0] == 'Dal Bhat (1 plate)'
+    assert results[0][1] > results[1][1]
+    assert engine.search('selroti')[0][0] == 'Sel Roti (2 pieces)'
+
+
+def test_typos_match_below_exact_words(engine):
+    typo = dict(engine.search('chiken momo'))
+    exact = dict(engine.search('chicken momo'))
+    assert 0 < typo['Chicken Momo (6 pieces)'] < exact['Chicken Momo (6 pieces)']
+    assert engine.search('xyzzy') == []
+
+
+def test_every_query_word_must_match(engine):
+    assert _names(engine.search('chicken momo')) == ['Chicken Momo (6 pieces)']
+
+
+def test_popularity_breaks_ties():
+    engine = FoodSearch()
+    before = _names(engine.search('momo'))
+    engine.set_popularity({'Cauliflower Momo (6 pieces)': 50, 'Vegetable Momo (6 pieces)': 5})
+    after = _names(engine.search('momo'))
+    assert after[:2] == ['Cauliflower Momo (6 pieces)', 'Vegetable Momo (6 pieces)']
+    assert set(after) == set(before)
+
+
+def test_limit_keeps_the_best_results(engine):
+    every = engine.search('rice', limit=None)
+    assert len(every) > 3
+    assert [score for _, score in engine.search('rice', limit=3)] == [score for _, score in every[:3]]
+
+
+def test_edit_distance_counts_transpositions():
+    assert edit_distance('momo', 'mmoo', 2) == 1
+    assert edit_distance('dhido', 'dhindo', 2) == 1
+    assert edit_distance('thukpa', 'chatamari', 2) == 3
@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import foodrecognition
+from foodrecognition import NepaleseFoodRecognizer
+
+
+def _gundruk_plate(width=320, height=240):
+    image = np.full((240, 320, 3), 200, np.uint8)
+    cv2.ellipse(image, (160, 120), (140, 110), 0, 0, 360, (245, 245, 245), -1)
+    cv2.circle(image, (160, 120), 90, (30, 110, 70), -1)
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_NEAREST)
+
+
+@pytest.fixture(scope='module')
+def recognizer():
+    return NepaleseFoodRecognizer()
+
+
+def test_detections_describe_the_dish(recognizer):
+    detections = recognizer.detect_food_items(_gundruk_plate())
+    assert [food['name'] for food in detections] == ['Gundruk Soup']
+    food = detections[0]
+    assert 0 < food['confidence'] <= 1
+    assert food['serving_info'] == f"{food['quantity']:g} bowls"
+    x, y, w, h = food['bbox']
+    assert 0 <= x and 0 <= y and x + w <= 320 and y + h <= 240
+
+
+def test_pil_images_are_read_as_rgb(recognizer):
+    image = _gundruk_plate()
+    rgb = Image.fromarray(np.ascontiguousarray(image[..., ::-1]))
+    assert recognizer.detect_food_items(rgb) == recognizer.detect_food_items(image)
+
+
+def test_boxes_are_in_the_input_image_pixels(recognizer):
+    small = recognizer.detect_food_items(_gundruk_plate())[0]
+    large = recognizer.detect_food_items(_gundruk_plate(1280, 960))[0]
+    assert large['name'] == small['name']
+    np.testing.assert_allclose(large['bbox'], np.multiply(small['bbox'], 4), atol=8)
+
+
+def test_batches_match_single_images(recognizer):
+    images = [_gundruk_plate(), np.full((240, 320, 3), 128, np.uint8), _gundruk_plate(640, 480)]
+    assert recognizer.detect_food_items_batch(images) == [recognizer.detect_food_items(image) for image in images]
+    assert recognizer.detect_food_items_batch(images)[1] == []
+
+
+def test_scan_scheduler_serves_concurrent_scans(monkeypatch):
+    monkeypatch.setattr(foodrecognition, '_scan_scheduler', None)
+    scheduler = foodrecognition.get_scan_scheduler()
+    try:
+        futures = [scheduler.submit(_gundruk_plate()) for _ in range(4)]
+        expected = foodrecognition.get_recognizer().detect_food_items(_gundruk_plate())
+        assert [future.result(timeout=60) for future in futures] == [expected] * 4
+    finally:
+        scheduler.close()
+
+
+def test_analysis_adds_nutrition_and_advice():
+    plates = [_gundruk_plate(), np.full((240, 320, 3), 128, np.uint8)]
+    analyses = foodrecognition.analyze_food_images(plates, [['Hypertension'], None])
+    found = analyses[0]['detected_foods'][0]
+    assert analyses[0]['nutrition']['total_calories'] == found['calories']
+    assert analyses[0]['nutrition']['protein'] == round(found['calories'] * 0.20 / 4, 1)
+    assert "Be mindful of salt content in traditional preparations" in analyses[0]['recommendations']
+    assert analyses[1] == {
+        'detected_foods': [],
+        'nutrition': {'total_calories': 0, 'protein': 0, 'carbohydrates': 0, 'fat': 0},
+        'recommendations': ["Your food choices look balanced! Maintain portion control."]}
@@ -0,0 +1,77 @@
+import heapq
+import random
+
+import pytest
+
+from frequent_foods import HALF_LIFE_DAYS, FrequentFoods, decayed_count, log_add, log_sub, log_weight
+
+DAY = 24 * 3600
+NOW = 1_700_000_000
+
+
+def _check_heap(frequent):
+    """The heap holds the top foods, satisfies the heap order and is indexed"""
+    heap = frequent._heap
+    for i in range(1, len(heap)):
+        assert heap[(i - 1) // 2] <= heap[i]
+    assert frequent._positions == {name: i for i, (_, name) in enumerate(heap)}
+    assert all(score == frequent.foods[name][0] for score, name in heap)
+    expected = heapq.nlargest(frequent.size, ([food[0], name] for name, food in frequent.foods.items()))
+    assert sorted(heap, reverse=True) == expected
+
+
+def test_counts_halve_every_half_life():
+    frequent = FrequentFoods()
+    frequent.add('Sel Roti (2 pieces)', 180, NOW)
+    frequent.add('Sel Roti (2 pieces)', 180, NOW)
+    assert frequent.top(NOW)[0]['count'] == 2
+    assert frequent.top(NOW + HALF_LIFE_DAYS * DAY)[0]['count'] == 1
+    assert decayed_count(log_weight(NOW), NOW + 2 * HALF_LIFE_DAYS * DAY) == pytest.approx(0.25)
+
+
+def test_recent_logs_outrank_old_ones():
+    frequent = FrequentFoods()
+    for day in range(3):
+        frequent.add('Dhido (1 bowl)', 300, NOW - 60 * DAY + day)
+    frequent.add('Chicken Momo (6 pieces)', 330, NOW)
+    assert [food['name'] for food in frequent.top(NOW)] == ['Chicken Momo (6 pieces)', 'Dhido (1 bowl)']
+
+
+def test_log_arithmetic_matches_plain_sums():
+    a, b = log_weight(NOW), log_weight(NOW - 3 * DAY)
+    assert 2 ** (log_add(a, b) - a) == pytest.approx(1 + 2 ** (b - a))
+    assert log_sub(log_add(a, b), b) == pytest.approx(a)
+    assert log_sub(a, a) is None
+    assert log_add(None, a) == a
+
+
+@pytest.mark.parametrize('size', [1, 3, 8])
+def test_heap_stays_the_top_foods_through_adds_and_removes(size):
+    rng = random.Random(size)
+    names = [f'Food {i}' for i in range(20)]
+    frequent = FrequentFoods(size)
+    logged = []
+    for step in range(600):
+        if logged and rng.random() < 0.2:
+            name, timestamp = logged.pop(rng.randrange(len(logged)))
+            frequent.remove(name, timestamp)
+        else:
+            name = rng.choice(names[:rng.randrange(1, len(names) + 1)])
+            timestamp = NOW + step * 3600
+            frequent.add(name, step, timestamp)
+            logged.append((name, timestamp))
+        _check_heap(frequent)
+
+    assert set(frequent.foods) == {name for name, _ in logged}
+    top = frequent.top(NOW)
+    assert [food['name'] for food in top] == [name for _, name in sorted(frequent._heap, reverse=True)]
+
+
+def test_rows_from_the_store_rebuild_the_same_top():
+    frequent = FrequentFoods(3)
+    for i, name in enumerate(['Kheer (1 bowl)', 'Dhido (1 bowl)', 'Kheer (1 bowl)', 'Sukuti (30g)', 'Lapsi (1 bowl)']):
+        frequent.add(name, 100 + i, NOW + i)
+    rows = [{'name': name, 'score': score, 'calories': calories} for name, (score, calories) in frequent.foods.items()]
+    rebuilt = FrequentFoods.from_rows(rows, 3)
+    _check_heap(rebuilt)
+    assert rebuilt.top(NOW) == frequent.top(NOW)
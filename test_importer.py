@@ -0,0 +1,93 @@
+import io
+import json
+
+import pytest
+
+import importer
+from importer import FoodMatcher, import_file, read_csv, read_json
+from storage import MealStore
+
+
+def _records(count):
+    return [{'food': f'Chicken Momo #{i}', 'kcal': 300 + i, 'timestamp': f'2024-03-01T08:{i % 60:02d}:00'}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1 << 16])
+def test_json_array_items_survive_any_chunk_boundary(chunk_size):
+    records = _records(50)
+    text = '[\n' + ',\n  '.join(json.dumps(record) for record in records) + '\n] '
+    assert list(importer._json_array_items(io.StringIO(text), chunk_size)) == records
+
+
+def test_json_array_buffer_is_sliced_once_per_chunk(monkeypatch):
+    # Reading a whole array in one chunk decodes every item from one buffer
+    text = json.dumps(_records(200))
+    positions = []
+    decode = importer.json.JSONDecoder.raw_decode
+
+    def raw_decode(self, s, idx=0):
+        positions.append((len(s), idx))
+        return decode(self, s, idx)
+
+    monkeypatch.setattr(importer.json.JSONDecoder, 'raw_decode', raw_decode)
+    assert len(list(importer._json_array_items(io.StringIO(text), len(text)))) == 200
+    assert {length for length, _ in positions} == {len(text)}
+
+
+def test_truncated_json_array_raises():
+    with pytest.raises(json.JSONDecodeError):
+        list(importer._json_array_items(io.StringIO('[{"food": "Sel Roti", '), 8))
+
+
+def test_json_lines_and_arrays_resolve_the_same_fields():
+    records = _records(3)
+    as_lines = list(read_json(io.StringIO('\n'.join(json.dumps(r) for r in records) + '\n')))
+    as_array = list(read_json(io.StringIO('  ' + json.dumps(records))))
+    assert as_lines == as_array
+    assert as_lines[0] == {'name': 'Chicken Momo #0', 'calories': 300, 'logged_at': '2024-03-01T08:00:00'}
+
+
+def test_csv_rows_are_padded_and_split_date_time_joined(tmp_path):
+    text = 'Date,Time,Food,Calories\n2024-03-01,07:30,Sel Roti,180\n2024-03-02,12:00,Dal Bhat\n'
+    assert list(read_csv(io.StringIO(text)))[1] == {
+        'name': 'Dal Bhat', 'calories': '', 'logged_at': '2024-03-02', 'time': '12:00'}
+
+    store = MealStore(str(tmp_path))
+    stats = import_file(io.BytesIO(text.encode()), store, 'patient-17', 'csv')
+    assert (stats['imported'], stats['matched'], stats['skipped']) == (2, 2, 0)
+    rows = list(store.iter_rows('meals', ('logged_at', 'name', 'calories'), 'patient-17'))[0]
+    assert sorted(rows) == [('2024-03-01T07:30:00', 'Sel Roti (2 pieces)', 180),
+                            ('2024-03-02T12:00:00', 'Dal Bhat (1 plate)', 420)]
+
+
+def test_food_matcher_is_fuzzy_but_thresholded():
+    matcher = FoodMatcher()
+    assert matcher.match('chicken momo') == 'Chicken Momo (6 pieces)'
+    assert matcher.match('Momo, Chicken') == 'Chicken Momo (6 pieces)'
+    assert matcher.match('Pepperoni Pizza') is None
+
+
+def test_non_finite_and_negative_numbers_skip_their_row(tmp_path):
+    text = ('timestamp,food,kcal,qty\n'
+            '2024-03-01T07:00,Sel Roti,nan,\n'
+            '2024-03-01T08:00,Sel Roti,inf,\n'
+            '2024-03-01T09:00,Mystery stew,-40,\n'
+            '2024-03-01T10:00,Dal Bhat,,-1\n'
+            '2024-03-01T11:00,Dal Bhat,,Infinity\n'
+            '2024-03-01T12:00,Kheer,250,1\n')
+    store = MealStore(str(tmp_path))
+    stats = import_file(io.StringIO(text), store, fmt='csv', batch_size=2)
+    assert (stats['rows'], stats['imported'], stats['skipped']) == (6, 1, 5)
+    assert store.count_meals() == 1
+
+
+def test_unmatched_names_counted_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, 'UNMATCHED_NAMES', 3)
+    records = [{'name': f'Pepperoni pizza no {i}', 'calories': 300, 'logged_at': '2024-03-01T12:00:00'}
+               for i in range(10)]
+    records.append(dict(records[0]))
+    stats = importer.import_records(records, MealStore(str(tmp_path)))
+    assert stats['unmatched'] == 11
+    assert stats['top_unmatched'][0] == ('Pepperoni pizza no 0', 2)
+    assert len(stats['top_unmatched']) == 3
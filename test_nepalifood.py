@@ -0,0 +1,34 @@
+import numpy as np
+
+import catalog_build
+import nepalifood
+from nepalifood import (NEPALI_FOODS_DATABASE, get_diabetic_friendly_foods, get_food_recommendations,
+                        get_foods_by_category, get_low_sodium_foods, search_foods)
+
+
+def test_food_ids_index_the_nutrient_rows():
+    for name in ('Dal Bhat (1 plate)', 'Gundruk Soup (1 bowl)', 'Kheer (1 bowl)'):
+        row = nepalifood.NUTRIENTS[nepalifood.food_id(name)]
+        info = NEPALI_FOODS_DATABASE[name]
+        assert row.tolist() == [np.float32(info[field] or 0) for field in nepalifood.NUTRIENT_FIELDS]
+        assert nepalifood.food_by_id(nepalifood.food_id(name)) is info
+    assert nepalifood.food_id('Pizza') is None
+
+
+def test_filters_follow_the_catalog_flags():
+    assert all(info['category'] == 'Snacks' for info in get_foods_by_category('Snacks').values())
+    assert set(get_diabetic_friendly_foods()) == {
+        name for name, info in NEPALI_FOODS_DATABASE.items() if info.get('diabetic_friendly')}
+    assert all(info['sodium'] <= catalog_build.LOW_SODIUM_MG for info in get_low_sodium_foods().values())
+
+
+def test_search_ranks_matches_and_blank_queries_list_everything():
+    assert list(search_foods('sel roti'))[0] == 'Sel Roti (2 pieces)'
+    assert search_foods('  ') == NEPALI_FOODS_DATABASE
+
+
+def test_recommendations_group_foods_by_condition():
+    groups = get_food_recommendations(['Diabetes', 'Hypertension'])
+    assert list(groups) == ['Diabetes-Friendly', 'Low-Sodium']
+    assert groups['Low-Sodium'] == get_low_sodium_foods()
+    assert get_food_recommendations(['None']) == {'All Foods': NEPALI_FOODS_DATABASE}
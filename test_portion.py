@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+
+from foodrecognition import _serving_label
+from portion import count_pieces_in, count_pieces_in_regions, estimate_servings
+from segmentation import MAX_REGIONS, propose_regions
+
+
+def _momos_around_achar():
+    """Two momos left and right with three achar dots between them"""
+    image = np.full((200, 400, 3), 245, np.uint8)
+    for x in (60, 340):
+        cv2.circle(image, (x, 100), 35, (205, 225, 235), -1)
+        cv2.circle(image, (x, 100), 35, (120, 140, 160), 2)
+    for x in (160, 200, 240):
+        cv2.circle(image, (x, 100), 15, (30, 60, 200), -1)
+    return image
+
+
+def test_pieces_are_counted_in_the_dish_regions_only():
+    image = _momos_around_achar()
+    union = (20, 60, 360, 80)
+    assert count_pieces_in(image, union) == 5
+
+    momos = [{'bbox': (20, 60, 81, 81)}, {'bbox': (300, 60, 81, 81)}]
+    assert count_pieces_in_regions(image, momos) == 2
+
+
+def test_region_masks_exclude_other_food_in_the_box():
+    image = _momos_around_achar()
+    mask = np.zeros((80, 360), np.uint8)
+    cv2.circle(mask, (40, 40), 38, 255, -1)
+    cv2.circle(mask, (320, 40), 38, 255, -1)
+    assert count_pieces_in(image, (20, 60, 360, 80), mask) == 2
+
+
+def test_segmented_regions_are_counted_per_region():
+    image = _momos_around_achar()
+    regions = propose_regions(image)
+    assert len(regions) == 2
+    assert count_pieces_in_regions(image, regions) == 2
+
+
+def test_pieces_beyond_the_region_limit_are_counted():
+    image = np.full((300, 400, 3), 245, np.uint8)
+    for i in range(5):
+        for j in range(2):
+            cv2.circle(image, (60 + 70 * i, 60 + 90 * j), 26, (205, 225, 235), -1)
+            cv2.circle(image, (60 + 70 * i, 60 + 90 * j), 26, (120, 140, 160), 2)
+    regions = propose_regions(image)
+    assert len(regions) == MAX_REGIONS < 10
+    assert count_pieces_in_regions(image, regions) == 10
+
+
+def test_touching_pieces_are_split_by_the_single_pieces_of_other_regions():
+    image = np.full((200, 400, 3), 245, np.uint8)
+    single, pair = np.zeros((60, 60), np.uint8), np.zeros((60, 120), np.uint8)
+    cv2.circle(single, (30, 30), 25, 255, -1)
+    cv2.circle(pair, (30, 30), 25, 255, -1)
+    cv2.circle(pair, (80, 30), 25, 255, -1)
+    regions = [{'bbox': (10, 10, 60, 60), 'mask': single}, {'bbox': (100, 10, 120, 60), 'mask': pair}]
+    assert count_pieces_in_regions(image, regions) == 3
+
+
+def test_servings_are_clipped_to_half_steps():
+    assert estimate_servings(30, 100, 'calories_per_serving') == 1.0
+    assert estimate_servings(1, 100, 'calories_per_bowl') == 0.5
+    assert estimate_servings(99, 100, 'calories_per_bowl') == 3.0
+
+
+def test_serving_labels_are_plural_only_above_one():
+    assert _serving_label(1, 'piece') == '1 piece'
+    assert _serving_label(0.5, 'bowl') == '0.5 bowl'
+    assert _serving_label(1.5, 'serving') == '1.5 servings'
+    assert _serving_label(6, 'piece') == '6 pieces'
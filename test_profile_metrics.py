@@ -0,0 +1,38 @@
+from itertools import product
+
+import pytest
+
+from healthcalc import HealthCalculator
+from profile_metrics import _derive, derived_metrics, profile_fingerprint
+
+PROFILE = {'name': 'Sita', 'age': 34, 'weight': 62.0, 'height': 158, 'gender': 'Female',
+           'activity_level': 'Moderate', 'goal': 'Maintain Weight', 'health_conditions': ['Diabetes']}
+
+
+@pytest.mark.parametrize('weight, gender, activity_level, goal', list(product(
+    (45.0, 70.0, 110.5), ('Female', 'Male'), ('Sedentary', 'Very Active'), ('Lose Weight', 'Gain Weight'))))
+def test_metrics_match_health_calculator(weight, gender, activity_level, goal):
+    profile = dict(PROFILE, weight=weight, gender=gender, activity_level=activity_level, goal=goal)
+    metrics = derived_metrics(profile)
+
+    bmi = HealthCalculator.calculate_bmi(weight, profile['height'])
+    bmr = HealthCalculator.calculate_bmr(weight, profile['height'], profile['age'], gender)
+    daily_calories = HealthCalculator.calculate_daily_calories(bmr, activity_level, goal)
+    assert metrics['bmi'] == bmi
+    assert metrics['exact_bmi'] == pytest.approx(bmi, abs=0.05)
+    assert metrics['bmi_category'] == HealthCalculator.get_bmi_category(bmi)['category']
+    assert metrics['bmr'] == bmr
+    assert metrics['daily_calories'] == daily_calories
+    assert metrics['macros'] == HealthCalculator.calculate_macronutrient_needs(daily_calories, goal)
+    assert metrics['water_liters'] == HealthCalculator.calculate_water_needs(weight, activity_level)
+    assert metrics['fingerprint'] == profile_fingerprint(profile)
+
+
+def test_profiles_differing_only_in_name_or_conditions_share_metrics():
+    _derive.cache_clear()
+    first = derived_metrics(PROFILE)
+    second = derived_metrics(dict(PROFILE, name='Ram', health_conditions=[]))
+    assert second is first
+    assert _derive.cache_info().hits == 1
+
+    assert derived_metrics(dict(PROFILE, weight=63.0)) is not first
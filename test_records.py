@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import nepalifood
+import records
+from records import ExerciseLog, IntakeLog
+
+
+def test_servings_default_to_calories_over_the_catalog_serving():
+    log = IntakeLog()
+    log.append('Dal Bhat (1 plate)', 840, timestamp=0)
+    log.append('Homemade Thukpa', 300, timestamp=1)
+    assert log[0].servings == pytest.approx(2.0)
+    assert log[1].servings == 1.0
+
+
+def test_zero_calorie_catalog_foods_count_as_one_serving(monkeypatch):
+    nutrients = nepalifood.NUTRIENTS.copy()
+    nutrients[nepalifood.food_id('Cucumber Raita (1 bowl)'), 0] = 0
+    monkeypatch.setattr(nepalifood, 'NUTRIENTS', nutrients)
+
+    log = IntakeLog()
+    log.append('Cucumber Raita (1 bowl)', 0)
+    log.append('Cucumber Raita (1 bowl)', 15)
+    assert [entry.servings for entry in log] == [1.0, 1.0]
+    assert np.isfinite(log.nutrient_totals()['protein'])
+
+
+def test_nutrient_totals_weight_the_catalog_by_servings():
+    log = IntakeLog()
+    log.append('Dal Bhat (1 plate)', 420)
+    log.append('Dal Bhat (1 plate)', 210)
+    log.append('Homemade Thukpa', 300)
+    dal_bhat = nepalifood.NEPALI_FOODS_DATABASE['Dal Bhat (1 plate)']
+
+    totals = log.nutrient_totals()
+    assert totals['calories'] == 930
+    assert totals['protein'] == pytest.approx(1.5 * dal_bhat['protein'])
+    assert totals['sodium'] == pytest.approx(1.5 * dal_bhat['sodium'])
+
+
+def test_logs_behave_like_lists():
+    log = IntakeLog()
+    for i, name in enumerate(['Sel Roti (2 pieces)', 'Chicken Momo (6 pieces)', 'Sel Roti (2 pieces)']):
+        log.append(name, 100 + i, method='Camera Scan', timestamp=i)
+    assert len(log) == 3 and log
+    assert log[-1].calories == 102
+    assert [entry.name for entry in log[:2]] == ['Sel Roti (2 pieces)', 'Chicken Momo (6 pieces)']
+    assert log.food_counts() == {'Sel Roti (2 pieces)': 2, 'Chicken Momo (6 pieces)': 1}
+
+    assert log.pop(1).name == 'Chicken Momo (6 pieces)'
+    assert log.total_calories() == 202
+    with pytest.raises(IndexError):
+        log[2]
+
+    frame = log.to_frame()
+    assert frame['name'].tolist() == ['Sel Roti (2 pieces)', 'Sel Roti (2 pieces)']
+    assert frame['method'].tolist() == ['Camera Scan', 'Camera Scan']
+
+
+def test_exercise_log_round_trips_entries():
+    log = ExerciseLog()
+    log.append('Brisk Walking', '30 min', 150, timestamp=0)
+    entry = log[0]
+    assert (entry.exercise, entry.duration, entry.calories) == ('Brisk Walking', '30 min', 150)
+    assert log.to_frame()['calories'].tolist() == [150]
+
+
+def test_names_outside_the_catalog_belong_to_their_log():
+    first, second = IntakeLog(), IntakeLog()
+    first.append('Grandma special stew', 350)
+    first.append('Dal Bhat (1 plate)', 420)
+    second.append('Office canteen rice', 500)
+
+    assert first[1].food_id == nepalifood.food_id('Dal Bhat (1 plate)')
+    assert first[0].food_id == second[0].food_id == records.CATALOG_SIZE
+    assert [entry.name for entry in first] == ['Grandma special stew', 'Dal Bhat (1 plate)']
+    assert second[0].name == 'Office canteen rice'
+    assert first.food_counts() == {'Grandma special stew': 1, 'Dal Bhat (1 plate)': 1}
+    assert second.to_frame()['name'].tolist() == ['Office canteen rice']
@@ -0,0 +1,44 @@
+import json
+
+import ann_index
+from ann_index import IVFIndex
+from features import SignatureMatcher
+from foodrecognition import NepaleseFoodRecognizer
+from rerecognize import load_checkpoint, model_tag, save_checkpoint
+
+
+def test_model_tag_of_signature_matrix_follows_the_signatures():
+    recognizer = NepaleseFoodRecognizer()
+    tag = model_tag(recognizer)
+    assert tag.startswith('signatures:')
+    assert model_tag(NepaleseFoodRecognizer()) == tag
+
+    recognizer.matcher = SignatureMatcher(recognizer.matcher.names, recognizer.matcher.matrix + 0.01)
+    assert model_tag(recognizer) != tag
+
+
+def test_model_tag_of_an_index_hashes_its_files(tmp_path):
+    directory = str(tmp_path / 'index')
+    assert ann_index.main(['build', '--out', directory]) == 0
+    recognizer = NepaleseFoodRecognizer()
+    index = IVFIndex.load(directory)
+    recognizer.matcher = SignatureMatcher(index.names, None, index=index)
+
+    tag = model_tag(recognizer)
+    assert tag.startswith('index:')
+
+    manifest_path = tmp_path / 'index' / 'index.json'
+    manifest = json.loads(manifest_path.read_text())
+    manifest['nprobe'] += 1
+    manifest_path.write_text(json.dumps(manifest))
+    assert model_tag(recognizer) != tag
+
+
+def test_checkpoints_of_other_models_are_ignored(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = load_checkpoint(path, 'signatures:a')
+    checkpoint.update(last_digest='ff', processed=3)
+    save_checkpoint(path, checkpoint)
+
+    assert load_checkpoint(path, 'signatures:a')['processed'] == 3
+    assert load_checkpoint(path, 'index:b')['processed'] == 0
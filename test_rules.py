@@ -0,0 +1,146 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from rules import RULES, RULESETS, RuleSet
+
+CONDITIONS = ('Diabetes', 'Hypertension', 'Heart Disease')
+CONDITION_SETS = [list(c) for n in range(len(CONDITIONS) + 1) for c in combinations(CONDITIONS, n)]
+BMIS = (15.0, 18.4, 18.5, 22.0, 24.9, 25.0, 25.04, 25.1, 29.9, 30.0, 35.0)
+
+
+def _unique(advice):
+    return list(dict.fromkeys(advice))
+
+
+# The if/elif chains the rule table replaced
+
+def _baseline_scan(foods, conditions):
+    recommendations = []
+    for condition in conditions:
+        if condition == 'Diabetes':
+            for food in foods:
+                if 'Dal Bhat' in food:
+                    recommendations.append("Consider brown rice instead of white rice for better blood sugar control")
+                elif 'Sel Roti' in food:
+                    recommendations.append("Limit sweet items like Sel Roti due to high sugar content")
+        elif condition == 'Hypertension':
+            recommendations.append("Be mindful of salt content in traditional preparations")
+            recommendations.append("Consider steamed momos instead of fried versions")
+        elif condition == 'Heart Disease':
+            recommendations.append("Choose lean protein options and limit ghee usage")
+            recommendations.append("Include more vegetables in your Dal Bhat")
+    if not recommendations:
+        recommendations.append("Your food choices look balanced! Maintain portion control.")
+    return recommendations
+
+
+def _baseline_health_profile(bmi, activity_level, conditions):
+    if bmi < 18.5:
+        recommendations = ['Consider increasing calorie intake with healthy foods']
+    elif 18.5 <= bmi < 25:
+        recommendations = ['Maintain your current healthy weight']
+    elif 25 <= bmi < 30:
+        recommendations = ['Consider reducing calorie intake and increasing exercise']
+    else:
+        recommendations = ['Consult healthcare provider for weight management plan']
+    for condition in conditions:
+        if condition == 'Diabetes':
+            recommendations.extend(['Choose brown rice over white rice in Dal Bhat',
+                                    'Monitor portion sizes and eat regular meals',
+                                    'Include high-fiber vegetables in every meal'])
+        elif condition == 'Hypertension':
+            recommendations.extend(['Reduce salt in cooking and avoid pickled foods',
+                                    'Include potassium-rich foods like bananas',
+                                    'Limit processed and canned foods'])
+        elif condition == 'Heart Disease':
+            recommendations.extend(['Choose lean proteins and limit red meat',
+                                    'Include omega-3 rich foods like fish',
+                                    'Use minimal ghee and oil in cooking'])
+    if activity_level == 'Sedentary':
+        recommendations.append('Try to include at least 30 minutes of walking daily')
+    return recommendations
+
+
+def _baseline_meal(conditions):
+    suggestions = []
+    for condition in conditions:
+        if condition == 'Diabetes':
+            suggestions.extend(['Add more fiber-rich vegetables',
+                                'Choose whole grains over refined grains',
+                                'Include lean protein to slow carb absorption'])
+        elif condition == 'Hypertension':
+            suggestions.extend(['Reduce salt and use herbs for flavor',
+                                'Add potassium-rich foods like tomatoes',
+                                'Include garlic for natural blood pressure support'])
+        elif condition == 'Heart Disease':
+            suggestions.extend(['Use minimal oil and choose healthy fats',
+                                'Include antioxidant-rich colorful vegetables',
+                                'Add omega-3 sources like walnuts or fish'])
+    return suggestions
+
+
+def _baseline_profile_page(bmi, conditions):
+    recommendations = []
+    if bmi < 18.5:
+        recommendations.append("Consider increasing calorie intake with healthy Nepali foods like nuts and dairy")
+    elif bmi > 25:
+        recommendations.append("Focus on portion control and include more vegetables in your Dal Bhat")
+    if 'Diabetes' in conditions:
+        recommendations.append("Choose brown rice over white rice and monitor carbohydrate portions")
+    if 'Hypertension' in conditions:
+        recommendations.append("Reduce salt in your cooking and avoid pickled foods")
+    if not recommendations:
+        recommendations.append("Maintain your current healthy lifestyle with balanced Nepali meals!")
+    return recommendations
+
+
+@pytest.mark.parametrize('foods', [[], ['Dal Bhat (1 plate)'], ['Sel Roti (2 pieces)', 'Chicken Momo (6 pieces)'],
+                                   ['Dal Bhat (1 plate)', 'Dal Bhat (1 plate)', 'Sel Roti (2 pieces)']])
+def test_scan_rules_match_the_old_chain(foods):
+    for conditions in CONDITION_SETS + [['Kidney Disease']]:
+        assert RULESETS['scan'].evaluate(conditions, foods) == _unique(_baseline_scan(foods, conditions))
+
+
+@pytest.mark.parametrize('bmi', BMIS)
+def test_health_profile_rules_match_the_old_chain(bmi):
+    for conditions in CONDITION_SETS:
+        for activity_level in ('Sedentary', 'Moderate'):
+            assert (RULESETS['health_profile'].evaluate(conditions, bmi=bmi, activity_level=activity_level)
+                    == _baseline_health_profile(bmi, activity_level, conditions))
+
+
+def test_meal_rules_match_the_old_chain():
+    for conditions in CONDITION_SETS:
+        assert RULESETS['meal'].evaluate(conditions) == _baseline_meal(conditions)
+
+
+@pytest.mark.parametrize('bmi', BMIS + (24.999999, 25.000001))
+def test_profile_page_rules_match_the_old_chain(bmi):
+    for conditions in CONDITION_SETS:
+        assert (RULESETS['profile_page'].evaluate(conditions, bmi=bmi)
+                == _baseline_profile_page(bmi, conditions))
+
+
+def test_advice_follows_the_table_whatever_the_condition_order():
+    forward = RULESETS['meal'].evaluate(['Diabetes', 'Heart Disease'])
+    assert RULESETS['meal'].evaluate(['Heart Disease', 'Diabetes']) == forward
+
+
+def test_batch_evaluation_matches_single_subjects():
+    ruleset = RULESETS['health_profile']
+    rng = np.random.default_rng(0)
+    subjects = [(CONDITION_SETS[i], float(bmi), level) for i, bmi, level in zip(
+        rng.integers(0, len(CONDITION_SETS), 200), rng.uniform(15, 40, 200),
+        rng.choice(['Sedentary', 'Light', 'Active'], 200))]
+
+    matrix = ruleset.evaluate_batch(ruleset.encode_conditions([s[0] for s in subjects]),
+                                    bmi=[s[1] for s in subjects], activity_level=[s[2] for s in subjects])
+    for row, (conditions, bmi, level) in zip(matrix, subjects):
+        assert ruleset.advice_for(row) == ruleset.evaluate(conditions, bmi=bmi, activity_level=level)
+
+
+def test_missing_facts_are_reported():
+    with pytest.raises(ValueError, match="needs fact 'bmi'"):
+        RuleSet('test', [rule for rule in RULES if rule['set'] == 'profile_page']).evaluate([])
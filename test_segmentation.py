@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import pytest
+
+from segmentation import MIN_REGION_PIXELS, SEGMENT_SIZE, is_flat, propose_regions
+
+
+def _thali():
+    image = np.full((240, 320, 3), 200, np.uint8)
+    cv2.ellipse(image, (160, 120), (140, 110), 0, 0, 360, (245, 245, 245), -1)
+    cv2.circle(image, (120, 120), 60, (235, 240, 240), -1)
+    cv2.circle(image, (210, 110), 45, (40, 190, 230), -1)
+    cv2.circle(image, (200, 180), 25, (40, 140, 60), -1)
+    return image
+
+
+@pytest.mark.parametrize('image', [
+    np.zeros((10, 10, 3), np.uint8),
+    np.full((240, 320, 3), (0, 220, 240), np.uint8),
+    np.full((240, 320, 3), 128, np.uint8) + np.random.default_rng(0).integers(0, 2, (240, 320, 3), dtype=np.uint8),
+], ids=['black', 'yellow', 'flat_with_sensor_noise'])
+def test_flat_images_have_no_regions(image):
+    assert is_flat(image)
+    assert propose_regions(image) == []
+
+
+def test_tiny_images_have_no_pixel_sized_regions():
+    image = np.random.default_rng(1).integers(0, 256, (10, 10, 3), dtype=np.uint8)
+    assert all(region['area'] >= MIN_REGION_PIXELS for region in propose_regions(image))
+
+
+def test_regions_are_at_least_the_minimum_area():
+    regions = propose_regions(_thali())
+    scale = SEGMENT_SIZE / 320
+    assert len(regions) == 3
+    assert all(region['area'] * scale * scale >= MIN_REGION_PIXELS - 1 for region in regions)
+    areas = [region['area'] for region in regions]
+    assert areas == sorted(areas, reverse=True)
+
+
+def test_proposals_are_stable_and_leave_the_opencv_rng_alone():
+    image = _thali()
+    first = propose_regions(image)
+
+    cv2.setRNGSeed(123)
+    expected = cv2.randu(np.zeros(4, np.float32), 0, 1).copy()
+    cv2.setRNGSeed(123)
+    second = propose_regions(image)
+    assert np.array_equal(cv2.randu(np.zeros(4, np.float32), 0, 1), expected)
+
+    assert [region['bbox'] for region in first] == [region['bbox'] for region in second]
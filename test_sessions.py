@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sessions import SessionManager
+from storage import MealStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MealStore(str(tmp_path))
+
+
+def test_concurrent_tabs_of_one_user_share_a_session(store):
+    manager = SessionManager(store)
+    barrier = threading.Barrier(8)
+
+    def open_tab(_):
+        barrier.wait()
+        return manager.get('patient-17')
+
+    with ThreadPoolExecutor(8) as pool:
+        sessions = list(pool.map(open_tab, range(8)))
+    assert all(session is manager.get('patient-17') for session in sessions)
+    assert len(manager) == 1
+
+
+def test_concurrent_logs_are_all_kept(store):
+    manager = SessionManager(store)
+    session = manager.get('patient-17')
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: session.log_food('Sel Roti (2 pieces)', 180 + i), range(40)))
+
+    assert len(session.intake) == len(session.meal_ids) == 40
+    assert sorted(entry.calories for entry in session.intake) == list(range(180, 220))
+    assert store.count_meals('patient-17') == 40
+    assert session.frequent.top()[0]['count'] == pytest.approx(40, rel=0.01)
+
+
+def test_sessions_are_rebuilt_from_the_store(store):
+    manager = SessionManager(store, capacity=2)
+    first = manager.get('a')
+    first.log_food('Kheer (1 bowl)', 250)
+    first.update_profile(weight=70)
+    manager.get('b')
+    manager.get('c')
+    assert manager.stats()['evictions'] == 1
+
+    rebuilt = manager.get('a')
+    assert rebuilt is not first
+    assert [entry.name for entry in rebuilt.intake] == ['Kheer (1 bowl)']
+    assert rebuilt.profile['weight'] == 70
+    assert rebuilt.frequent.top()[0]['name'] == 'Kheer (1 bowl)'
+
+
+def test_removing_a_food_updates_store_and_counts(store):
+    session = SessionManager(store).get('patient-17')
+    session.log_food('Kheer (1 bowl)', 250)
+    session.log_food('Dhido (1 bowl)', 300)
+    assert session.remove_food(0).name == 'Kheer (1 bowl)'
+    assert [row['name'] for row in store.food_stats('patient-17')] == ['Dhido (1 bowl)']
+    assert [food['name'] for food in session.frequent.top()] == ['Dhido (1 bowl)']
+
+
+def test_idle_sessions_are_evicted(store):
+    manager = SessionManager(store, idle_seconds=60)
+    manager.get('a').last_seen -= 120
+    manager.get('b')
+    assert manager.evict_idle() == 1
+    assert [row['user_id'] for row in manager.memory_report()] == ['b']
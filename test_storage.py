@@ -0,0 +1,188 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import closing
+
+import cv2
+import numpy as np
+import pytest
+
+import storage
+from sessions import SessionManager
+from storage import MealStore
+
+DAL_BHAT = {'name': 'Dal Bhat (1 plate)', 'calories': 420, 'serving_info': '1 serving'}
+
+
+def _plate(seed=0):
+    image = np.full((240, 320, 3), 245, np.uint8)
+    rng = np.random.default_rng(seed)
+    for _ in range(5):
+        center = tuple(int(v) for v in rng.integers([40, 40], [280, 200]))
+        colour = tuple(int(v) for v in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(15, 40)), colour, -1)
+    return image
+
+
+def _age(store, seconds=7200):
+    """Make every thumbnail row and file look `seconds` old"""
+    then = time.time() - seconds
+    with store._transaction() as connection:
+        connection.execute('UPDATE thumbnails SET created_at = ?', (then,))
+    for root, _, files in os.walk(store.thumbnail_dir):
+        for name in files:
+            os.utime(os.path.join(root, name), (then, then))
+
+
+def _thumbnail_files(store):
+    return sorted(name for _, _, files in os.walk(store.thumbnail_dir) for name in files)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MealStore(str(tmp_path))
+
+
+def test_scans_share_content_addressed_thumbnails(store):
+    first = store.save_scan(_plate(), [DAL_BHAT])
+    second = store.save_scan(_plate(), [DAL_BHAT])
+    assert len(first) == len(second) == 1
+    assert len(_thumbnail_files(store)) == 1
+
+    meals = store.meal_page()
+    assert [meal['id'] for meal in meals] == second + first
+    assert store.load_image(meals[0]).size[0] <= storage.THUMBNAIL_SIZE
+
+
+def test_compaction_removes_only_unreferenced_old_thumbnails(store):
+    kept = store.save_scan(_plate(0), [DAL_BHAT])[0]
+    dropped = store.save_scan(_plate(1), [DAL_BHAT])[0]
+    store.delete_meal(dropped)
+
+    assert store.compact() == 0
+    _age(store)
+    assert store.compact() == 1
+    assert len(_thumbnail_files(store)) == 1
+    assert store.load_thumbnail(store.meal_page()[0]) is not None
+    assert [meal['id'] for meal in store.meal_page()] == [kept]
+
+
+def test_compaction_sweeps_stray_files(store):
+    stray = store.thumbnail_path('ab' * 32, '.jpg')
+    os.makedirs(os.path.dirname(stray), exist_ok=True)
+    with open(stray, 'wb') as f:
+        f.write(b'never logged')
+    _age(store)
+    assert store.compact() == 1
+    assert not os.path.exists(stray)
+
+
+def test_compaction_between_thumbnail_write_and_commit(store, monkeypatch):
+    # An old orphan of the same photo is compacted while a re-scan is saving it
+    store.delete_meal(store.save_scan(_plate(), [DAL_BHAT])[0])
+    _age(store)
+
+    write = store._write_thumbnail
+    compacted = []
+
+    def write_then_compact(data, extension):
+        digest = write(data, extension)
+        if not compacted:
+            compacted.append(store.compact(grace_seconds=0))
+        return digest
+
+    monkeypatch.setattr(store, '_write_thumbnail', write_then_compact)
+    store.save_scan(_plate(), [DAL_BHAT])
+
+    assert compacted == [1]
+    assert store.load_thumbnail(store.meal_page()[0]) is not None
+
+
+def test_save_committing_during_compaction_keeps_its_thumbnail(store, monkeypatch):
+    store.delete_meal(store.save_scan(_plate(), [DAL_BHAT])[0])
+    _age(store)
+
+    remove = os.remove
+    saver = threading.Thread(target=store.save_scan, args=(_plate(), [DAL_BHAT]))
+
+    def remove_while_saving(path):
+        if not saver.is_alive():
+            saver.start()
+            # The save waits for compaction's write lock
+            saver.join(0.5)
+            assert saver.is_alive()
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', remove_while_saving)
+    store.compact(grace_seconds=0)
+    saver.join(30)
+
+    meals = store.meal_page()
+    assert len(meals) == 1
+    assert store.load_thumbnail(meals[0]) is not None
+
+
+def test_food_stats_are_backfilled_for_stores_without_them(tmp_path):
+    store = MealStore(str(tmp_path))
+    store.log_meal('Sel Roti (2 pieces)', 180)
+    store.log_meal('Sel Roti (2 pieces)', 180)
+    store.log_meal('Chicken Momo (6 pieces)', 330)
+    with closing(store._connect()) as connection:
+        connection.execute('DELETE FROM food_stats')
+        connection.execute('PRAGMA user_version = 0')
+        connection.commit()
+
+    reopened = MealStore(str(tmp_path))
+    stats = {row['name']: row for row in reopened.food_stats('default')}
+    assert set(stats) == {'Sel Roti (2 pieces)', 'Chicken Momo (6 pieces)'}
+    assert stats['Sel Roti (2 pieces)']['score'] > stats['Chicken Momo (6 pieces)']['score']
+    with closing(reopened._connect()) as connection:
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == storage._SCHEMA_VERSION
+
+
+def test_deleting_meals_takes_them_out_of_food_stats(store):
+    first = store.log_meal('Sel Roti (2 pieces)', 180)
+    store.log_meal('Chicken Momo (6 pieces)', 330)
+    store.delete_meal(first)
+    assert [row['name'] for row in store.food_stats('default')] == ['Chicken Momo (6 pieces)']
+
+
+def test_re_recognition_keeps_meal_ids_valid(store):
+    session = SessionManager(store).get('default')
+    session.log_scan(_plate(), [DAL_BHAT, {'name': 'Sel Roti (2 pieces)', 'calories': 180}])
+    digest = store.meal_page()[0]['thumbnail']
+    ids = list(session.meal_ids)
+
+    kheer = {'name': 'Kheer (1 bowl)', 'calories': 250, 'serving_info': '1 bowl'}
+    assert store.replace_scan_results([(digest, [kheer, DAL_BHAT], None)]) == 2
+    assert sorted(meal['id'] for meal in store.meal_page()) == ids
+    assert store.meal_page()[-1]['name'] == 'Kheer (1 bowl)'
+
+    session.remove_food(0)
+    assert [meal['name'] for meal in store.meal_page()] == ['Dal Bhat (1 plate)']
+    assert [row['name'] for row in store.food_stats('default')] == ['Dal Bhat (1 plate)']
+
+
+def test_re_recognition_adds_and_drops_rows_beyond_the_old_count(store):
+    meal_id = store.save_scan(_plate(), [DAL_BHAT])[0]
+    digest = store.meal_page()[0]['thumbnail']
+    sel_roti = {'name': 'Sel Roti (2 pieces)', 'calories': 180}
+
+    assert store.replace_scan_results([(digest, [sel_roti, DAL_BHAT], None)]) == 2
+    meals = store.meal_page()
+    assert meals[-1]['id'] == meal_id and meals[-1]['name'] == 'Sel Roti (2 pieces)'
+    assert meals[0]['id'] > meal_id
+
+    assert store.replace_scan_results([(digest, [DAL_BHAT], None)]) == 1
+    assert [(meal['id'], meal['name']) for meal in store.meal_page()] == [(meal_id, 'Dal Bhat (1 plate)')]
+    assert [row['name'] for row in store.food_stats('default')] == ['Dal Bhat (1 plate)']
+
+
+def test_opening_a_store_does_not_load_the_recognizer(tmp_path):
+    code = ('import sys, exporter, importer, storage; storage.MealStore(sys.argv[1]); '
+            'print(sorted(m for m in ("cv2", "features", "foodrecognition") if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code, str(tmp_path)], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(storage.__file__)), check=True)
+    assert result.stdout.strip() == '[]'